@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """The value below which `fraction` of the (sorted) values fall, nearest rank."""
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def measure_allocations(function: Callable[[], None], iterations: int) -> float:
+    """Mean peak of memory allocated during a call, in bytes (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(iterations):
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            else:  # python < 3.9
+                tracemalloc.clear_traces()
+            before, _ = tracemalloc.get_traced_memory()
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+    finally:
+        tracemalloc.stop()
+    return total / iterations
+
+
+def run_case(
+    function: Callable[[], None],
+    iterations: int,
+    command_counter: Callable[[], int] | None = None,
+    allocation_iterations: int | None = None,
+) -> Dict[str, float]:
+    """
+    Time a benchmark case.
+
+    Args:
+        function (Callable[[], None]): The operation to benchmark.
+        iterations (int): The number of timed calls.
+        command_counter (Callable[[], int] | None, optional): Returns the number of commands processed by the device
+            so far, used to compute the commands per call. Defaults to None (no device involved).
+        allocation_iterations (int | None, optional): The number of calls used to measure allocations
+            (slow, measured separately). 0 to skip. Defaults to min(iterations, 200).
+
+    Returns:
+        Dict[str, float]: ops_per_second, commands_per_call, commands_per_second, p50_us, p99_us, max_us and
+        alloc_bytes_per_call (None if skipped).
+    """
+    for _ in range(max(1, iterations // 10)):
+        function()
+
+    commands_before = command_counter() if command_counter is not None else 0
+    latencies = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            function()
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+    commands = (command_counter() if command_counter is not None else 0) - (
+        commands_before
+    )
+
+    if allocation_iterations is None:
+        allocation_iterations = min(iterations, 200)
+    allocations = (
+        measure_allocations(function, allocation_iterations)
+        if allocation_iterations > 0
+        else None
+    )
+
+    latencies.sort()
+    return {
+        "ops_per_second": iterations / elapsed,
+        "commands_per_call": commands / iterations,
+        "commands_per_second": commands / elapsed,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "max_us": latencies[-1] * 1e6,
+        "alloc_bytes_per_call": allocations,
+    }
+
+
+def metadata(**kwargs) -> Dict:
+    from hvps import __version__
+
+    return {
+        "hvps": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        **kwargs,
+    }
+
+
+def save(path: str, results: Dict) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> Dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compare(
+    baseline: Dict, current: Dict, tolerance: float, tail_tolerance: float = 1.0
+) -> List[str]:
+    """
+    Compare the results of a run against a baseline.
+
+    A case regresses if its median latency or its allocations per call grow by more than `tolerance` (relative),
+    or its p99 latency by more than `tail_tolerance` (the tail is noisier on shared machines).
+
+    Returns:
+        List[str]: A description of each regression.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        if result["p50_us"] > reference["p50_us"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {result['p50_us']:.1f} us > baseline {reference['p50_us']:.1f} us"
+            )
+        if result["p99_us"] > reference["p99_us"] * (1 + tail_tolerance):
+            regressions.append(
+                f"{name}: p99 {result['p99_us']:.1f} us > baseline {reference['p99_us']:.1f} us"
+            )
+        allocations, reference_allocations = (
+            result.get("alloc_bytes_per_call"),
+            reference.get("alloc_bytes_per_call"),
+        )
+        if (
+            allocations is not None
+            and reference_allocations is not None
+            and allocations > reference_allocations * (1 + tolerance) + 64
+        ):
+            regressions.append(
+                f"{name}: allocations {allocations:.0f} B/call > baseline {reference_allocations:.0f} B/call"
+            )
+    return regressions
+
+
+def format_table(results: Dict[str, Dict[str, float]]) -> str:
+    header = f"{'case':<28} {'ops/s':>10} {'cmd/s':>10} {'cmd/op':>7} {'p50 us':>10} {'p99 us':>10} {'alloc B':>9}"
+    lines = [header, "-" * len(header)]
+    for name, result in results.items():
+        allocations = result["alloc_bytes_per_call"]
+        lines.append(
+            f"{name:<28} {result['ops_per_second']:>10.0f} {result['commands_per_second']:>10.0f} "
+            f"{result['commands_per_call']:>7.1f} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f} "
+            f"{'-' if allocations is None else f'{allocations:.0f}':>9}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,239 @@
+"""
+End-to-end benchmarks of the command stack.
+
+`Caen` and `Iseg` objects are driven through an emulated device, either connected in memory
+(`--transport memory`: measures the Python stack only, responses are replayed from a cache) or over a
+pseudo-terminal (`--transport pty`: includes the operating system and the transmission time at `--baudrate`).
+
+Usage:
+    python benchmarks/run.py --transport memory --output results.json
+    python benchmarks/run.py --transport memory --compare benchmarks/baselines/memory.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import sys
+from typing import Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+from hvps import Caen, Iseg  # noqa: E402
+from hvps.commands.caen import _parse_response as _parse_caen_response  # noqa: E402
+from hvps.commands.caen.channel import _MON_CHANNEL_COMMANDS as _CAEN_MON  # noqa: E402
+from hvps.commands.iseg import _parse_response as _parse_iseg_response  # noqa: E402
+from hvps.commands.iseg.channel import _MON_CHANNEL_COMMANDS as _ISEG_MON  # noqa: E402
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator  # noqa: E402
+from hvps.utils.utils import check_command_output_and_convert  # noqa: E402
+
+TRANSPORTS = ["memory", "pty"]
+
+DEFAULT_ITERATIONS = {"memory": 2000, "pty": 100}
+
+
+@contextlib.contextmanager
+def _connect(device_class, emulator, transport: str, baudrate: int) -> Iterator:
+    if transport == "memory":
+        device = device_class(baudrate=baudrate, timeout=1.0)
+        device._serial = InMemorySerial(
+            emulator, baudrate=baudrate, timeout=1.0, cache=True
+        )
+        with device:
+            yield device
+    else:
+        with emulator:
+            with device_class(
+                port=emulator.port, baudrate=baudrate, timeout=1.0
+            ) as device:
+                yield device
+
+
+def _command_counter(device, emulator) -> Callable[[], int]:
+    if isinstance(device.serial, InMemorySerial):
+        # cached responses do not reach the emulator
+        return lambda: device.serial.commands
+    return lambda: emulator.commands
+
+
+def caen_cases(
+    transport: str, baudrate: int
+) -> Iterator[Tuple[str, Callable[[], None], Callable[[], int]]]:
+    # the transmission time is only simulated over the pseudo-terminal
+    emulator = CaenEmulator(
+        boards=[0], baudrate=baudrate if transport == "pty" else None
+    )
+    with _connect(Caen, emulator, transport, baudrate) as caen:
+        counter = _command_counter(caen, emulator)
+        module = caen.module(0)
+        channels = module.channels
+        channel = channels[0]
+
+        def read_property():
+            _ = channel.vmon
+
+        def set_with_read_back():
+            channel.vset = 100.0
+
+        def module_scan():
+            for c in channels:
+                _ = c.vset, c.vmon, c.iset, c.imon, c.stat
+
+        yield "caen.read_property", read_property, counter
+        yield "caen.set_with_read_back", set_with_read_back, counter
+        yield "caen.module_scan", module_scan, counter
+
+
+def iseg_cases(
+    transport: str, baudrate: int
+) -> Iterator[Tuple[str, Callable[[], None], Callable[[], int]]]:
+    emulator = IsegEmulator(baudrate=baudrate if transport == "pty" else None)
+    with _connect(Iseg, emulator, transport, baudrate) as iseg:
+        counter = _command_counter(iseg, emulator)
+        module = iseg.module(0)
+        channels = module.channels
+        channel = channels[0]
+
+        def read_property():
+            _ = channel.measured_voltage
+
+        def set_with_read_back():
+            channel.voltage_set = 100.0
+
+        def module_scan():
+            for c in channels:
+                _ = (
+                    c.measured_voltage,
+                    c.measured_current,
+                    c.voltage_set,
+                    c.current_set,
+                    c.channel_status,
+                )
+
+        yield "iseg.read_property", read_property, counter
+        yield "iseg.set_with_read_back", set_with_read_back, counter
+        yield "iseg.module_scan", module_scan, counter
+
+
+def parse_cases() -> List[Tuple[str, Callable[[], None]]]:
+    def caen_parse():
+        _, value = _parse_caen_response(b"#BD:00,CMD:OK,VAL:0100.0\r\n")
+        check_command_output_and_convert("vmon", None, value, _CAEN_MON)
+
+    def iseg_parse():
+        value = _parse_iseg_response(b"1.23400E3V\r\n", float)
+        check_command_output_and_convert("measured_voltage", None, value, _ISEG_MON)
+
+    def iseg_parse_list():
+        value = _parse_iseg_response(b"2.00000E3V,4.00000E3V,6.00000E3V\r\n", float)
+        check_command_output_and_convert("voltage_mode_list", None, value, _ISEG_MON)
+
+    return [
+        ("caen.parse_response", caen_parse),
+        ("iseg.parse_response", iseg_parse),
+        ("iseg.parse_response_list", iseg_parse_list),
+    ]
+
+
+def run(
+    transport: str, baudrate: int, iterations: int, pattern: str | None = None
+) -> Dict:
+    results = {}
+
+    def selected(name: str) -> bool:
+        return pattern is None or pattern in name
+
+    for cases in (caen_cases, iseg_cases):
+        for name, function, counter in cases(transport, baudrate):
+            if not selected(name):
+                continue
+            # the emulator thread would be counted in the allocations over the pseudo-terminal
+            results[name] = harness.run_case(
+                function,
+                iterations=iterations,
+                command_counter=counter,
+                allocation_iterations=None if transport == "memory" else 0,
+            )
+            print(f"{name}: {results[name]['ops_per_second']:.0f} ops/s", flush=True)
+
+    for name, function in parse_cases():
+        if selected(name):
+            results[name] = harness.run_case(function, iterations=iterations * 10)
+            print(f"{name}: {results[name]['ops_per_second']:.0f} ops/s", flush=True)
+
+    return {
+        "metadata": harness.metadata(
+            transport=transport, baudrate=baudrate, iterations=iterations
+        ),
+        "results": results,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the hvps command stack")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="memory")
+    parser.add_argument(
+        "--baudrate",
+        type=int,
+        default=115200,
+        help="Baud rate of the emulated serial line (transmission time simulated over the pty only)",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=None,
+        help="Timed calls per case (10x for parsing cases)",
+    )
+    parser.add_argument(
+        "--filter", default=None, help="Only run the cases containing this string"
+    )
+    parser.add_argument(
+        "--output", default=None, help="Write the results to this JSON file"
+    )
+    parser.add_argument(
+        "--compare", default=None, help="Compare with this JSON baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Relative increase of the median latency or the allocations considered a regression",
+    )
+    parser.add_argument(
+        "--tail-tolerance",
+        type=float,
+        default=1.0,
+        help="Relative increase of the p99 latency considered a regression",
+    )
+    args = parser.parse_args(argv)
+
+    if args.transport == "pty" and os.name != "posix":
+        parser.error("The pty transport requires a POSIX system")
+
+    iterations = args.iterations or DEFAULT_ITERATIONS[args.transport]
+    results = run(args.transport, args.baudrate, iterations, args.filter)
+    print()
+    print(harness.format_table(results["results"]))
+
+    if args.output is not None:
+        harness.save(args.output, results)
+
+    if args.compare is not None:
+        regressions = harness.compare(
+            harness.load(args.compare), results, args.tolerance, args.tail_tolerance
+        )
+        print()
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions with respect to {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,35 @@
-from hvps.devices.caen.caen import Caen
-from hvps.devices.iseg.iseg import Iseg
-from .version import __version__
-
-__all__ = ["Caen", "Iseg", "__version__"]
+from .version import __version__
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from hvps.devices.caen.caen import Caen
+    from hvps.devices.iseg.iseg import Iseg
+    from hvps.discovery import discover
+    from hvps.emergency import emergency_off
+    from hvps.instrumentation import stats
+
+__all__ = ["Caen", "Iseg", "discover", "emergency_off", "stats", "__version__"]
+
+# brand classes are imported on first access so that `import hvps` (and the cli for `--version` or `--ports`)
+# does not pay for pyserial and the command tables
+_LAZY_ATTRIBUTES = {
+    "Caen": "hvps.devices.caen.caen",
+    "Iseg": "hvps.devices.iseg.iseg",
+    "discover": "hvps.discovery",
+    "emergency_off": "hvps.emergency",
+    "stats": "hvps.instrumentation",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals().keys()) | set(_LAZY_ATTRIBUTES.keys()))
@@ -1,29 +1,17 @@
 from __future__ import annotations
-from typing import List, Dict
 
-import serial
-from serial.tools import list_ports
 import argparse
-import logging
 
 from hvps import __version__ as hvps_version
-from hvps import Caen, Iseg
-from hvps.commands.caen.module import (
-    _MON_MODULE_COMMANDS as CAEN_MON_MODULE_COMMANDS,
-    _SET_MODULE_COMMANDS as CAEN_SET_MODULE_COMMANDS,
-)
-from hvps.commands.caen.channel import (
-    _MON_CHANNEL_COMMANDS as CAEN_MON_CHANNEL_COMMANDS,
-    _SET_CHANNEL_COMMANDS as CAEN_SET_CHANNEL_COMMANDS,
-)
-from hvps.commands.iseg.module import (
-    _MON_MODULE_COMMANDS as ISEG_MON_MODULE_COMMANDS,
-    _SET_MODULE_COMMANDS as ISEG_SET_MODULE_COMMANDS,
-)
-from hvps.commands.iseg.channel import (
-    _MON_CHANNEL_COMMANDS as ISEG_MON_CHANNEL_COMMANDS,
-    _SET_CHANNEL_COMMANDS as ISEG_SET_CHANNEL_COMMANDS,
-)
+
+# avoid importing typing at runtime, it is one of the most expensive imports of the cli startup
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import List, Dict
+    import logging
+
+# NOTE: brand modules, command tables and pyserial are imported only by the code paths that need them,
+# so that `--version` and `--ports` stay fast (the nodejs bindings call them on every invocation)
 
 
 # TODO: command help in cli
@@ -89,6 +77,7 @@ def _call_setter_method(
     Returns:
         None
     """
+    import serial
 
     command_input_type = commands[method]["input_type"]
     # True if sets a property, False if setter just sets non-readable state in the hvps
@@ -110,7 +99,7 @@ def _call_setter_method(
                 getattr(o, method)(value)
     except (serial.SerialException, serial.serialutil.PortNotOpenError) as e:
         if dry_run:
-            logger.info(f"setter {method} called")
+            logger.info("setter %s called", method)
         else:
             raise e
 
@@ -138,12 +127,14 @@ def _call_monitor_method(
     Returns:
         None
     """
+    import serial
+
     try:
         result = f"{method}: {getattr(o, method)}"
         logger.info(result)
     except (serial.SerialException, serial.serialutil.PortNotOpenError) as e:
         if dry_run:
-            logger.info(f"monitor {method} called")
+            logger.info("monitor %s called", method)
         else:
             raise e
 
@@ -157,14 +148,20 @@ def main():
         default=None,
         help="Serial port. If not specified it will attempt to automatically find",
     )
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="pyserial URL of the port instead of --port, e.g. socket://host:port for a terminal server",
+    )
     parser.add_argument(
         "--ports", action="store_true", help="list serial ports available"
     )
     parser.add_argument(
         "--baud",
         default=None,
-        help="Baud rate for serial communication. "
-        "If not specified it will attempt to automatically find",
+        type=int,
+        help="Baud rate for serial communication. If not specified, it is discovered when connecting: a port "
+        "found before is checked with a single probe at its cached baud rate, others are probed at the supported rates",
     )
 
     parser.add_argument(
@@ -207,18 +204,90 @@ def main():
         help="Value to set method to, if applicable",
     )
 
+    # EXPORTER
+    exporter_parser = subparsers.add_parser(
+        "exporter",
+        help="Poll the devices in the background and serve the values on a local HTTP /metrics endpoint",
+    )
+    exporter_parser.add_argument(
+        "--config", required=True, help="Configuration file (TOML)"
+    )
+
+    # SERVER
+    server_parser = subparsers.add_parser(
+        "server",
+        help="Poll the devices in the background and push the changes to WebSocket clients (see hvps.server)",
+    )
+    server_parser.add_argument(
+        "--config", required=True, help="Configuration file (TOML)"
+    )
+
+    # DAEMON
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Own the serial ports of the devices and share them with local clients (see hvps.daemon)",
+    )
+    daemon_parser.add_argument(
+        "--config", required=True, help="Configuration file (TOML)"
+    )
+    daemon_parser.add_argument(
+        "--address",
+        default=None,
+        help="unix:<path> or <host>:<port> (TCP is open to all local users). Default: [daemon] address of the "
+        "configuration, or hvps.sock in $XDG_RUNTIME_DIR or the temporary directory",
+    )
+
     # validate args
     args = parser.parse_args()
+
+    import logging
+
     logging.basicConfig(level=args.log.upper())
     dry_run = True if args.dry_run else False
 
     if args.ports:
+        from serial.tools import list_ports
+
         ports = [port.device for port in list_ports.comports()]
         print(f"Number of ports available: {len(ports)}")
         for port in ports:
             print(f"  - {port}")
         exit(0)
 
+    if args.brand == "exporter":
+        from hvps.exporter import load_config, from_config
+
+        exporter = from_config(load_config(args.config))
+        host, port = exporter.address
+        logging.getLogger("hvps.exporter").info(
+            "Serving metrics on http://%s:%s/metrics", host, port
+        )
+        exporter.serve_forever()
+        exit(0)
+
+    if args.brand == "server":
+        from hvps.exporter import load_config
+        from hvps.server import from_config
+
+        server = from_config(load_config(args.config))
+        server.start()
+        host, port = server.address
+        logging.getLogger("hvps.server").info("Serving ws://%s:%s/", host, port)
+        server.serve_forever()
+        exit(0)
+
+    if args.brand == "daemon":
+        from hvps.exporter import load_config
+        from hvps.daemon import from_config
+
+        daemon = from_config(load_config(args.config), address=args.address)
+        daemon.start()
+        logging.getLogger("hvps.daemon").info(
+            "Serving %s on %s", list(daemon.pollers), daemon.address
+        )
+        daemon.serve_forever()
+        exit(0)
+
     # TODO: add validation for main call with --ports
     method = str(args.method[0]).lower() if args.method else None
     value = args.value
@@ -226,8 +295,18 @@ def main():
     is_channel_mode = channel is not None  # True if channel is specified, False if not
 
     if args.brand == "caen":
+        from hvps import Caen
+        from hvps.commands.caen.module import (
+            _MON_MODULE_COMMANDS as CAEN_MON_MODULE_COMMANDS,
+            _SET_MODULE_COMMANDS as CAEN_SET_MODULE_COMMANDS,
+        )
+        from hvps.commands.caen.channel import (
+            _MON_CHANNEL_COMMANDS as CAEN_MON_CHANNEL_COMMANDS,
+            _SET_CHANNEL_COMMANDS as CAEN_SET_CHANNEL_COMMANDS,
+        )
+
         module = args.module
-        caen = Caen(port=args.port, baudrate=args.baud)
+        caen = Caen(port=args.port, baudrate=args.baud, url=args.url)
         if not dry_run:
             caen.open()
 
@@ -278,7 +357,17 @@ def main():
         caen.close()
 
     elif args.brand == "iseg":
-        iseg = Iseg(port=args.port, baudrate=args.baud)
+        from hvps import Iseg
+        from hvps.commands.iseg.module import (
+            _MON_MODULE_COMMANDS as ISEG_MON_MODULE_COMMANDS,
+            _SET_MODULE_COMMANDS as ISEG_SET_MODULE_COMMANDS,
+        )
+        from hvps.commands.iseg.channel import (
+            _MON_CHANNEL_COMMANDS as ISEG_MON_CHANNEL_COMMANDS,
+            _SET_CHANNEL_COMMANDS as ISEG_SET_CHANNEL_COMMANDS,
+        )
+
+        iseg = Iseg(port=args.port, baudrate=args.baud, url=args.url)
         if not dry_run:
             iseg.open()
         module = iseg.module()
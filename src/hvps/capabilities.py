@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List
+
+import serial
+
+if TYPE_CHECKING:
+    from .devices.hvps import Hvps
+
+_logger = logging.getLogger(__name__)
+
+
+class UnsupportedCommandError(ValueError):
+    """
+    Raised, without sending it, for a command the model does not support according to the capability probe.
+
+    Attributes:
+        parameter (str): The parameter of the command (e.g. "IMRANGE" for CAEN, ":CONF:OUTPUT:MODE" for iseg).
+        model (str): The model and firmware of the board.
+    """
+
+    def __init__(self, parameter: str, model: str):
+        super().__init__(f"{parameter} is not supported by {model} (capability cache)")
+        self.parameter = parameter
+        self.model = model
+
+
+def default_path() -> str:
+    """
+    The default path of the capability cache: `capabilities.json` in the `HVPS_CACHE_DIR` directory, or in
+    `$XDG_CACHE_HOME/hvps` (`~/.cache/hvps` if not set).
+
+    Returns:
+        str: The path.
+    """
+    directory = os.environ.get("HVPS_CACHE_DIR")
+    if directory is None:
+        directory = os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache")), "hvps"
+        )
+    return os.path.join(os.path.expanduser(directory), "capabilities.json")
+
+
+class CapabilityCache:
+    def __init__(self, path: str | None = None):
+        """
+        The unsupported command parameters of each model and firmware, persisted as a JSON file.
+
+        The file is read on first use and written after each change (atomically, so concurrent processes never
+        read a partial file). A missing or invalid file is treated as empty.
+
+        Args:
+            path (str | None, optional): The path of the file. Defaults to `default_path()`.
+        """
+        self.path = path if path is not None else default_path()
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict] | None = None
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._models is None:
+            try:
+                with open(self.path, encoding="utf-8") as file:
+                    models = json.load(file)
+                if not isinstance(models, dict):
+                    raise ValueError("not an object")
+            except FileNotFoundError:
+                models = {}
+            except (OSError, ValueError) as e:
+                _logger.warning("Ignoring capability cache %s: %r", self.path, e)
+                models = {}
+            self._models = models
+        return self._models
+
+    def get(self, model: str) -> List[str] | None:
+        """
+        The unsupported parameters of a model.
+
+        Args:
+            model (str): The model and firmware (see `Hvps.probe_capabilities`).
+
+        Returns:
+            List[str] | None: The unsupported parameters, None if the model has not been probed.
+        """
+        with self._lock:
+            entry = self._load().get(model)
+        return None if entry is None else list(entry["unsupported"])
+
+    def set(self, model: str, unsupported: List[str]) -> None:
+        """
+        Record the unsupported parameters of a model and write the file.
+
+        Args:
+            model (str): The model and firmware.
+            unsupported (List[str]): The unsupported parameters.
+        """
+        with self._lock:
+            self._load()[model] = {
+                "unsupported": sorted(unsupported),
+                "probed": time.time(),
+            }
+            self._save()
+
+    def remove(self, model: str) -> None:
+        """
+        Forget a model, so that it is probed again.
+
+        Args:
+            model (str): The model and firmware.
+        """
+        with self._lock:
+            if self._load().pop(model, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        # called with the lock held
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self._models, file, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+
+def _supported(device: Hvps, bd: int, command: bytes) -> bool:
+    try:
+        return device._probe_command(bd, command)
+    except serial.SerialException:
+        raise
+    except ValueError as e:
+        # error response, or no response (CommandTimeoutError)
+        _logger.debug("Command %r not supported: %r", command, e)
+        return False
+
+
+def probe(
+    device: Hvps, cache: CapabilityCache | None = None, force: bool = False
+) -> Dict[int, Dict]:
+    """
+    Find the commands supported by each board of `device`, once per model and firmware (see
+    `Hvps.probe_capabilities`).
+
+    Args:
+        device (Hvps): The device, connected.
+        cache (CapabilityCache | None, optional): The cache. Defaults to a cache at `default_path()`.
+        force (bool, optional): Probe again the models already in the cache. Defaults to False.
+
+    Returns:
+        Dict[int, Dict]: For each board, its "model", "unsupported" parameters and whether it was "probed" (False if
+        read from the cache).
+    """
+    if cache is None:
+        cache = CapabilityCache()
+    results = {}
+    for bd in device._capability_boards():
+        model = device._model(bd)
+        unsupported = None if force else cache.get(model)
+        probed = unsupported is None
+        if probed:
+            _logger.info("Probing the capabilities of %s (board %d)", model, bd)
+            unsupported = sorted(
+                {
+                    parameter
+                    for parameter, command in device._capability_commands(bd).items()
+                    if not _supported(device, bd, command)
+                }
+            )
+            cache.set(model, unsupported)
+        device._unsupported[bd] = (model, frozenset(unsupported))
+        results[bd] = {"model": model, "unsupported": unsupported, "probed": probed}
+    return results
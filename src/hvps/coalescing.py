@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("generation", "done", "result", "error", "time", "waiters")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = False
+        self.result = None
+        self.error: BaseException | None = None
+        self.time = 0.0
+        self.waiters = 0
+
+
+class ReadCoalescer:
+    def __init__(self, freshness: float = 0.0):
+        """
+        Single-flight coalescing of identical reads.
+
+        While a read is in progress, other callers asking for the same key (e.g. the same command to the same board
+        and channel) wait for it and share its result (or its exception) instead of sending the command again.
+        A result is also reused by the calls made within `freshness` seconds after it was received.
+
+        Writes call `invalidate`: results received before are not reused, and reads started before are not joined.
+
+        Args:
+            freshness (float, optional): How long a result can be reused after it was received, in seconds.
+                0 to only share reads in progress. Defaults to 0.0.
+        """
+        if freshness < 0:
+            raise ValueError(f"Freshness must not be negative, got {freshness}")
+        self.freshness = freshness
+        self._condition = threading.Condition(threading.Lock())
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._generation = 0
+        # number of reads sent, and shared with a read in progress or reused from a fresh result
+        self.reads = 0
+        self.shared = 0
+        self.reused = 0
+
+    def read(self, key: Hashable, function: Callable[[], T]) -> T:
+        """
+        Get the result of `function`, sharing it with the concurrent callers with the same key.
+
+        Args:
+            key (Hashable): Identifies the read (e.g. the command bytes).
+            function (Callable[[], T]): Performs the read.
+
+        Returns:
+            T: The result of `function`, possibly from another call.
+        """
+        with self._condition:
+            flight = self._flights.get(key)
+            if flight is not None and flight.generation == self._generation:
+                if not flight.done:
+                    self.shared += 1
+                    flight.waiters += 1
+                    while not flight.done:
+                        self._condition.wait()
+                    return _result(flight)
+                if (
+                    flight.error is None
+                    and time.monotonic() - flight.time <= self.freshness
+                ):
+                    self.reused += 1
+                    return flight.result
+            flight = self._flights[key] = _Flight(self._generation)
+            self.reads += 1
+
+        try:
+            flight.result = function()
+        except BaseException as e:
+            flight.error = e
+        with self._condition:
+            flight.done = True
+            flight.time = time.monotonic()
+            if self.freshness == 0 or flight.error is not None:
+                # keep completed reads only while they can be reused
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            if flight.waiters:
+                self._condition.notify_all()
+        return _result(flight)
+
+    def invalidate(self) -> None:
+        """Do not reuse or join the reads started so far (called after a write)."""
+        with self._condition:
+            self._generation += 1
+            self._flights = {
+                key: flight for key, flight in self._flights.items() if not flight.done
+            }
+
+    def snapshot(self) -> Dict:
+        """
+        The counters of the coalescer.
+
+        Returns:
+            Dict: With keys "freshness", "reads" (sent to the device), "shared" (joined a read in progress) and
+            "reused" (served from a fresh result).
+        """
+        with self._condition:
+            return {
+                "freshness": self.freshness,
+                "reads": self.reads,
+                "shared": self.shared,
+                "reused": self.reused,
+            }
+
+
+def _result(flight: _Flight):
+    if flight.error is not None:
+        raise flight.error
+    return flight.result
+
+
+class WriteCoalescer:
+    def __init__(self, logger: logging.Logger | logging.LoggerAdapter | None = None):
+        """
+        Last-writer-wins coalescing of setpoint writes (disabled by default).
+
+        While enabled, setpoint setters (e.g. `vset`, `voltage_set`) return immediately: the write (including its
+        read-back verification) is queued and sent by a background thread as soon as the previous ones are done.
+        A write to a setpoint that already has a write waiting replaces it, and the replaced value is never sent
+        (counted as dropped), so a slider or a control loop updating a setpoint faster than the bus can handle
+        never builds up a queue. Writes to different setpoints are sent in order of first submission.
+
+        Errors of the background writes are logged, counted, and raised by the next `flush`.
+
+        Args:
+            logger (logging.Logger | logging.LoggerAdapter | None, optional): Logger for the errors of the
+                background writes. Defaults to the logger of this module.
+        """
+        self.enabled = False
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+        self._condition = threading.Condition(threading.Lock())
+        self._pending: Dict[Hashable, Callable[[], None]] = {}
+        self._writing = False
+        self._thread: threading.Thread | None = None
+        self._error: BaseException | None = None
+        self.submitted = 0
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def submit(self, key: Hashable, function: Callable[[], None]) -> None:
+        """
+        Queue a write, replacing the write waiting for the same key if any.
+
+        Args:
+            key (Hashable): Identifies the setpoint (e.g. the channel and the setter name).
+            function (Callable[[], None]): Performs the write.
+        """
+        with self._condition:
+            self.submitted += 1
+            if key in self._pending:
+                self.dropped += 1
+            self._pending[key] = function
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="hvps-writes", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending:
+                    self._thread = None
+                    self._condition.notify_all()
+                    return
+                key = next(iter(self._pending))
+                function = self._pending.pop(key)
+                self._writing = True
+            try:
+                function()
+            except Exception as e:
+                self._logger.error("Background write failed: %r", e)
+                with self._condition:
+                    self.errors += 1
+                    self._error = e
+            with self._condition:
+                self.sent += 1
+                self._writing = False
+
+    def flush(self, timeout: float | None = None) -> None:
+        """
+        Wait until all the queued writes have been sent.
+
+        Args:
+            timeout (float | None, optional): The maximum time to wait, in seconds. Defaults to None (no limit).
+
+        Raises:
+            TimeoutError: If the writes are not done within `timeout`.
+            Exception: The last error of a background write since the previous flush, if any.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._thread is None, timeout=timeout
+            ):
+                raise TimeoutError(
+                    f"{len(self._pending) + self._writing} writes still pending"
+                )
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def snapshot(self) -> Dict:
+        """
+        The counters of the coalescer.
+
+        Returns:
+            Dict: With keys "enabled", "pending" (writes waiting), "submitted", "sent", "dropped" (replaced by a
+            later write before being sent) and "errors".
+        """
+        with self._condition:
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._pending),
+                "submitted": self.submitted,
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
+
+
+def coalesced_write(setter: Callable) -> Callable:
+    """
+    Decorate a setpoint setter of a channel so that it goes through the write coalescer of the device when it is
+    enabled (see `WriteCoalescer`).
+    """
+
+    @functools.wraps(setter)
+    def wrapper(self, value) -> None:
+        coalescer = self._write_coalescer
+        if coalescer is None or not coalescer.enabled:
+            return setter(self, value)
+        coalescer.submit((self, setter.__name__), lambda: setter(self, value))
+
+    return wrapper
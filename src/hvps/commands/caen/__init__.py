@@ -1,10 +1,18 @@
 from __future__ import annotations
+import functools
 import re
+import time
+from typing import Dict, List, Tuple
 
 import logging
 import serial
 import threading
 
+from .module import _get_mon_module_command
+from ...instrumentation import _stats
+from ...scheduling import _slot
+from ...timeouts import AdaptiveTimeouts, _discard_input, _read_timeout
+
 
 def _write_command_read_response(
     ser: serial.Serial,
@@ -13,32 +21,213 @@ def _write_command_read_response(
     bd: int,
     command: bytes,
     response: bool = True,
+    timeouts: AdaptiveTimeouts | None = None,
 ) -> str | None:
     """
     Write a command to a device and read the response.
+
+    The response is read with the timeout given by `timeouts` (learned latency, deadline of the context) or the
+    timeout of the port. A `hvps.timeouts.CommandTimeoutError` is raised if it does not arrive in time.
+    """
+    with _stats.timer(ser, command, bd, _command_mnemonic) as timer:
+        with _slot(lock, _command_priority(command)):
+            timer.lap("lock_wait")
+            logger.debug("Sending command: %s", command)
+            if not ser.is_open:
+                logger.error("Serial port is not open")
+                raise serial.SerialException("Serial port is not open")
+
+            if not response:
+                timer.write(ser, command)
+                logger.warning(
+                    "Calling _write_command without expecting a response. Manual readout of the response is required."
+                )
+                return None
+
+            with _read_timeout(ser, timeouts, command, _command_mnemonic) as read:
+                timer.write(ser, command)
+                response = read.check(timer.readline(ser))
+            logger.debug("Received response: %s", response)
+            bd_from_response, response_value = _parse_response(response)
+            timer.lap("parse")
+            if bd_from_response != bd:
+                raise ValueError(
+                    f"Invalid response: {response_value}. Expected board number {bd}, got {bd_from_response}"
+                )
+
+            return response_value
+
+
+_MNEMONIC_REGEX = re.compile(rb"CMD:(\w+).*?PAR:(\w+)")
+
+
+# commands are classified several times each (statistics, timeouts, scheduler), memoized as they repeat
+@functools.lru_cache(maxsize=1024)
+def _command_mnemonic(command: bytes) -> str:
+    """The mnemonic of a command used to group statistics, e.g. "MON:VMON" for b"$BD:00,CMD:MON,CH:0,PAR:VMON\r\n"."""
+    match = _MNEMONIC_REGEX.search(command)
+    if match is None:
+        return "UNKNOWN"
+    return f"{match.group(1).decode()}:{match.group(2).decode()}"
+
+
+def _command_parameter(command: bytes) -> str:
+    """The parameter of a command, shared by its MON and SET forms, e.g. "VSET" (see `hvps.capabilities`)."""
+    match = _MNEMONIC_REGEX.search(command)
+    if match is None:
+        return "UNKNOWN"
+    return match.group(2).decode()
+
+
+# commands that switch channels off or clear alarms, served first by the scheduler of the port
+_EMERGENCY_COMMANDS = (b"PAR:OFF\r\n", b"PAR:BDCLR\r\n")
+
+
+@functools.lru_cache(maxsize=1024)
+def _command_priority(command: bytes) -> str:
+    """The default priority class of a command (see `hvps.scheduling`)."""
+    if command.endswith(_EMERGENCY_COMMANDS):
+        return "emergency"
+    if b"CMD:SET" in command:
+        return "set"
+    return "interactive"
+
+
+def _write_commands_read_responses(
+    ser: serial.Serial,
+    lock: threading.Lock,
+    logger: logging.Logger,
+    commands: List[bytes],
+    timeout: float,
+) -> List[Tuple[int, str | None]]:
+    """
+    Write several commands in a single burst (pipelining) and read the responses.
+
+    Responses are collected until all commands have been answered or no data arrives during `timeout` seconds
+    (after the time needed to transmit the burst). Commands addressed to a board that does not exist are not
+    answered, so the number of responses may be smaller than the number of commands. In that case the input is then
+    discarded until the line has been quiet for `timeout` seconds, so late responses are not read by the next
+    command.
+
+    Args:
+        ser (serial.Serial): The serial port.
+        lock (threading.Lock): The lock of the serial port.
+        logger (logging.Logger): The logger.
+        commands (List[bytes]): The commands to write.
+        timeout (float): The time to wait for the next response, in seconds.
+
+    Returns:
+        List[Tuple[int, str | None]]: The board number and value of each valid response, in order of arrival.
     """
+    data = b"".join(commands)
+    responses = []
+    start = time.monotonic()
     with lock:
-        logger.debug(f"Sending command: {command}")
+        logger.debug("Sending %d pipelined commands", len(commands))
         if not ser.is_open:
             logger.error("Serial port is not open")
             raise serial.SerialException("Serial port is not open")
 
-        ser.write(command)
-        if not response:
-            logger.warning(
-                "Calling _write_command without expecting a response. Manual readout of the response is required."
-            )
-            return None
-
-        response = ser.readline()
-        logger.debug(f"Received response: {response}")
-        bd_from_response, response_value = _parse_response(response)
-        if bd_from_response != bd:
-            raise ValueError(
-                f"Invalid response: {response_value}. Expected board number {bd}, got {bd_from_response}"
+        previous_timeout = ser.timeout
+        try:
+            ser.write(data)
+            # responses to the last commands cannot arrive before the whole burst has been transmitted
+            # (10 bits per byte on the line)
+            transmitted_at = time.monotonic() + len(data) * 10 / float(ser.baudrate)
+            while len(responses) < len(commands):
+                ser.timeout = max(transmitted_at - time.monotonic(), 0) + timeout
+                response = ser.readline()
+                if not response.endswith(b"\n"):
+                    # a late or incomplete response would be read as the response to the next command
+                    ser.timeout = timeout
+                    _discard_input(ser)
+                    break
+                logger.debug("Received response: %s", response)
+                try:
+                    responses.append(_parse_response(response))
+                except ValueError as e:
+                    logger.debug("Ignoring invalid response: %s", e)
+        finally:
+            ser.timeout = previous_timeout
+
+    if _stats.enabled:
+        _stats.burst(
+            ser,
+            _answered(commands, responses),
+            time.monotonic() - start,
+            _command_mnemonic,
+        )
+    return responses
+
+
+def _answered(
+    commands: List[bytes], responses: List[Tuple[int, str | None]]
+) -> List[Tuple[bytes, int]]:
+    # each board answers its commands in order, the commands to missing boards are not answered
+    pending: Dict[int, List[bytes]] = {}
+    for command in commands:
+        pending.setdefault(int(command[4:6]), []).append(command)
+    answered = []
+    for bd, _ in responses:
+        if pending.get(bd):
+            answered.append((pending[bd].pop(0), bd))
+    return answered
+
+
+def _scan_boards(
+    ser: serial.Serial,
+    lock: threading.Lock,
+    logger: logging.Logger,
+    timeout: float,
+    pipeline: bool = True,
+) -> Dict[int, Dict]:
+    """
+    Find the boards present on the serial line (daisy chain) by probing all 32 board addresses.
+
+    Args:
+        ser (serial.Serial): The serial port.
+        lock (threading.Lock): The lock of the serial port.
+        logger (logging.Logger): The logger.
+        timeout (float): The time to wait for a board to answer, in seconds.
+        pipeline (bool, optional): Send the probes in a single burst. Defaults to True.
+            Disable it if responses of different boards collide on the line.
+
+    Returns:
+        Dict[int, Dict]: For each board found, its "name", "number_of_channels" and "serial_number".
+    """
+
+    def query(boards: List[int], command: str) -> Dict[int, str | None]:
+        commands = [_get_mon_module_command(bd=bd, command=command) for bd in boards]
+        if pipeline:
+            responses = _write_commands_read_responses(
+                ser, lock, logger, commands, timeout
             )
+        else:
+            responses = []
+            for command in commands:
+                responses += _write_commands_read_responses(
+                    ser, lock, logger, [command], timeout
+                )
+        return {bd: value for bd, value in responses if bd in boards}
+
+    names = query(list(range(32)), "BDNAME")
+    boards = sorted(names.keys())
+    if not boards:
+        return {}
+
+    number_of_channels = query(boards, "BDNCH")
+    serial_numbers = query(boards, "BDSNUM")
 
-        return response_value
+    return {
+        bd: {
+            "name": names[bd],
+            "number_of_channels": int(number_of_channels[bd])
+            if number_of_channels.get(bd) is not None
+            else None,
+            "serial_number": serial_numbers.get(bd),
+        }
+        for bd in boards
+    }
 
 
 def _parse_response(response: bytes) -> (int, str):
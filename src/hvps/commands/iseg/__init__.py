@@ -1,4 +1,5 @@
 from __future__ import annotations
+import functools
 from typing import List
 
 import logging
@@ -6,6 +7,10 @@ import serial
 import re
 import threading
 
+from ...instrumentation import _stats
+from ...scheduling import _slot
+from ...timeouts import AdaptiveTimeouts, _read_timeout
+
 
 def _write_command_read_response(
     ser: serial.Serial,
@@ -14,26 +19,80 @@ def _write_command_read_response(
     command: bytes,
     expected_response_type: type | None,
     response: bool = True,
+    timeouts: AdaptiveTimeouts | None = None,
 ) -> List[str] | None:
-    with lock:
-        logger.debug(f"Send command: {command}")
-        ser.write(command)
-        if not response:
-            return None
-
-        # echo reading
-        response = ser.readline()
-        logger.debug(f"Received response: {response}")
-        if response != command:
-            raise ValueError(
-                f"Invalid handshake echo response: {response}. expected {command}"
-            )
+    """
+    Write a command to a device and read the echo and the response.
+
+    The echo and the response are read with the timeout given by `timeouts` (learned latency, deadline of the
+    context) or the timeout of the port. A `hvps.timeouts.CommandTimeoutError` is raised if they do not arrive in time.
+    """
+    with _stats.timer(ser, command, 0, _command_mnemonic) as timer:
+        with _slot(lock, _command_priority(command)):
+            timer.lap("lock_wait")
+            logger.debug("Send command: %s", command)
+            if not response:
+                timer.write(ser, command)
+                return None
+
+            with _read_timeout(ser, timeouts, command, _command_mnemonic) as read:
+                timer.write(ser, command)
+
+                # echo reading
+                response = read.check(timer.readline(ser))
+                logger.debug("Received response: %s", response)
+                if response != command:
+                    raise ValueError(
+                        f"Invalid handshake echo response: {response}. expected {command}"
+                    )
+
+                # response reading
+                response = read.check(timer.readline(ser))
+            response = _parse_response(response, expected_response_type)
+            timer.lap("parse")
+
+            return response
+
+
+_MNEMONIC_REGEX = re.compile(rb"^\s*([^\s?,;]+)(\?)?")
+
+
+# commands are classified several times each (statistics, timeouts, scheduler), memoized as they repeat
+@functools.lru_cache(maxsize=1024)
+def _command_mnemonic(command: bytes) -> str:
+    """The mnemonic of a command used to group statistics, e.g. ":MEAS:VOLT?" for b":MEAS:VOLT? (@0)\r\n"."""
+    match = _MNEMONIC_REGEX.match(command)
+    if match is None:
+        return "UNKNOWN"
+    return match.group(0).decode("ascii", "replace").strip().upper()
+
+
+def _command_parameter(command: bytes) -> str:
+    """
+    The parameter of a command, shared by its query and setting forms, e.g. ":CONF:OUTPUT:MODE (@)" for
+    b":CONF:OUTPUT:MODE? (@0)\r\n" (see `hvps.capabilities`). Channel commands are suffixed with " (@)", as some
+    headers exist for modules and channels.
+    """
+    match = _MNEMONIC_REGEX.match(command)
+    if match is None:
+        return "UNKNOWN"
+    parameter = match.group(1).decode("ascii", "replace").upper()
+    return f"{parameter} (@)" if b"(@" in command else parameter
+
+
+# commands that switch channels off, served first by the scheduler of the port
+_EMERGENCY_COMMANDS = (b":VOLT OFF", b":VOLT EMCY OFF")
 
-        # response reading
-        response = ser.readline()
-        response = _parse_response(response, expected_response_type)
 
-        return response
+@functools.lru_cache(maxsize=1024)
+def _command_priority(command: bytes) -> str:
+    """The default priority class of a command (see `hvps.scheduling`)."""
+    if command.startswith(_EMERGENCY_COMMANDS):
+        return "emergency"
+    match = _MNEMONIC_REGEX.match(command)
+    if match is not None and match.group(2) is None:
+        return "set"
+    return "interactive"
 
 
 def _parse_response(
@@ -237,7 +237,7 @@ _MON_CHANNEL_COMMANDS = {
         "description": "Query the Channel Status register.",
     },
     "channel_event_mask": {
-        "command": "READ:CHAN:EVENT:MASK",
+        "command": ":READ:CHAN:EVENT:MASK",
         "input_type": None,
         "allowed_input_values": [],
         "output_type": int,
@@ -506,15 +506,16 @@ def _get_mon_channel_command(channel: int, command: str) -> bytes:
 
 
 def _get_set_channel_command(
-    channel: int, command: str, value: str | int | float | None
+    channel: int | str, command: str, value: str | int | float | None
 ) -> bytes:
     """
     Generates an order command as a bytes object to set a value for a specific channel.
 
     Args:
-        channel (int): The channel number.
+        channel (int | str): The channel number, or a channel list (e.g. "0-3") to set several channels at once.
         command (str): The base command without the value and channel suffix.
-        value (str | int | float | None): The value to be set. Can be a string, integer, float, or None.
+        value (str | int | float | None): The value to be set. Can be a string, integer, float, or None
+            (for commands without value, e.g. ":VOLT ON").
 
     Returns:
         bytes: The order command as a bytes object.
@@ -531,12 +532,15 @@ def _get_set_channel_command(
         print(order_command)
         b':VOLT 200,(@4);*OPC?\r\n'
     """
-    if channel < 0:
+    if isinstance(channel, int) and channel < 0:
         raise ValueError(
             f"Invalid channel '{channel}'. Valid channels are positive integers."
         )
     command = command.upper()
 
+    if value is None:
+        return f"{command.strip()},(@{channel});*OPC?\r\n".encode("ascii")
+
     if isinstance(value, float):
         value = f"{value:.3E}"
 
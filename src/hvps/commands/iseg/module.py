@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from typing import List
 
 # TODO: change values for dictionary with possible values and description
 _MON_MODULE_COMMANDS = {
@@ -172,10 +173,10 @@ _MON_MODULE_COMMANDS = {
         "description": "Query the Module Event Channel Mask register",
     },
     "module_supply_voltage": {
-        "command": ":READ:MODULE:SUPPLY? (@0-6)",
+        "command": ":READ:MODULE:SUPPLY (@0-6)",
         "input_type": None,
         "allowed_input_values": [],
-        "output_type": str,
+        "output_type": List[float],
         "possible_output_values": [],
         "description": "Query the module supply voltages",
     },
@@ -366,6 +367,14 @@ _SET_MODULE_COMMANDS = {
         "possible_output_values": [],
         "description": "Set the device to configuration mode to change settings.",
     },
+    "exit_configuration_mode": {
+        "command": ":SYSTEM:USER:CONFIG",
+        "input_type": int,
+        "allowed_input_values": [0],
+        "output_type": None,
+        "possible_output_values": [],
+        "description": "Set the device back to normal mode.",
+    },
     "reset_module_event_status": {
         "command": ":CONF:EVENT CLEAR",
         "input_type": None,
@@ -433,7 +442,8 @@ def _get_mon_module_command(command: str) -> bytes:
     Generates a query command string for monitoring a specific module.
 
     Args:
-        command (str): The base command without the query symbol.
+        command (str): The base command without the query symbol. It may be followed by a list (e.g. " (@0-6)"),
+            which is kept after the query symbol.
 
     Returns:
         bytes: The query command string as bytes.
@@ -448,7 +458,10 @@ def _get_mon_module_command(command: str) -> bytes:
         b':MEAS:CURR?\r\n'
     """
     command = command.upper()
-    return f"{command.strip()}?\r\n".encode("ascii")
+    header, _, arguments = command.strip().partition(" ")
+    if arguments:
+        return f"{header}? {arguments.strip()}\r\n".encode("ascii")
+    return f"{header}?\r\n".encode("ascii")
 
 
 def _get_set_module_command(command: str, value: str | int | float | None) -> bytes:
@@ -457,7 +470,8 @@ def _get_set_module_command(command: str, value: str | int | float | None) -> by
 
     Args:
         command (str): The base command without the value and channel suffix.
-        value (str | int | float | None): The value to be set. Can be a string, integer, float, or None.
+        value (str | int | float | None): The value to be set. Can be a string, integer, float, or None
+            (for commands without value).
 
     Returns:
         bytes: The order command as a bytes object.
@@ -474,6 +488,9 @@ def _get_set_module_command(command: str, value: str | int | float | None) -> by
     """
     command = command.upper()
 
+    if value is None:
+        return f"{command.strip()};*OPC?\r\n".encode("ascii")
+
     if isinstance(value, float):
         value = f"{value:.3E}"
 
@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import functools
+import itertools
+import json
+import logging
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from typing import Dict, List, Tuple
+
+import serial
+
+from .polling import Poller
+
+# a socket only the user of the daemon can connect to, where available: the protocol has no authentication, and
+# TCP (the exporter listens on 9560) is open to all the local users
+if hasattr(socket, "AF_UNIX"):
+    DEFAULT_ADDRESS = "unix:" + os.path.join(
+        os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), "hvps.sock"
+    )
+else:  # windows
+    DEFAULT_ADDRESS = "127.0.0.1:9561"
+
+# permissions of the Unix socket
+_SOCKET_MODE = 0o600
+
+# the daemon owns the ports, clients cannot close them
+_FORBIDDEN = {"connect", "open", "disconnect", "close"}
+
+_logger = logging.getLogger(__name__)
+
+
+def _parse_address(address: str) -> Tuple[int, object]:
+    """The socket family and address of "unix:<path>" or "<host>:<port>"."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(
+            f"Invalid address {address!r}, must be 'unix:<path>' or '<host>:<port>'"
+        )
+    return socket.AF_INET, (host, int(port))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: _TcpServer | _UnixServer
+
+    def handle(self):
+        for line in self.rfile:
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get("id")
+                response = {
+                    "id": request_id,
+                    "result": self.server.daemon.execute(request),
+                }
+            except Exception as e:
+                _logger.debug("Request %r failed: %r", line, e)
+                response = {
+                    "id": request_id,
+                    "error": {
+                        "type": type(e).__name__,
+                        "message": str(e),
+                        "value_error": isinstance(e, ValueError),
+                        "serial": isinstance(e, serial.SerialException),
+                    },
+                }
+            self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, daemon: Daemon):
+        super().__init__(address, _Handler)
+        self.daemon = daemon
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, address, daemon: Daemon):
+            if os.path.exists(address):
+                # left by a daemon that did not stop cleanly
+                os.unlink(address)
+            super().__init__(address, _Handler)
+            self.daemon = daemon
+
+        def server_bind(self):
+            super().server_bind()
+            os.chmod(self.server_address, _SOCKET_MODE)
+
+        def server_close(self):
+            super().server_close()
+            if os.path.exists(self.server_address):
+                os.unlink(self.server_address)
+
+else:  # windows
+    _UnixServer = None
+
+
+class Daemon:
+    def __init__(self, pollers: List[Poller], address: str = DEFAULT_ADDRESS):
+        """
+        Own the serial ports of several devices and share them with other processes (see `Client`).
+
+        The daemon runs one poller per device, and serves a local protocol (one JSON object per line, over a Unix
+        socket or TCP) that mirrors the `Caen` and `Iseg` objects: properties of the devices, modules and channels
+        are read and written, and their methods called, in the daemon. All the clients then share the command
+        stack of each device: identical reads are coalesced, set commands are scheduled before background polling,
+        and the values monitored by the pollers are served from their snapshots without touching the port.
+
+        Args:
+            pollers (List[Poller]): One poller per device, the devices are named after the pollers.
+            address (str, optional): "unix:<path>" or "<host>:<port>" (port 0 to pick a free one). Unix sockets
+                are only accessible to the user of the daemon. The protocol has no authentication: on TCP, any local
+                user (any host, if not listening on the loopback) can use the devices. Defaults to `DEFAULT_ADDRESS`,
+                "hvps.sock" in `$XDG_RUNTIME_DIR` or the temporary directory (127.0.0.1:9561 on Windows).
+        """
+        self.pollers = {poller.name: poller for poller in pollers}
+        if len(self.pollers) != len(pollers):
+            raise ValueError("Each device needs a distinct name")
+        _parse_address(address)
+        self._address = address
+        self._server: _TcpServer | _UnixServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> str:
+        """The address the daemon listens on (with the port picked if 0)."""
+        if self._server is None or self._address.startswith("unix:"):
+            return self._address
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> None:
+        """Connect the devices, start the pollers and serve in a background thread."""
+        if self._server is not None:
+            return
+        family, address = _parse_address(self._address)
+        if family == socket.AF_UNIX:
+            if _UnixServer is None:
+                raise ValueError("Unix sockets are not available, use '<host>:<port>'")
+            self._server = _UnixServer(address, self)
+        else:
+            self._server = _TcpServer(address, self)
+        for name, poller in self.pollers.items():
+            try:
+                poller.device.connect()
+            except Exception as e:
+                # connected again by the poller and by the requests
+                _logger.warning("Could not connect %s: %r", name, e)
+            poller.start()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="hvps-daemon", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving, stop the pollers and close the ports."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+        for poller in self.pollers.values():
+            poller.stop()
+            poller.device.disconnect()
+
+    def __enter__(self) -> Daemon:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def serve_forever(self) -> None:
+        """Start and block until interrupted (KeyboardInterrupt), then stop."""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _poller(self, name: str) -> Poller:
+        poller = self.pollers.get(name)
+        if poller is None:
+            raise ValueError(
+                f"Unknown device {name!r}, available: {list(self.pollers)}"
+            )
+        return poller
+
+    def _target(self, request: Dict) -> object:
+        device = self._poller(request["device"]).device
+        if not device.connected:
+            device.connect()
+        target = device
+        if request.get("module") is not None:
+            target = target.module(request["module"])
+        if request.get("channel") is not None:
+            target = target.channel(request["channel"])
+        return target
+
+    def execute(self, request: Dict) -> object:
+        """
+        Execute a request of a client.
+
+        Args:
+            request (Dict): With key "op", one of:
+                "devices": the brand of each device, by name.
+                "snapshot": the samples of the last pass of the poller of "device" (of all the devices if not given).
+                "get", "set" and "call": read the property "name" (or find that it is a method), write "value" to it,
+                    or call the method with "args" and "kwargs", on the "device", "module" (optional) and "channel"
+                    (optional). Only the properties of modules and channels can be written.
+
+        Returns:
+            object: The result (JSON serializable).
+
+        Raises:
+            ValueError: If the request is not valid.
+        """
+        op = request.get("op")
+        if op == "devices":
+            return {name: poller.device._brand for name, poller in self.pollers.items()}
+        if op == "snapshot":
+            if request.get("device") is None:
+                return [
+                    sample
+                    for poller in self.pollers.values()
+                    for sample in poller.snapshot()
+                ]
+            return self._poller(request["device"]).snapshot()
+        if op not in ("get", "set", "call"):
+            raise ValueError(f"Invalid operation {op!r}")
+
+        name = request.get("name", "")
+        if name.startswith("_") or name in _FORBIDDEN:
+            raise ValueError(f"{name!r} cannot be used remotely")
+        target = self._target(request)
+        attribute = getattr(type(target), name, None)
+        if attribute is None:
+            raise ValueError(f"{type(target).__name__} has no attribute {name!r}")
+        if op == "get":
+            if isinstance(attribute, property):
+                return {"value": getattr(target, name)}
+            return {"method": callable(attribute)}
+        if op == "set":
+            if not isinstance(attribute, property) or attribute.fset is None:
+                raise ValueError(f"{name!r} cannot be set")
+            if target is self._poller(request["device"]).device:
+                # the properties of the device configure its port (port, baudrate, timeout), owned by the daemon
+                raise ValueError(f"{name!r} of the device cannot be set remotely")
+            setattr(target, name, request.get("value"))
+            return None
+        if isinstance(attribute, property):
+            raise ValueError(f"{name!r} is not a method")
+        return getattr(target, name)(
+            *request.get("args", []), **request.get("kwargs", {})
+        )
+
+
+class _Remote:
+    # properties are read and written, and methods called, in the daemon
+    def __init__(self, client: Client, path: Dict):
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_path", path)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        result = self._client._request(op="get", name=name, **self._path)
+        if "method" in result:
+            return functools.partial(self._call, name)
+        return result["value"]
+
+    def __setattr__(self, name: str, value) -> None:
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+            return
+        self._client._request(op="set", name=name, value=value, **self._path)
+
+    def _call(self, name: str, *args, **kwargs):
+        return self._client._request(
+            op="call", name=name, args=list(args), kwargs=kwargs, **self._path
+        )
+
+    def __repr__(self) -> str:
+        path = ", ".join(f"{key}={value!r}" for key, value in self._path.items())
+        return f"<{type(self).__name__} {path}>"
+
+
+class RemoteChannel(_Remote):
+    @property
+    def channel(self) -> int:
+        return self._path["channel"]
+
+
+class RemoteModule(_Remote):
+    @property
+    def module(self) -> int:
+        return self._path["module"]
+
+    def channel(self, channel: int) -> RemoteChannel:
+        return RemoteChannel(self._client, {**self._path, "channel": channel})
+
+    @property
+    def channels(self) -> List[RemoteChannel]:
+        return [self.channel(channel) for channel in range(self.number_of_channels)]
+
+
+class RemoteDevice(_Remote):
+    def module(self, module: int = 0) -> RemoteModule:
+        return RemoteModule(self._client, {**self._path, "module": module})
+
+    def snapshot(self) -> List[Dict]:
+        """The samples of the last pass of the poller of the device in the daemon (no serial traffic)."""
+        return self._client._request(op="snapshot", **self._path)
+
+
+class Client:
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float | None = None):
+        """
+        Connect to a `Daemon`. The devices of the daemon are used through objects with the API of the `Caen` and
+        `Iseg` objects (`client.device(name).module(0).channel(1).vset = 100.0`).
+
+        Values are converted to JSON on the way (e.g. the board numbers returned by `scan_boards` become strings).
+        Errors are raised as ValueError (including the subclasses, e.g. timeouts) or `serial.SerialException` if
+        they are so in the daemon, RuntimeError otherwise.
+
+        Args:
+            address (str, optional): The address of the daemon. Defaults to `DEFAULT_ADDRESS`.
+            timeout (float | None, optional): The time to wait for each response, in seconds. Defaults to None.
+        """
+        family, socket_address = _parse_address(address)
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_address)
+        if family == socket.AF_INET:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile("rb")
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def _request(self, **request) -> object:
+        with self._lock:
+            request["id"] = next(self._ids)
+            self._socket.sendall(json.dumps(request).encode() + b"\n")
+            line = self._file.readline()
+        if not line:
+            raise serial.SerialException("Connection to the daemon closed")
+        response = json.loads(line)
+        if response.get("id") != request["id"]:
+            raise RuntimeError(
+                f"Response to request {response.get('id')} instead of {request['id']}"
+            )
+        error = response.get("error")
+        if error is None:
+            return response["result"]
+        message = f"{error['type']}: {error['message']}"
+        if error["serial"]:
+            raise serial.SerialException(message)
+        if error["value_error"]:
+            raise ValueError(message)
+        raise RuntimeError(message)
+
+    def devices(self) -> Dict[str, str]:
+        """The brand of each device of the daemon, by name."""
+        return self._request(op="devices")
+
+    def device(self, name: str) -> RemoteDevice:
+        """The device `name` (see `devices`)."""
+        return RemoteDevice(self, {"device": name})
+
+    def snapshot(self) -> List[Dict]:
+        """The samples of the last pass of all the pollers of the daemon (no serial traffic)."""
+        return self._request(op="snapshot")
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self) -> Client:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def from_config(config: Dict, address: str | None = None) -> Daemon:
+    """
+    Create the daemon described by a configuration (see `hvps.exporter.load_config`), with one poller per device,
+    listening on the `address` of the `[daemon]` table.
+
+    Args:
+        config (Dict): The configuration.
+        address (str | None, optional): Replaces the address of the configuration. Defaults to None.
+
+    Returns:
+        Daemon: The daemon (not started).
+    """
+    from .exporter import _pollers
+
+    if address is None:
+        address = config.get("daemon", {}).get("address", DEFAULT_ADDRESS)
+    return Daemon(_pollers(config), address=address)
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+
+_logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    time REAL NOT NULL,
+    crate TEXT NOT NULL,
+    board INTEGER NOT NULL,
+    channel INTEGER NOT NULL,
+    vmon REAL,
+    imon REAL,
+    vset REAL,
+    status INTEGER
+);
+CREATE INDEX IF NOT EXISTS samples_channel_time ON samples (crate, board, channel, time);
+CREATE TABLE IF NOT EXISTS transitions (
+    time REAL NOT NULL,
+    crate TEXT NOT NULL,
+    board INTEGER NOT NULL,
+    channel INTEGER NOT NULL,
+    bit TEXT NOT NULL,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transitions_channel_time ON transitions (crate, board, channel, time);
+"""
+
+# the columns of the samples table that can be downsampled
+FIELDS = ["vmon", "imon", "vset"]
+
+
+class SqliteLogger:
+    def __init__(
+        self,
+        path: str,
+        queue_size: int = 1024,
+        batch_size: int = 10000,
+    ):
+        """
+        Write the samples of the pollers, and the transitions of their status bits, to a SQLite database in WAL
+        mode, for tools that expect SQL. Add `publish` as a sink of the pollers, and `start` the logger (or use it as
+        a context manager).
+
+        `publish` only puts the samples of the pass in a queue of `queue_size` passes: a background thread inserts
+        them, many passes per transaction, so the pollers never wait for the disk. When the queue is full (the disk
+        cannot keep up) the pass is dropped and counted in `dropped`.
+
+        Tables (indexed on crate, board, channel and time):
+            samples: time, crate, board, channel, vmon (V), imon (A), vset (V), status (status register).
+            transitions: time, crate, board, channel, bit (name of the status bit), value (0 or 1), when a status bit
+                changes (the first sample of a channel records all its bits).
+
+        Example:
+            with SqliteLogger("monitor.db") as database:
+                poller.add_sink(database.publish)
+                ...
+                vmon = database.downsample("crate-1", 0, 3, "vmon", interval=60.0)
+
+        Args:
+            path (str): The database file, created if needed.
+            queue_size (int, optional): The maximum number of passes waiting to be written. Defaults to 1024.
+            batch_size (int, optional): The maximum number of samples per transaction. Defaults to 10000.
+        """
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError(
+                f"Invalid queue size {queue_size} or batch size {batch_size}, must be positive"
+            )
+        self.path = path
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        # several pollers may publish concurrently
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        # last status bits of each channel, only used by the writer thread
+        self._bits: Dict[Tuple, Dict] = {}
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def publish(self, samples: List[Dict]) -> None:
+        """
+        Queue the samples of a polling pass (sink of the pollers, see `Poller.poll`), without waiting.
+
+        Args:
+            samples (List[Dict]): The samples.
+        """
+        try:
+            self._queue.put_nowait(samples)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            _logger.warning("SQLite queue full, dropping %d samples", len(samples))
+
+    def _rows(self, samples: List[Dict], rows: List, transitions: List) -> None:
+        for sample in samples:
+            key = (str(sample["crate"]), sample["board"], sample["channel"])
+            rows.append(
+                (
+                    sample["time"],
+                    *key,
+                    sample["vmon"],
+                    sample["imon"],
+                    sample["vset"],
+                    sample["status"],
+                )
+            )
+            bits = sample.get("status_bits") or {}
+            previous = self._bits.get(key, {})
+            for bit, value in bits.items():
+                if previous.get(bit) != bool(value):
+                    transitions.append((sample["time"], *key, bit, int(bool(value))))
+            self._bits[key] = {bit: bool(value) for bit, value in bits.items()}
+
+    def _write(self) -> None:
+        connection = self._connect()
+        try:
+            running = True
+            while running:
+                batches = [self._queue.get()]
+                count = len(batches[0] or [])
+                # everything already waiting goes in the same transaction
+                while count < self.batch_size:
+                    try:
+                        batches.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                    count += len(batches[-1] or [])
+                rows, transitions = [], []
+                for samples in batches:
+                    if samples is None:
+                        running = False
+                    else:
+                        self._rows(samples, rows, transitions)
+                try:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                        )
+                        connection.executemany(
+                            "INSERT INTO transitions VALUES (?, ?, ?, ?, ?, ?)",
+                            transitions,
+                        )
+                    self.written += len(rows)
+                except sqlite3.Error as error:
+                    _logger.error("Could not write %d samples: %s", len(rows), error)
+                for _ in batches:
+                    self._queue.task_done()
+        finally:
+            connection.close()
+
+    def flush(self) -> None:
+        """Wait until the queued samples are written."""
+        self._queue.join()
+
+    def start(self) -> None:
+        """Start writing in a background thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._write, name="hvps-sqlite", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write the queued samples and stop the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> SqliteLogger:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def downsample(
+        self,
+        crate: str,
+        board: int,
+        channel: int,
+        field: str = "vmon",
+        start: float | None = None,
+        end: float | None = None,
+        interval: float = 60.0,
+    ) -> Dict[str, List]:
+        """
+        The minimum, maximum and mean of a field of a channel over buckets of `interval` seconds, computed by SQLite
+        with the (channel, time) index.
+
+        Args:
+            crate (str): The crate (poller name).
+            board (int): The board.
+            channel (int): The channel.
+            field (str, optional): One of `FIELDS`. Defaults to "vmon".
+            start (float | None, optional): The first time, in seconds since the epoch. Defaults to None (oldest).
+            end (float | None, optional): The end time (excluded). Defaults to None (newest included).
+            interval (float, optional): The duration of the buckets, in seconds. Defaults to 60.0.
+
+        Returns:
+            Dict[str, List]: With keys "time" (start of each bucket), "min", "max", "mean" and "count" (number of
+            samples), with one item per bucket with samples, oldest first.
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Invalid field {field!r}, must be one of {FIELDS}")
+        if interval <= 0:
+            raise ValueError(f"Interval must be positive, got {interval}")
+        query = (
+            f"SELECT CAST(time / :interval AS INTEGER) AS bucket, MIN({field}), MAX({field}), AVG({field}), COUNT(*) "
+            "FROM samples WHERE crate = :crate AND board = :board AND channel = :channel "
+            "AND time >= :start AND time < :end GROUP BY bucket ORDER BY bucket"
+        )
+        parameters = {
+            "interval": interval,
+            "crate": crate,
+            "board": board,
+            "channel": channel,
+            "start": float("-inf") if start is None else start,
+            "end": float("inf") if end is None else end,
+        }
+        result = {"time": [], "min": [], "max": [], "mean": [], "count": []}
+        connection = self._connect()
+        try:
+            for bucket, minimum, maximum, mean, count in connection.execute(
+                query, parameters
+            ):
+                result["time"].append(bucket * interval)
+                result["min"].append(minimum)
+                result["max"].append(maximum)
+                result["mean"].append(mean)
+                result["count"].append(count)
+        finally:
+            connection.close()
+        return result
+
+    def transitions(
+        self,
+        crate: str,
+        board: int,
+        channel: int,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> List[Dict]:
+        """
+        The transitions of the status bits of a channel with `start <= time < end`, oldest first.
+
+        Returns:
+            List[Dict]: With keys "time", "bit" and "value".
+        """
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT time, bit, value FROM transitions WHERE crate = ? AND board = ? AND channel = ? "
+                "AND time >= ? AND time < ? ORDER BY time",
+                (
+                    crate,
+                    board,
+                    channel,
+                    float("-inf") if start is None else start,
+                    float("inf") if end is None else end,
+                ),
+            ).fetchall()
+        finally:
+            connection.close()
+        return [
+            {"time": time, "bit": bit, "value": bool(value)}
+            for time, bit, value in rows
+        ]
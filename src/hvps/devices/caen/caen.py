@@ -1,29 +1,287 @@
 from __future__ import annotations
+from typing import Dict, List
 
 from ..hvps import Hvps
+from .channel import _stat_bits
 from .module import Module
-from ...commands.caen.channel import validate_board_number
-from ...commands.caen import _write_command_read_response
+from ...commands.caen.channel import (
+    validate_board_number,
+    _get_mon_channel_command,
+    _get_set_channel_command,
+    _MON_CHANNEL_COMMANDS,
+)
+from ...commands.caen.module import _get_mon_module_command, _MON_MODULE_COMMANDS
+from ...commands.caen import (
+    _command_mnemonic,
+    _command_parameter,
+    _command_priority,
+    _write_command_read_response,
+    _write_commands_read_responses,
+    _scan_boards,
+)
+from ...scheduling import priority
+from ...utils import check_command_input, check_command_output_and_convert
 
 
 class Caen(Hvps):
+    _brand = "caen"
+
     def _write_command_read_response(self, bd: int, command: bytes) -> str | None:
-        return _write_command_read_response(
-            ser=self._serial,
-            lock=self._lock,
-            logger=self._logger,
-            bd=bd,
-            command=command,
+        if self._unsupported:
+            self._check_supported(bd, _command_parameter(command))
+        if _command_priority(command) == "interactive":
+            # reads
+            return self._coalescer.read(
+                command, lambda: self._send_command(bd=bd, command=command)
+            )
+        try:
+            return self._send_command(bd=bd, command=command)
+        finally:
+            self._coalescer.invalidate()
+
+    def _send_command(self, bd: int, command: bytes) -> str | None:
+        return self._reconnector.run(
+            lambda: _write_command_read_response(
+                ser=self._serial,
+                lock=self._lock,
+                logger=self._logger,
+                bd=bd,
+                command=command,
+                timeouts=self._timeouts,
+            ),
+            replay=_command_priority(command) == "interactive",
         )
 
+    def _model(self, bd: int) -> str:
+        module = self.module(bd)
+        return f"caen/{module.name}/{module.firmware_release}"
+
+    def _capability_commands(self, bd: int) -> Dict[str, bytes]:
+        commands = {}
+        for table, get_command in [
+            (
+                _MON_MODULE_COMMANDS,
+                lambda command: _get_mon_module_command(bd, command),
+            ),
+            (
+                _MON_CHANNEL_COMMANDS,
+                lambda command: _get_mon_channel_command(bd, 0, command),
+            ),
+        ]:
+            for entry in table.values():
+                if entry["command"]:
+                    commands[entry["command"]] = get_command(entry["command"])
+        return commands
+
+    def _probe_command(self, bd: int, command: bytes) -> bool:
+        # error responses raise a ValueError
+        self._send_command(bd=bd, command=command)
+        return True
+
+    def _identity(self) -> Dict[int, str]:
+        # the serial numbers of the boards in use
+        return {
+            bd: module.serial_number for bd, module in sorted(self._modules.items())
+        }
+
     def module(self, module: int = 0) -> Module:
-        self._logger.debug(f"Getting module {module}")
+        self._logger.debug("Getting module %d", module)
         validate_board_number(module)
         if module not in self._modules:
-            self._logger.debug(f"Creating module {module}")
+            self._logger.debug("Creating module %d", module)
             self._modules[module] = Module(
                 module=module,
                 write_command_read_response=self._write_command_read_response,
                 logger=self._logger,
+                write_coalescer=self._write_coalescer,
+                verifier=self._verifier,
             )
         return self._modules[module]
+
+    def scan_boards(
+        self, timeout: float = 0.05, pipeline: bool = True
+    ) -> Dict[int, Dict]:
+        """Find the boards connected to the serial line (daisy chain).
+
+        All 32 board addresses are probed with a short timeout (independent of the serial timeout).
+        The probes are pipelined (sent in a single burst) unless `pipeline` is False.
+        A module object is created for each board found.
+
+        Args:
+            timeout (float, optional): The time to wait for a board to answer, in seconds. Defaults to 0.05.
+            pipeline (bool, optional): Send the probes in a single burst. Defaults to True.
+
+        Returns:
+            Dict[int, Dict]: For each board number found, a dictionary with the board "name",
+            "number_of_channels" and "serial_number".
+        """
+        self._logger.debug("Scanning boards")
+        boards = _scan_boards(
+            ser=self._serial,
+            lock=self._lock,
+            logger=self._logger,
+            timeout=timeout,
+            pipeline=pipeline,
+        )
+        self._logger.debug("Found boards: %s", list(boards.keys()))
+        for board, info in boards.items():
+            self.module(board)
+            if info["number_of_channels"] is not None:
+                self._number_of_channels[board] = info["number_of_channels"]
+        return boards
+
+    def read_channels(
+        self,
+        bd: int,
+        parameters: List[str],
+        channels: List[int] | None = None,
+        timeout: float | None = None,
+    ) -> List[Dict]:
+        """Read monitored parameters of several channels of a board with a single pipelined burst.
+
+        The commands (one per channel and parameter) are written at once and the responses, which the board sends
+        in order, are read afterwards: the read costs one round trip instead of one per command, which matters on
+        network ports (see `url`), where the round trip is much longer than the time to process a command.
+
+        Args:
+            bd (int): The board number.
+            parameters (List[str]): The names of the channel properties to read (e.g. ["vmon", "imon", "stat"]).
+            channels (List[int] | None, optional): The channels to read. Defaults to all the channels of the board.
+            timeout (float | None, optional): The time to wait for the next response, in seconds. Defaults to the
+                read timeout of the first command (see `timeouts`).
+
+        Returns:
+            List[Dict]: For each channel, the value of each parameter, converted as by the channel properties.
+
+        Raises:
+            ValueError: If a parameter is not a channel monitoring command or a command is not answered.
+        """
+        for parameter in parameters:
+            check_command_input(_MON_CHANNEL_COMMANDS, parameter)
+        if channels is None:
+            channels = [channel.channel for channel in self.module(bd).channels]
+        commands = [
+            _get_mon_channel_command(
+                bd, channel, _MON_CHANNEL_COMMANDS[parameter]["command"]
+            )
+            for channel in channels
+            for parameter in parameters
+        ]
+        if not commands:
+            return []
+        if self._unsupported:
+            for parameter in parameters:
+                self._check_supported(bd, _MON_CHANNEL_COMMANDS[parameter]["command"])
+        if timeout is None:
+            timeout = self._timeouts.timeout(
+                _command_mnemonic(commands[0]),
+                self._timeouts.port_timeout(self._serial),
+            )
+            if timeout is None:
+                timeout = self._timeouts.initial
+
+        responses = self._reconnector.run(
+            lambda: _write_commands_read_responses(
+                ser=self._serial,
+                lock=self._lock,
+                logger=self._logger,
+                commands=commands,
+                timeout=timeout,
+            ),
+            replay=True,
+        )
+        if len(responses) != len(commands) or any(
+            response_bd != bd for response_bd, _ in responses
+        ):
+            raise ValueError(
+                f"Board {bd} answered {len(responses)} of {len(commands)} pipelined commands"
+            )
+
+        values = []
+        for i in range(len(channels)):
+            row = {}
+            for j, parameter in enumerate(parameters):
+                value = check_command_output_and_convert(
+                    parameter,
+                    None,
+                    responses[i * len(parameters) + j][1],
+                    _MON_CHANNEL_COMMANDS,
+                )
+                row[parameter] = _stat_bits(value) if parameter == "stat" else value
+            values.append(row)
+        return values
+
+    def emergency_off(self, timeout: float = 0.5) -> int:
+        """Switch off all the channels of all the boards, with the minimum number of commands.
+
+        A single command per board addresses all its channels (channel number equal to the number of channels),
+        and the commands to all the boards are sent in a single burst. They have the "emergency" priority, so they
+        are sent before any other command waiting for the port (e.g. background polling).
+
+        The boards are the modules already used; if there are none, the boards are found with `scan_boards`.
+        The number of channels of a board is taken from the channels used or from `scan_boards`. The boards whose
+        number of channels is not known yet are probed with a single pipelined burst after the others are switched
+        off, then switched off in a second burst, so a board that does not answer never delays the others.
+        The channels ramp down with their RDW speed.
+
+        Args:
+            timeout (float, optional): The time to wait for the confirmation of a board, in seconds. Defaults to 0.5.
+
+        Returns:
+            int: The number of OFF commands sent.
+
+        Raises:
+            ValueError: If a board does not confirm the command.
+        """
+        with priority("emergency"):
+            if not self._modules:
+                self.scan_boards()
+            boards = sorted(self._modules.keys())
+            self._logger.warning("Emergency off of boards %s", boards)
+            known = {}
+            for bd in boards:
+                number_of_channels = len(
+                    self._modules[bd]._channels
+                ) or self._number_of_channels.get(bd)
+                if number_of_channels:
+                    known[bd] = number_of_channels
+            responses = self._emergency_off_burst(known, timeout)
+            unknown = [bd for bd in boards if bd not in known]
+            probed = {}
+            if unknown:
+                for bd, value in _write_commands_read_responses(
+                    ser=self._serial,
+                    lock=self._lock,
+                    logger=self._logger,
+                    commands=[
+                        _get_mon_module_command(bd=bd, command="BDNCH")
+                        for bd in unknown
+                    ],
+                    timeout=timeout,
+                ):
+                    if bd in unknown and value is not None and value.isdigit():
+                        probed[bd] = self._number_of_channels[bd] = int(value)
+                responses += self._emergency_off_burst(probed, timeout)
+        self._coalescer.invalidate()
+        confirmed = {bd for bd, _ in responses}
+        missing = [bd for bd in boards if bd not in confirmed]
+        if missing:
+            raise ValueError(f"Boards {missing} did not confirm the emergency off")
+        return len(known) + len(probed)
+
+    def _emergency_off_burst(self, boards: Dict[int, int], timeout: float) -> List:
+        # one OFF command per board, addressed to all its channels
+        if not boards:
+            return []
+        return _write_commands_read_responses(
+            ser=self._serial,
+            lock=self._lock,
+            logger=self._logger,
+            commands=[
+                _get_set_channel_command(
+                    bd=bd, channel=number_of_channels, command="OFF", value=None
+                )
+                for bd, number_of_channels in boards.items()
+            ],
+            timeout=timeout,
+        )
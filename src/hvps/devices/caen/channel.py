@@ -12,10 +12,37 @@ from ...commands.caen.channel import (
 
 from ...utils import string_number_to_bit_array, check_command_output_and_convert
 from ..channel import Channel as BaseChannel
+from ...coalescing import coalesced_write
+from ...verification import equal_with_decimals
 
 from time import sleep
 
 
+def _stat_bits(response: str) -> dict:
+    # the named bits of the channel status register (STAT)
+    bit_array = string_number_to_bit_array(response)
+
+    return {
+        "ON": bit_array[0],  # True: ON, False: OFF
+        "RUP": bit_array[1],  # True: Channel Ramp UP
+        "RDW": bit_array[2],  # True: Channel Ramp DOWN
+        "OVC": bit_array[3],  # True: IMON >= ISET
+        "OVV": bit_array[4],  # True: VMON > VSET + 2.5 V
+        "UNV": bit_array[5],  # True: VMON < VSET – 2.5 V
+        "MAXV": bit_array[6],  # True: VOUT in MAXV protection
+        "TRIP": bit_array[7],  # True: Ch OFF via TRIP (Imon >= Iset during TRIP)
+        "OVP": bit_array[8],  # True: Output Power > Max
+        "OVT": bit_array[9],  # True: TEMP > 105°C
+        "DIS": bit_array[
+            10
+        ],  # True: Ch disabled (REMOTE Mode and Switch on OFF position)
+        "KILL": bit_array[11],  # True: Ch in KILL via front panel
+        "ILK": bit_array[12],  # True: Ch in INTERLOCK via front panel
+        "NOCAL": bit_array[13],  # True: Calibration Error
+        # "NC": bit_array[14]  # True: Not Connected
+    }
+
+
 class Channel(BaseChannel):
     def __init__(self, *args, bd: int, **kwargs):
         super().__init__(*args, **kwargs)
@@ -48,6 +75,24 @@ class Channel(BaseChannel):
             ),
         )
 
+    def _verify_set(
+        self, method_name: str, value: str | float, decimals: str | None = None
+    ) -> None:
+        # read back the value according to the verification policy, numbers rounded to the decimals of the board
+        if decimals is None:
+
+            def equal(actual: str | float) -> bool:
+                return actual == value
+
+        else:
+            equal = equal_with_decimals(value, lambda: getattr(self, decimals))
+        self._verifier.check(
+            key=(self, method_name),
+            read=lambda: getattr(self, method_name),
+            equal=equal,
+            message=f"Could not set {method_name.upper()} to {value}",
+        )
+
     @property
     def bd(self) -> int:
         """The bd value of the channel.
@@ -277,38 +322,10 @@ class Channel(BaseChannel):
 
     @property
     def stat(self) -> dict:
-        command = _MON_CHANNEL_COMMANDS[inspect.currentframe().f_code.co_name][
-            "command"
-        ]
-        response = self._write_command_read_response(
-            bd=self.bd,
-            command=_get_mon_channel_command(
-                bd=self.bd, channel=self.channel, command=command
-            ),
+        response = self._write_command_read_response_channel_mon(
+            inspect.currentframe().f_code.co_name
         )
-        # TODO: check_command_output_and_convert returns an int so make string_number_to_bit_array take an int
-        check_command_output_and_convert(command, None, response, _MON_CHANNEL_COMMANDS)
-        bit_array = string_number_to_bit_array(response)
-
-        return {
-            "ON": bit_array[0],  # True: ON, False: OFF
-            "RUP": bit_array[1],  # True: Channel Ramp UP
-            "RDW": bit_array[2],  # True: Channel Ramp DOWN
-            "OVC": bit_array[3],  # True: IMON >= ISET
-            "OVV": bit_array[4],  # True: VMON > VSET + 2.5 V
-            "UNV": bit_array[5],  # True: VMON < VSET – 2.5 V
-            "MAXV": bit_array[6],  # True: VOUT in MAXV protection
-            "TRIP": bit_array[7],  # True: Ch OFF via TRIP (Imon >= Iset during TRIP)
-            "OVP": bit_array[8],  # True: Output Power > Max
-            "OVT": bit_array[9],  # True: TEMP > 105°C
-            "DIS": bit_array[
-                10
-            ],  # True: Ch disabled (REMOTE Mode and Switch on OFF position)
-            "KILL": bit_array[11],  # True: Ch in KILL via front panel
-            "ILK": bit_array[12],  # True: Ch in INTERLOCK via front panel
-            "NOCAL": bit_array[13],  # True: Calibration Error
-            # "NC": bit_array[14]  # True: Not Connected
-        }
+        return _stat_bits(response)
 
     @property
     def voltage_target_reached(self) -> bool:
@@ -329,68 +346,66 @@ class Channel(BaseChannel):
 
     # Setters
     @vset.setter
+    @coalesced_write
     def vset(self, value: float) -> None:
         self._write_command_read_response_channel_set(
             method_name=inspect.currentframe().f_code.co_name, value=value
         )
-        if self.vset != value:
-            raise ValueError(f"Could not set VSET to {value}")
+        self._verify_set(inspect.currentframe().f_code.co_name, value, "vdec")
 
     @iset.setter
+    @coalesced_write
     def iset(self, value: float) -> None:
         self._write_command_read_response_channel_set(
             method_name=inspect.currentframe().f_code.co_name, value=value
         )
-        if self.iset != value:
-            raise ValueError(f"Could not set ISET to {value}")
+        self._verify_set(inspect.currentframe().f_code.co_name, value, "isdec")
 
     @maxv.setter
+    @coalesced_write
     def maxv(self, value: float) -> None:
         self._write_command_read_response_channel_set(
             method_name=inspect.currentframe().f_code.co_name, value=value
         )
-        if self.maxv != value:
-            raise ValueError(f"Could not set MAXV to {value}")
+        self._verify_set(inspect.currentframe().f_code.co_name, value, "mvdec")
 
     @rup.setter
+    @coalesced_write
     def rup(self, value: float) -> None:
         self._write_command_read_response_channel_set(
             method_name=inspect.currentframe().f_code.co_name, value=value
         )
-        if self.rup != value:
-            raise ValueError(f"Could not set RUP to {value}")
+        self._verify_set(inspect.currentframe().f_code.co_name, value, "rupdec")
 
     @rdw.setter
+    @coalesced_write
     def rdw(self, value: float) -> None:
         self._write_command_read_response_channel_set(
             method_name=inspect.currentframe().f_code.co_name, value=value
         )
-        if self.rdw != value:
-            raise ValueError(f"Could not set RDW to {value}")
+        self._verify_set(inspect.currentframe().f_code.co_name, value, "rdwdec")
 
     @trip.setter
+    @coalesced_write
     def trip(self, value: float) -> None:
         self._write_command_read_response_channel_set(
             method_name=inspect.currentframe().f_code.co_name, value=value
         )
-        if self.trip != value:
-            raise ValueError(f"Could not set TRIP to {value}")
+        self._verify_set(inspect.currentframe().f_code.co_name, value, "tripdec")
 
     @pdwn.setter
     def pdwn(self, value: float) -> None:
         self._write_command_read_response_channel_set(
             method_name=inspect.currentframe().f_code.co_name, value=value
         )
-        if self.pdwn != value:
-            raise ValueError(f"Could not set PDWN to {value}")
+        self._verify_set(inspect.currentframe().f_code.co_name, value)
 
     @imrange.setter
     def imrange(self, value: float) -> None:
         self._write_command_read_response_channel_set(
             method_name=inspect.currentframe().f_code.co_name, value=value
         )
-        if self.imrange != value:
-            raise ValueError(f"Could not set IMRANGE to {value}")
+        self._verify_set(inspect.currentframe().f_code.co_name, value)
 
     def turn_on(self) -> None:
         """Turn on the channel."""
@@ -76,13 +76,15 @@ class Module(BaseModule):
         if len(self._channels) == 0:
             self._logger.debug("Initializing channels")
             for channel in range(self.number_of_channels):
-                self._logger.debug(f"Creating channel {channel}")
+                self._logger.debug("Creating channel %d", channel)
                 self._channels.append(
                     Channel(
                         channel=channel,
                         bd=self.bd,
                         write_command_read_response=self._write_command_read_response,
                         logger=self._logger,
+                        write_coalescer=self._write_coalescer,
+                        verifier=self._verifier,
                     )
                 )
         return self._channels
@@ -219,12 +221,9 @@ class Module(BaseModule):
         Returns:
             str: The board alarm status value.
         """
-        command = _MON_MODULE_COMMANDS[inspect.currentframe().f_code.co_name]
-        response = self._write_command_read_response(
-            bd=self.bd,
-            command=_get_mon_module_command(bd=self.bd, command=command),
+        response = self._write_command_read_response_module_mon(
+            method_name=inspect.currentframe().f_code.co_name
         )
-        check_command_output_and_convert(command, None, response, _MON_MODULE_COMMANDS)
         bit_array = string_number_to_bit_array(response)
 
         return {
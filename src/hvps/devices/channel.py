@@ -1,7 +1,12 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
 import logging
 from typing import Callable
 
+from ..coalescing import WriteCoalescer
+from ..verification import Verifier
+
 
 class Channel(ABC):
     def __init__(
@@ -9,6 +14,8 @@ class Channel(ABC):
         write_command_read_response: Callable,
         logger: logging.Logger,
         channel: int,
+        write_coalescer: WriteCoalescer | None = None,
+        verifier: Verifier | None = None,
     ):
         """Initialize the Channel object.
 
@@ -16,11 +23,17 @@ class Channel(ABC):
             write_command_read_response (Callable): The function used to write a command and read the response.
             logger (logging.Logger): The logger object used for logging.
             channel (int): The channel number.
+            write_coalescer (WriteCoalescer | None, optional): The write coalescer of the device, used by the
+                setpoint setters. Defaults to None (writes are always sent immediately).
+            verifier (Verifier | None, optional): The verifier of the device, used by the setters to read back the
+                values written. Defaults to None (values are read back immediately).
 
         """
         self._write_command_read_response = write_command_read_response
         self._logger = logger
         self._channel = channel
+        self._write_coalescer = write_coalescer
+        self._verifier = verifier if verifier is not None else Verifier()
 
     @property
     def channel(self) -> int:
@@ -2,53 +2,175 @@ from __future__ import annotations
 
 import serial
 from serial.tools import list_ports
-from typing import Dict
+from typing import Dict, FrozenSet, List, Tuple
 import logging
-import uuid
-import threading
+import socket
+import sys
+import weakref
 from abc import ABC, abstractmethod
 
 from .module import Module
+from ..capabilities import CapabilityCache, UnsupportedCommandError, probe
+from ..coalescing import ReadCoalescer, WriteCoalescer
+from ..reconnection import Reconnector
+from ..scheduling import CommandScheduler
+from ..timeouts import AdaptiveTimeouts
+from ..verification import Verifier
+
+# the devices log through the loggers "hvps.devices.hvps.<class name>", shared by all the instances of a class.
+# A single handler prints their records (devices used to attach one handler each, which were never released)
+_DEVICES_LOGGER = logging.getLogger("hvps.devices")
+
+
+class _DefaultPortFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "port"):
+            record.port = "-"
+        return True
+
+
+class _StderrHandler(logging.StreamHandler):
+    # writes to the current sys.stderr, which may be replaced after the import (e.g. by pytest)
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+_handler = _StderrHandler()
+_handler.setFormatter(
+    logging.Formatter(
+        "%(asctime)s - %(levelname)s - %(port)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+)
+_handler.addFilter(_DefaultPortFilter())
+_DEVICES_LOGGER.addHandler(_handler)
+
+# frames between the caller and `Logger._log`, so that the records point to the caller and not to the adapter
+# (python < 3.11 already skips the frame of the adapter)
+_STACKLEVEL = 2 if sys.version_info >= (3, 11) else 1
+
+
+class DeviceLoggerAdapter(logging.LoggerAdapter):
+    def __init__(self, logger: logging.Logger, device: Hvps, level: int | str):
+        """
+        Logger of a device: adds the serial port of the device to the records (`port` attribute) and has its own
+        level, so that devices sharing a logger can log at different levels.
+
+        The level of the adapter replaces the level of the logger. If it is `logging.NOTSET`, the effective level of
+        the logger is used. Messages below the level are discarded before being formatted, so use lazy %-style
+        arguments (`logger.debug("Sending command: %s", command)`) instead of f-strings.
+
+        Args:
+            logger (logging.Logger): The shared logger.
+            device (Hvps): The device (a weak reference is kept).
+            level (int | str): The logging level.
+        """
+        super().__init__(logger, {})
+        self._device = weakref.ref(device)
+        self.setLevel(level)
+
+    def setLevel(self, level: int | str) -> None:
+        # only this device, not the logger shared with the other devices
+        if isinstance(level, str):
+            # e.g. "DEBUG", as accepted by `logging.Logger.setLevel`
+            level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            raise ValueError(f"Unknown logging level: {level}")
+        self.level = level
+
+    def getEffectiveLevel(self) -> int:
+        return self.level or self.logger.getEffectiveLevel()
+
+    def isEnabledFor(self, level: int) -> bool:
+        if self.logger.manager.disable >= level:
+            return False
+        return level >= self.getEffectiveLevel()
+
+    def process(self, msg, kwargs):
+        # None if the device is gone or not initialized yet (e.g. logging from __del__)
+        port = getattr(getattr(self._device(), "_serial", None), "port", None)
+        kwargs["extra"] = {"port": port, **kwargs.get("extra", {})}
+        return msg, kwargs
+
+    def log(self, level: int, msg, *args, **kwargs) -> None:
+        if self.isEnabledFor(level):
+            msg, kwargs = self.process(msg, kwargs)
+            kwargs.setdefault("stacklevel", _STACKLEVEL)
+            # the level was already checked (the logger would check its own level instead)
+            self.logger._log(level, msg, args, **kwargs)
 
 
 class Hvps(ABC):
+    # brand name used to identify the device during port discovery
+    _brand: str = ""
+
     def __init__(
         self,
-        baudrate: int = 115200,
+        baudrate: int | None = 115200,
         port: str | None = None,
         timeout: float | None = None,
         logging_level=logging.WARNING,
+        connect: bool = False,
+        url: str | None = None,
     ):
         """Initialize the HVPS (High-Voltage Power Supply) object.
 
         Args:
-            baudrate (int, optional): The baud rate for serial communication. Defaults to 115200.
+            baudrate (int | None, optional): The baud rate for serial communication. If None, it will be detected automatically when connecting. Defaults to 115200.
             port (str | None, optional): The serial port to use. If None, it will try to detect one automatically. Defaults to None.
-            timeout (float | None, optional): The timeout for serial communication. Defaults to None.
+            timeout (float | None, optional): The timeout for serial communication, the upper bound of the adaptive timeouts (see `timeouts`). Defaults to None (5 s until the latency of the commands is known).
             logging_level (int, optional): The logger level. Defaults to logger.WARNING.
+            connect (bool, optional): Open the serial port on initialization. Defaults to False.
+            url (str | None, optional): A pyserial URL to use instead of a local port, e.g. "socket://host:port" (raw
+                TCP terminal server), "rfc2217://host:port" or "loop://". The port is not discovered. Defaults to None.
 
         """
 
-        # Create a lock for the serial port
-        self._lock = threading.Lock()
+        # grants the serial port to one command at a time, by priority class
+        self._lock = CommandScheduler()
+        # shares identical concurrent reads
+        self._coalescer = ReadCoalescer()
 
-        self._logger = logging.getLogger(
-            f"{__name__}.{self.__class__.__name__}.{uuid.uuid4()}"
+        self._logger = DeviceLoggerAdapter(
+            logging.getLogger(f"{__name__}.{self.__class__.__name__}"),
+            self,
+            logging_level,
         )
-        self._logger.setLevel(logging_level)
 
-        formatter = logging.Formatter(
-            "%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        # merges rapid writes to the same setpoint (disabled by default)
+        self._write_coalescer = WriteCoalescer(self._logger)
+        # how the setters read back the values written
+        self._verifier = Verifier()
+        # read timeouts learned from the latency of each command class
+        self._timeouts = AdaptiveTimeouts()
+        # reopens the port after a serial error (disabled by default)
+        self._reconnector = Reconnector(
+            self._reopen, self.disconnect, self._identity, self._logger
         )
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(formatter)
-        self._logger.addHandler(stream_handler)
 
         self._modules: Dict[int, Module] = {}
+        # number of channels of each board, once known (scans, channels used), for the emergency off
+        self._number_of_channels: Dict[int, int] = {}
+
+        # model and unsupported command parameters of each board, once probed (see `probe_capabilities`)
+        self._unsupported: Dict[int, Tuple[str, FrozenSet[str]]] = {}
 
-        self._serial: serial.Serial = serial.Serial()
+        if url is not None:
+            if port is not None:
+                raise ValueError("Specify either a port or a URL, not both")
+            self._serial: serial.Serial = serial.serial_for_url(url, do_not_open=True)
+        else:
+            self._serial: serial.Serial = serial.Serial()
+        self._url = url
 
-        self._serial.baudrate = baudrate
+        # the baud rate of a network port cannot be detected
+        self._auto_baudrate = baudrate is None and url is None
+        if baudrate is not None:
+            self._serial.baudrate = baudrate
 
         if port is not None:
             self._serial.port = port
@@ -56,6 +178,9 @@ class Hvps(ABC):
         if timeout is not None:
             self._serial.timeout = timeout
 
+        if connect:
+            self.connect()
+
     def __del__(self):
         """Cleanup method to close the serial port when the HVPS object is deleted."""
         self.close()
@@ -67,19 +192,12 @@ class Hvps(ABC):
 
         self._logger.debug("Connecting to serial port")
 
-        if self.port is None:
-            self._logger.info("No port specified, trying to detect one")
-            ports = [port.device for port in list_ports.comports()]
-            if len(ports) >= 1:
-                self._serial.port = ports[0]
-                if len(ports) > 1:
-                    self._logger.warning(
-                        f"Multiple ports detected: {ports}, using the first one: {self._serial.port}"
-                    )
+        if self._url is None and (self.port is None or self._auto_baudrate):
+            self._discover()
 
-        self._logger.info(f"Using port {self._serial.port}")
-        self._logger.info(f"Using baud rate {self._serial.baudrate}")
-        self._logger.debug(f"Using timeout {self._serial.timeout}")
+        self._logger.info("Using port %s", self._serial.port)
+        self._logger.info("Using baud rate %s", self._serial.baudrate)
+        self._logger.debug("Using timeout %s", self._serial.timeout)
 
         if not hasattr(self, "_serial"):
             return
@@ -87,9 +205,129 @@ class Hvps(ABC):
             raise ValueError("No port specified")
         if not self._serial.is_open:
             self._serial.open()
+            self._configure_socket()
         else:
             self._logger.debug("Serial port is already open")
 
+    def _discover(self):
+        """
+        Find the port and/or baud rate of the device using `hvps.discover`.
+
+        If no device of this brand answers the probes, the first available port is used.
+        """
+        from ..discovery import discover
+
+        if self.port is None:
+            self._logger.info("No port specified, trying to detect one")
+        if self._auto_baudrate:
+            self._logger.info("No baud rate specified, trying to detect it")
+
+        devices = discover(
+            ports=None if self.port is None else [self.port],
+            baudrates=None if self._auto_baudrate else [self.baudrate],
+            brands=[self._brand],
+        )
+        if len(devices) >= 1:
+            if len(devices) > 1:
+                self._logger.warning(
+                    "Multiple devices detected: %s, using the first one: %s",
+                    [device["port"] for device in devices],
+                    devices[0]["port"],
+                )
+            self._serial.port = devices[0]["port"]
+            self._serial.baudrate = devices[0]["baudrate"]
+            self._auto_baudrate = False
+            return
+
+        if self.port is None:
+            ports = [port.device for port in list_ports.comports()]
+            if len(ports) >= 1:
+                self._serial.port = ports[0]
+                self._logger.warning(
+                    "No %s device detected in ports %s, using the first one: %s",
+                    self._brand,
+                    ports,
+                    self._serial.port,
+                )
+
+    def _reopen(self):
+        """
+        Close and open the serial port (used by the reconnector).
+        """
+        if self._serial.is_open:
+            self._serial.close()
+        self._serial.open()
+        self._configure_socket()
+
+    def _configure_socket(self):
+        """
+        Disable Nagle's algorithm on network ports ("socket://", "rfc2217://"), so that each command is sent as soon
+        as it is written instead of waiting for the acknowledgement of the previous segment.
+        """
+        sock = getattr(self._serial, "_socket", None)
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            self._logger.warning("Could not set TCP_NODELAY: %r", e)
+
+    def _identity(self) -> object:
+        """
+        The identity of the device (e.g. its serial numbers), checked after a reconnection.
+
+        Returns:
+            object: The identity, None if the device cannot be identified.
+        """
+        return None
+
+    def probe_capabilities(
+        self, cache: CapabilityCache | None = None, force: bool = False
+    ) -> Dict[int, Dict]:
+        """
+        Find the commands each board supports and fail the other ones locally, with an `UnsupportedCommandError`,
+        instead of waiting for an error response or a timeout each time they are used.
+
+        The boards are identified by model and firmware (CAEN: name and firmware release of each board in use; iseg:
+        ID string and firmware name). Each query of the command tables is sent once per model and the result is kept
+        in a persistent cache, so later sessions with the same model only pay for the identification. Setting
+        commands are never sent: a parameter that cannot be queried is considered unsupported for both.
+
+        Args:
+            cache (CapabilityCache | None, optional): The cache. Defaults to a cache in the user cache directory
+                (see `hvps.capabilities.default_path`).
+            force (bool, optional): Probe again, even if the model is in the cache. Defaults to False.
+
+        Returns:
+            Dict[int, Dict]: For each board, its "model", "unsupported" parameters and whether it was "probed"
+            (False if read from the cache).
+        """
+        return probe(self, cache=cache, force=force)
+
+    def _check_supported(self, bd: int, parameter: str) -> None:
+        entry = self._unsupported.get(bd)
+        if entry is not None and parameter in entry[1]:
+            raise UnsupportedCommandError(parameter, entry[0])
+
+    def _capability_boards(self) -> List[int]:
+        """The boards to probe."""
+        return sorted(self._modules.keys())
+
+    @abstractmethod
+    def _model(self, bd: int) -> str:
+        """The model and firmware of a board, the key of the capability cache."""
+        pass
+
+    @abstractmethod
+    def _capability_commands(self, bd: int) -> Dict[str, bytes]:
+        """The query to send to a board for each parameter to probe."""
+        pass
+
+    @abstractmethod
+    def _probe_command(self, bd: int, command: bytes) -> bool:
+        """Send a query, True if answered, False or ValueError if not supported."""
+        pass
+
     def open(self):
         """
         Open the serial port. (Alias for connect).
@@ -160,6 +398,16 @@ class Hvps(ABC):
         """
         self._serial.port = port
 
+    @property
+    def url(self) -> str | None:
+        """
+        Get the pyserial URL of the port (e.g. "socket://host:port").
+
+        Returns:
+            str | None: The URL, None for a local serial port.
+        """
+        return self._url
+
     @property
     def baudrate(self) -> int:
         """
@@ -178,7 +426,9 @@ class Hvps(ABC):
         Args:
             baudrate (int): The baud rate.
         """
-        self._serial.baudrate = baudrate
+        self._auto_baudrate = baudrate is None
+        if baudrate is not None:
+            self._serial.baudrate = baudrate
 
     @property
     def timeout(self) -> float:
@@ -188,7 +438,7 @@ class Hvps(ABC):
         Returns:
             float: The timeout.
         """
-        return self._serial.timeout
+        return self._timeouts.port_timeout(self._serial)
 
     @timeout.setter
     def timeout(self, timeout: float):
@@ -200,7 +450,7 @@ class Hvps(ABC):
         """
         if timeout < 0:
             raise ValueError("Timeout must be positive")
-        self._serial.timeout = timeout
+        self._timeouts.set_port_timeout(self._serial, timeout)
 
     @property
     def serial(self):
@@ -213,12 +463,79 @@ class Hvps(ABC):
         return self._serial
 
     @property
-    def logger(self) -> logging.Logger:
+    def scheduler(self) -> CommandScheduler:
+        """
+        Get the scheduler of the serial port, which orders the commands waiting for the port by priority class
+        (see `hvps.scheduling`).
+
+        Returns:
+            CommandScheduler: The scheduler.
+        """
+        return self._lock
+
+    @property
+    def coalescer(self) -> ReadCoalescer:
+        """
+        Get the read coalescer of the device: identical reads (same command, board and channel) made while one is
+        in progress share its result. Set `coalescer.freshness` (seconds) to also reuse recent results.
+
+        Returns:
+            ReadCoalescer: The read coalescer.
+        """
+        return self._coalescer
+
+    @property
+    def write_coalescer(self) -> WriteCoalescer:
+        """
+        Get the write coalescer of the device. Set `write_coalescer.enabled = True` to make the setpoint setters
+        return immediately and only send the latest value written to each setpoint (see `WriteCoalescer`).
+
+        Returns:
+            WriteCoalescer: The write coalescer.
+        """
+        return self._write_coalescer
+
+    @property
+    def verifier(self) -> Verifier:
+        """
+        Get the verifier of the device. Set `verifier.policy` to "none" to skip the read-back of the values written
+        by the setters, or to "deferred" to read them back once with `verifier.verify()` (see `Verifier`).
+
+        Returns:
+            Verifier: The verifier.
+        """
+        return self._verifier
+
+    @property
+    def timeouts(self) -> AdaptiveTimeouts:
+        """
+        Get the adaptive timeouts of the device: the read timeout of each command class is learned from its latency,
+        capped by the timeout of the port (see `AdaptiveTimeouts`). Use `hvps.timeouts.deadline` for explicit
+        deadlines.
+
+        Returns:
+            AdaptiveTimeouts: The adaptive timeouts.
+        """
+        return self._timeouts
+
+    @property
+    def reconnector(self) -> Reconnector:
+        """
+        Get the reconnector of the device. Call `reconnector.enable()` once connected to reopen the port after serial
+        errors, with backoff, and send reads again (see `Reconnector`).
+
+        Returns:
+            Reconnector: The reconnector.
+        """
+        return self._reconnector
+
+    @property
+    def logger(self) -> DeviceLoggerAdapter:
         """
         Get the logger.
 
         Returns:
-            logging.Logger: The logger.
+            DeviceLoggerAdapter: The logger of this device (see `DeviceLoggerAdapter`).
         """
         return self._logger
 
@@ -257,3 +574,16 @@ class Hvps(ABC):
             KeyError: If the module number is invalid.
         """
         pass
+
+    @abstractmethod
+    def emergency_off(self) -> int:
+        """Switch off all the channels of the device with the minimum number of commands, before any other command
+        waiting for the port. See `hvps.emergency_off` to switch off several devices in parallel.
+
+        Returns:
+            int: The number of commands sent.
+
+        Raises:
+            ValueError: If the device does not confirm.
+        """
+        pass
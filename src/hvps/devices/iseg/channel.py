@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import inspect
-from typing import List
+from typing import Callable, List
 
 from hvps.utils import check_command_input
 
@@ -13,6 +13,7 @@ from ...commands.iseg.channel import (
 )
 
 from ..channel import Channel as BaseChannel
+from ...coalescing import coalesced_write
 from ...utils.utils import check_command_output_and_convert
 
 
@@ -48,6 +49,20 @@ class Channel(BaseChannel):
             raise ValueError("Last command haven't been processed.")
         return response
 
+    def _verify_set(
+        self,
+        method_name: str,
+        value: int | float,
+        equal: Callable[[int | float], bool] | None = None,
+    ) -> None:
+        # read back the value according to the verification policy
+        self._verifier.check(
+            key=(self, method_name),
+            read=lambda: getattr(self, method_name),
+            equal=equal if equal is not None else lambda actual: actual == value,
+            message="Last command haven't been processed.",
+        )
+
     # Getters
     @property
     def trip_action(
@@ -797,6 +812,7 @@ class Channel(BaseChannel):
             raise ValueError("Last command haven't been processed.")
 
     @voltage_set.setter
+    @coalesced_write
     def voltage_set(self, vset: float) -> None:
         """
         Set the channel voltage set.
@@ -809,12 +825,14 @@ class Channel(BaseChannel):
             value=vset,
             expected_response_type=None,
         )
-        if not (
-            self.voltage_set == round(vset, 1) or self.voltage_set == -round(vset, 1)
-        ):
-            raise ValueError("Last command haven't been processed.")
+        self._verify_set(
+            inspect.currentframe().f_code.co_name,
+            vset,
+            lambda value: value in (round(vset, 1), -round(vset, 1)),
+        )
 
     @voltage_bounds.setter
+    @coalesced_write
     def voltage_bounds(self, vbounds: float) -> None:
         """
         Set the channel voltage bounds.
@@ -827,10 +845,10 @@ class Channel(BaseChannel):
             value=vbounds,
             expected_response_type=None,
         )
-        if self.voltage_bounds != vbounds:
-            raise ValueError("Last command haven't been processed.")
+        self._verify_set(inspect.currentframe().f_code.co_name, vbounds)
 
     @current_set.setter
+    @coalesced_write
     def current_set(self, iset: float) -> None:
         """
         Set the channel current set.
@@ -843,10 +861,14 @@ class Channel(BaseChannel):
             value=iset,
             expected_response_type=None,
         )
-        if not (self.current_set == iset or self.current_set == -iset):
-            raise ValueError("Last command haven't been processed.")
+        self._verify_set(
+            inspect.currentframe().f_code.co_name,
+            iset,
+            lambda value: value in (iset, -iset),
+        )
 
     @current_bounds.setter
+    @coalesced_write
     def current_bounds(self, ibounds: float) -> None:
         """
         Set the channel current bounds.
@@ -859,8 +881,7 @@ class Channel(BaseChannel):
             value=ibounds,
             expected_response_type=None,
         )
-        if self.current_bounds != ibounds:
-            raise ValueError("Last command haven't been processed.")
+        self._verify_set(inspect.currentframe().f_code.co_name, ibounds)
 
     def set_channel_voltage_ramp_up_down_speed(
         self, speed: int
@@ -886,6 +907,7 @@ class Channel(BaseChannel):
             raise ValueError("Last command haven't been processed.")
 
     @channel_voltage_ramp_up_speed.setter
+    @coalesced_write
     def channel_voltage_ramp_up_speed(
         self, speed: int
     ) -> None:  # Instruction for EHS, NHR or SHR only
@@ -903,10 +925,10 @@ class Channel(BaseChannel):
             value=speed,
             expected_response_type=None,
         )
-        if self.channel_voltage_ramp_up_speed != speed:
-            raise ValueError("Last command haven't been processed.")
+        self._verify_set(inspect.currentframe().f_code.co_name, speed)
 
     @channel_voltage_ramp_down_speed.setter
+    @coalesced_write
     def channel_voltage_ramp_down_speed(
         self, speed: float
     ) -> None:  # Instruction for EHS, NHR or SHR only
@@ -924,8 +946,7 @@ class Channel(BaseChannel):
             value=speed,
             expected_response_type=None,
         )
-        if self.channel_voltage_ramp_down_speed != speed:
-            raise ValueError("Last command haven't been processed.")
+        self._verify_set(inspect.currentframe().f_code.co_name, speed)
 
     def set_channel_current_ramp_up_down_speed(
         self, speed: float
@@ -951,6 +972,7 @@ class Channel(BaseChannel):
             raise ValueError("Last command haven't been processed.")
 
     @channel_current_ramp_up_speed.setter
+    @coalesced_write
     def channel_current_ramp_up_speed(
         self, speed: float
     ) -> None:  # Instruction for EHS, NHR or SHR only
@@ -968,10 +990,10 @@ class Channel(BaseChannel):
             value=speed,
             expected_response_type=None,
         )
-        if self.channel_current_ramp_up_speed != speed:
-            raise ValueError("Last command haven't been processed.")
+        self._verify_set(inspect.currentframe().f_code.co_name, speed)
 
     @channel_current_ramp_down_speed.setter
+    @coalesced_write
     def channel_current_ramp_down_speed(
         self, speed: float
     ) -> None:  # Instruction for EHS, NHR or SHR only
@@ -989,8 +1011,7 @@ class Channel(BaseChannel):
             value=speed,
             expected_response_type=None,
         )
-        if self.channel_current_ramp_down_speed != speed:
-            raise ValueError("Last command haven't been processed.")
+        self._verify_set(inspect.currentframe().f_code.co_name, speed)
 
     def switch_on_high_voltage(self) -> None:
         """
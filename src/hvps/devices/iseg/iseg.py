@@ -2,21 +2,86 @@ from __future__ import annotations
 
 from ..hvps import Hvps
 from .module import Module
-from ...commands.iseg import _write_command_read_response
+from typing import Dict, List
+
+from ...commands.iseg import (
+    _command_parameter,
+    _command_priority,
+    _write_command_read_response,
+)
+from ...commands.iseg.channel import (
+    _get_mon_channel_command,
+    _get_set_channel_command,
+    _MON_CHANNEL_COMMANDS,
+)
+from ...commands.iseg.module import _get_mon_module_command, _MON_MODULE_COMMANDS
+from ...scheduling import priority
 
 
 class Iseg(Hvps):
+    _brand = "iseg"
+
     def _write_command_read_response(
         self, command: bytes, expected_response_type: type | None
     ) -> str | None:
-        return _write_command_read_response(
-            ser=self._serial,
-            lock=self._lock,
-            logger=self._logger,
-            command=command,
-            expected_response_type=expected_response_type,
+        if self._unsupported:
+            self._check_supported(0, _command_parameter(command))
+        if _command_priority(command) == "interactive":
+            # queries
+            return self._coalescer.read(
+                (command, expected_response_type),
+                lambda: self._send_command(command, expected_response_type),
+            )
+        try:
+            return self._send_command(command, expected_response_type)
+        finally:
+            self._coalescer.invalidate()
+
+    def _send_command(
+        self, command: bytes, expected_response_type: type | None
+    ) -> str | None:
+        return self._reconnector.run(
+            lambda: _write_command_read_response(
+                ser=self._serial,
+                lock=self._lock,
+                logger=self._logger,
+                command=command,
+                expected_response_type=expected_response_type,
+                timeouts=self._timeouts,
+            ),
+            replay=_command_priority(command) == "interactive",
         )
 
+    def _capability_boards(self) -> List[int]:
+        return [0]
+
+    def _model(self, bd: int) -> str:
+        # "iseg Spezialelektronik GmbH,NHR 42 60r,5200068,2.0.6": model and firmware release
+        module = self.module(bd)
+        fields = [field.strip() for field in module.id_string]
+        model, release = fields[1:2], fields[3:4]
+        return "/".join(["iseg", *model, *release, module.firmware_name])
+
+    def _capability_commands(self, bd: int) -> Dict[str, bytes]:
+        commands = [
+            _get_mon_module_command(entry["command"])
+            for entry in _MON_MODULE_COMMANDS.values()
+            if entry["command"]
+        ] + [
+            _get_mon_channel_command(0, entry["command"])
+            for entry in _MON_CHANNEL_COMMANDS.values()
+            if entry["command"]
+        ]
+        return {_command_parameter(command): command for command in commands}
+
+    def _probe_command(self, bd: int, command: bytes) -> bool:
+        # invalid commands are answered with "?"
+        return self._send_command(command, None) != "?"
+
+    def _identity(self) -> str:
+        # includes the serial number
+        return self.module(0).id_string
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._modules = {
@@ -24,13 +89,45 @@ class Iseg(Hvps):
                 module=i,
                 write_command_read_response=self._write_command_read_response,
                 logger=self._logger,
+                write_coalescer=self._write_coalescer,
+                verifier=self._verifier,
             )
             for i in [0]
         }
 
     def module(self, module: int = 0) -> Module:
-        self._logger.debug(f"Getting module {module}")
+        self._logger.debug("Getting module %d", module)
         if module in self._modules.keys():
             return self._modules[module]
         else:
             raise ValueError(f"Module {module} does not exist")
+
+    def emergency_off(self) -> int:
+        """Shut down the high voltage of all the channels without ramp (":VOLT EMCY OFF"), in a single command.
+
+        The command has the "emergency" priority, so it is sent before any other command waiting for the port
+        (e.g. background polling). The channels stay in emergency off until it is cleared
+        (`Channel.clear_channel_emergency_off`).
+
+        Returns:
+            int: The number of commands sent.
+
+        Raises:
+            ValueError: If the device does not confirm the command.
+        """
+        module = self.module(0)
+        with priority("emergency"):
+            # known once the channels have been used, otherwise read from the module
+            number_of_channels = len(module._channels) or module.number_of_channels
+            self._logger.warning("Emergency off of %d channels", number_of_channels)
+            response = self._write_command_read_response(
+                command=_get_set_channel_command(
+                    channel=f"0-{number_of_channels - 1}",
+                    command=":VOLT EMCY OFF",
+                    value=None,
+                ),
+                expected_response_type=None,
+            )
+        if response != "1":
+            raise ValueError("The emergency off was not confirmed")
+        return 1
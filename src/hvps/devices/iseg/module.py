@@ -79,12 +79,14 @@ class Module(BaseModule):
         if len(self._channels) == 0:
             self._logger.debug("Initializing channels")
             for channel in range(self.number_of_channels):
-                self._logger.debug(f"Creating channel {channel}")
+                self._logger.debug("Creating channel %d", channel)
                 self._channels.append(
                     Channel(
                         channel=channel,
                         write_command_read_response=self._write_command_read_response,
                         logger=self._logger,
+                        write_coalescer=self._write_coalescer,
+                        verifier=self._verifier,
                     )
                 )
         return self._channels
@@ -108,17 +110,9 @@ class Module(BaseModule):
         Read out module status register
 
         Returns:
-            str: The board alarm status value.
+            dict: The state of each bit of the module status register.
         """
-        command_name = inspect.currentframe().f_code.co_name
-        response = self._write_command_read_response_module_mon(
-            method_name=command_name, expected_response_type=str
-        )
-        register = check_command_output_and_convert(
-            command_name, None, response, _MON_MODULE_COMMANDS
-        )
-        bit_array = string_number_to_bit_array(register)
-        bit_array = list(reversed(bit_array))
+        bit_array = string_number_to_bit_array(self.module_status_register)
 
         return {
             "Is Voltage Ramp Speed Limited": bit_array[21],
@@ -626,8 +620,12 @@ class Module(BaseModule):
             value=address,
             expected_response_type=None,
         )
-        if self.module_can_address != address:
-            raise ValueError("Last command haven't been processed.")
+        self._verifier.check(
+            key=(self, "module_can_address"),
+            read=lambda: self.module_can_address,
+            equal=lambda value: value == address,
+            message="Last command haven't been processed.",
+        )
 
     @module_can_bitrate.setter
     def module_can_bitrate(self, bitrate: int) -> None:
@@ -642,8 +640,12 @@ class Module(BaseModule):
             value=bitrate,
             expected_response_type=None,
         )
-        if self.module_can_bitrate != bitrate:
-            raise ValueError("Last command haven't been processed.")
+        self._verifier.check(
+            key=(self, "module_can_bitrate"),
+            read=lambda: self.module_can_bitrate,
+            equal=lambda value: value == bitrate,
+            message="Last command haven't been processed.",
+        )
 
     def enter_configuration_mode(self, serial_number: int):
         """Set the device to configuration mode to change the CAN bitrate or address.
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from typing import List
 
 import logging
@@ -5,6 +7,8 @@ from abc import ABC, abstractmethod
 from typing import Callable
 
 from .channel import Channel
+from ..coalescing import WriteCoalescer
+from ..verification import Verifier
 
 
 class Module(ABC):
@@ -13,6 +17,8 @@ class Module(ABC):
         module: int,
         write_command_read_response: Callable,
         logger: logging.Logger,
+        write_coalescer: WriteCoalescer | None = None,
+        verifier: Verifier | None = None,
     ):
         """Initialize the Module object.
 
@@ -20,12 +26,18 @@ class Module(ABC):
             module (int): The module number.
             write_command_read_response (Callable): The function used to write a command and read the response.
             logger (logging.Logger): The logger object used for logging.
+            write_coalescer (WriteCoalescer | None, optional): The write coalescer of the device, passed to the
+                channels. Defaults to None.
+            verifier (Verifier | None, optional): The verifier of the device, used by the setters (of the module and
+                the channels) to read back the values written. Defaults to None (values are read back immediately).
 
         """
 
         self._module = module
         self._write_command_read_response = write_command_read_response
         self._logger = logger
+        self._write_coalescer = write_coalescer
+        self._verifier = verifier if verifier is not None else Verifier()
         self._channels: List[Channel] = []
 
     @property
@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import serial
+from serial.tools import list_ports
+
+from .commands.caen import _scan_boards as _scan_caen_boards
+from .commands.caen import _write_commands_read_responses
+from .commands.caen.module import _get_mon_module_command as _get_caen_mon_command
+from .commands.iseg import _parse_response as _parse_iseg_response
+from .commands.iseg.module import _get_mon_module_command as _get_iseg_mon_command
+
+_logger = logging.getLogger(__name__)
+
+BRANDS = ["caen", "iseg"]
+
+# baud rates supported by the devices, most common first
+BAUDRATES = {
+    "caen": [9600, 115200, 57600, 38400, 19200],
+    "iseg": [9600, 115200],
+}
+
+_cache_lock = threading.Lock()
+
+
+def _default_cache_path() -> str:
+    """
+    Get the path of the discovery cache file.
+
+    The location can be overridden with the `HVPS_CACHE_DIR` environment variable.
+
+    Returns:
+        str: The path of the cache file.
+    """
+    cache_dir = os.environ.get("HVPS_CACHE_DIR")
+    if cache_dir is None:
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        else:
+            base = os.environ.get(
+                "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+            )
+        cache_dir = os.path.join(base, "hvps")
+    return os.path.join(cache_dir, "discovery.json")
+
+
+def _port_identity(port_info) -> str | None:
+    """
+    Get a stable identity of a serial port from its USB descriptors.
+
+    Args:
+        port_info (serial.tools.list_ports_common.ListPortInfo): The port information.
+
+    Returns:
+        str | None: "VID:PID:SERIAL" (or "VID:PID@LOCATION" if the adapter has no serial number),
+        None for ports that are not USB (their identity cannot be trusted across reconnections).
+    """
+    if port_info.vid is None or port_info.pid is None:
+        return None
+    identity = f"{port_info.vid:04X}:{port_info.pid:04X}"
+    if port_info.serial_number:
+        return f"{identity}:{port_info.serial_number}"
+    return f"{identity}@{port_info.location}"
+
+
+def _load_cache(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _save_cache(path: str, cache: Dict[str, Dict]) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        _logger.warning("Could not write discovery cache %s: %s", path, e)
+
+
+def clear_cache(cache_path: str | None = None) -> None:
+    """
+    Remove all the entries of the discovery cache.
+
+    Args:
+        cache_path (str | None, optional): The path of the cache file. Defaults to the user cache directory.
+    """
+    path = cache_path or _default_cache_path()
+    with _cache_lock:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _open_serial(port: str, baudrate: int, timeout: float) -> serial.Serial:
+    return serial.Serial(
+        port=port, baudrate=baudrate, timeout=timeout, write_timeout=timeout
+    )
+
+
+def _read_until(ser: serial.Serial, accept, max_lines: int = 3) -> bytes | None:
+    """
+    Read lines until one is accepted. Lines left over from a previous probe (e.g. an error reply of a device of
+    another brand) are skipped. Returns None on timeout or if no line is accepted.
+    """
+    for _ in range(max_lines):
+        line = ser.readline()
+        if not line.endswith(b"\n"):
+            return None
+        if accept(line):
+            return line
+    return None
+
+
+def _probe_caen(ser: serial.Serial) -> Dict | None:
+    """
+    Probe for CAEN boards with harmless monitor commands (`BDNAME` for all 32 board addresses, pipelined).
+
+    Returns:
+        Dict | None: The identification of the device (first board), None if no board answered.
+    """
+    ser.reset_input_buffer()
+    boards = _scan_caen_boards(
+        ser=ser, lock=threading.Lock(), logger=_logger, timeout=ser.timeout
+    )
+    if not boards:
+        return None
+
+    board = min(boards.keys())
+    return {
+        "brand": "caen",
+        "boards": sorted(boards.keys()),
+        "model": boards[board]["name"],
+        "serial_number": boards[board]["serial_number"],
+        "number_of_channels": boards[board]["number_of_channels"],
+    }
+
+
+def _probe_iseg(ser: serial.Serial) -> Dict | None:
+    """
+    Probe for an iseg device with the `*IDN?` query.
+
+    The identification string has the form "iseg Spezialelektronik GmbH,NHR 42 60r,5200068,2.0.6"
+    (manufacturer, model, serial number, firmware).
+
+    Returns:
+        Dict | None: The identification of the device, None if there was no valid response.
+    """
+    command = _get_iseg_mon_command(command="*IDN")
+    ser.reset_input_buffer()
+    ser.write(command)
+    if _read_until(ser, lambda line: line == command) is None:
+        return None
+    response = ser.readline()
+    try:
+        fields = _parse_iseg_response(response, None)
+    except ValueError:
+        return None
+    if not isinstance(fields, list) or len(fields) < 3:
+        return None
+    fields = [field.strip() for field in fields]
+    return {
+        "brand": "iseg",
+        "boards": [0],
+        "model": fields[1],
+        "serial_number": fields[2],
+        "firmware": fields[3] if len(fields) > 3 else None,
+    }
+
+
+_PROBES = {"caen": _probe_caen, "iseg": _probe_iseg}
+
+
+def _check_caen(ser: serial.Serial, entry: Dict) -> bool:
+    """Check that the first board of a cached entry still answers `BDNAME` with the cached model."""
+    ser.reset_input_buffer()
+    board = entry["boards"][0]
+    responses = _write_commands_read_responses(
+        ser,
+        threading.Lock(),
+        _logger,
+        [_get_caen_mon_command(bd=board, command="BDNAME")],
+        ser.timeout,
+    )
+    return (board, entry["model"]) in responses
+
+
+def _check_iseg(ser: serial.Serial, entry: Dict) -> bool:
+    """Check that the device answers `*IDN?` with the cached model and serial number."""
+    result = _probe_iseg(ser)
+    return (
+        result is not None
+        and result["model"] == entry["model"]
+        and result["serial_number"] == entry["serial_number"]
+    )
+
+
+_CHECKS = {"caen": _check_caen, "iseg": _check_iseg}
+
+
+def _check_entry(port: str, entry: Dict, timeout: float) -> bool | None:
+    """
+    Check with a single cheap probe at the cached baud rate that a cached entry still describes the device behind the
+    port (the device may have been swapped behind the same USB adapter). None if the port cannot be opened, e.g.
+    while another process uses the device: nothing is known about it.
+    """
+    try:
+        ser = _open_serial(port, entry["baudrate"], timeout)
+    except (serial.SerialException, OSError, ValueError) as e:
+        _logger.info("Could not open %s to check its cached device: %s", port, e)
+        return None
+    try:
+        return _CHECKS[entry["brand"]](ser, entry)
+    except (serial.SerialException, OSError, ValueError, KeyError, IndexError) as e:
+        _logger.debug("Check of the cached entry of %s failed: %s", port, e)
+        return False
+    finally:
+        ser.close()
+
+
+def _discover_port(
+    port: str,
+    entry: Dict | None,
+    baudrates: List[int],
+    brands: List[str],
+    timeout: float,
+) -> Tuple[Dict | None, bool]:
+    # the device found, and whether the cached entry is stale (the device did not answer)
+    if entry is not None:
+        checked = _check_entry(port, entry, timeout)
+        if checked is None:
+            # busy: the port cannot be probed either, the entry is kept
+            return None, False
+        if checked:
+            _logger.debug("Using cached discovery result for %s", port)
+            # the device name of a USB adapter may change between reconnections
+            return {**entry, "port": port}, False
+        _logger.info("Cached discovery result of %s is stale, probing again", port)
+    return _probe_port(port, baudrates, brands, timeout), entry is not None
+
+
+def _probe_port(
+    port: str, baudrates: List[int], brands: List[str], timeout: float
+) -> Dict | None:
+    """
+    Probe a single port for any of the brands, trying one baud rate at a time.
+
+    A port can only be opened once, so the baud rates of a port are probed sequentially.
+    """
+    for baudrate in baudrates:
+        try:
+            ser = _open_serial(port, baudrate, timeout)
+        except (serial.SerialException, OSError, ValueError) as e:
+            _logger.debug("Could not open %s: %s", port, e)
+            return None
+        try:
+            for brand in brands:
+                try:
+                    result = _PROBES[brand](ser)
+                except (serial.SerialException, OSError) as e:
+                    _logger.debug("Probe of %s on %s failed: %s", brand, port, e)
+                    result = None
+                if result is not None:
+                    _logger.info(
+                        "Found %s %s on %s (baud rate %s)",
+                        brand,
+                        result["model"],
+                        port,
+                        baudrate,
+                    )
+                    return {"port": port, "baudrate": baudrate, **result}
+        finally:
+            ser.close()
+    return None
+
+
+def discover(
+    ports: List[str] | None = None,
+    baudrates: List[int] | None = None,
+    brands: List[str] | None = None,
+    timeout: float = 0.2,
+    use_cache: bool = True,
+    cache_path: str | None = None,
+) -> List[Dict]:
+    """
+    Find the HVPS devices connected to the serial ports.
+
+    All candidate ports are probed concurrently with a short timeout. Each port is probed with a CAEN
+    `BDNAME` monitor command (for all board addresses) and an iseg `*IDN?` query (both harmless) for each candidate baud rate.
+
+    Results are cached on disk keyed by the USB identity of the port (VID:PID and serial number).
+    For ports whose USB identity is in the cache, a single probe at the cached baud rate (`BDNAME` of the first
+    board or `*IDN?`) checks that the cached device is still there; the port is fully probed only if it is not. The
+    entry of a port that cannot be opened (e.g. used by another process) is kept, it is only removed when the device
+    does not answer.
+
+    Args:
+        ports (List[str] | None, optional): The ports to probe. Defaults to all available serial ports.
+        baudrates (List[int] | None, optional): The baud rates to try. Defaults to the ones supported by each brand.
+        brands (List[str] | None, optional): The brands to look for ("caen", "iseg"). Defaults to all brands.
+        timeout (float, optional): The timeout of each probe in seconds. Defaults to 0.2.
+        use_cache (bool, optional): Use (and update) the discovery cache. Defaults to True.
+        cache_path (str | None, optional): The path of the cache file. Defaults to the user cache directory.
+
+    Returns:
+        List[Dict]: One entry per device found, with keys "port", "baudrate", "brand", "model",
+        "serial_number" and "boards" (board numbers found on the line), plus "firmware" for iseg devices
+        and "number_of_channels" for CAEN devices.
+
+    Raises:
+        ValueError: If an unknown brand is requested.
+    """
+    brands = brands or BRANDS
+    for brand in brands:
+        if brand not in BRANDS:
+            raise ValueError(f"Invalid brand '{brand}'. Valid brands are: {BRANDS}")
+
+    port_infos = {port_info.device: port_info for port_info in list_ports.comports()}
+    if ports is None:
+        ports = list(port_infos.keys())
+
+    if baudrates is None:
+        baudrates = []
+        for brand in brands:
+            baudrates += [b for b in BAUDRATES[brand] if b not in baudrates]
+
+    cache_path = cache_path or _default_cache_path()
+    with _cache_lock:
+        cache = _load_cache(cache_path) if use_cache else {}
+
+    entries = {}
+    for port in ports:
+        identity = _port_identity(port_infos[port]) if port in port_infos else None
+        entry = cache.get(identity) if identity is not None else None
+        if (
+            entry is not None
+            and entry["brand"] in brands
+            and entry["baudrate"] in baudrates
+        ):
+            entries[port] = entry
+
+    results: Dict[str, Dict] = {}
+    if ports:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(ports)) as executor:
+            probes = {
+                port: executor.submit(
+                    _discover_port,
+                    port,
+                    entries.get(port),
+                    baudrates,
+                    brands,
+                    timeout,
+                )
+                for port in ports
+            }
+        _logger.debug("Probed %d ports in %.3f s", len(ports), time.perf_counter() - t0)
+        stale = []
+        for port, probe in probes.items():
+            result, expired = probe.result()
+            identity = _port_identity(port_infos[port]) if port in port_infos else None
+            if result is None:
+                if expired:
+                    # the cached device is gone
+                    stale.append(identity)
+                continue
+            results[port] = result
+            if identity is not None:
+                cache[identity] = result
+
+        if use_cache:
+            with _cache_lock:
+                cache = {**_load_cache(cache_path), **cache}
+                for identity in stale:
+                    cache.pop(identity, None)
+                _save_cache(cache_path, cache)
+
+    return [results[port] for port in ports if port in results]
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, List
+
+from .devices.hvps import Hvps
+
+_logger = logging.getLogger(__name__)
+
+
+def emergency_off(devices: List[Hvps]) -> Dict:
+    """
+    Switch off all the channels of all the devices as fast as possible.
+
+    Each device is handled in its own thread, so that the ports are addressed in parallel, with the minimum number
+    of commands (`Caen.emergency_off`: one command per board, in a single burst; `Iseg.emergency_off`: one command
+    with the list of all the channels). The commands are sent before any other command waiting for the port.
+    A failure on one device does not stop the others.
+
+    Example:
+        report = hvps.emergency_off([caen, iseg])
+        if not report["ok"]:
+            print([device["error"] for device in report["devices"] if device["error"]])
+
+    Args:
+        devices (List[Hvps]): The devices, connected.
+
+    Returns:
+        Dict: With keys "ok" (all the devices confirmed), "elapsed" (time until the last device confirmed, in
+        seconds) and "devices": for each device, in order, its "port", "brand", "commands" (number of commands
+        sent), "elapsed" (time until it confirmed, in seconds) and "error" (None if it confirmed).
+    """
+    results: List[Dict] = [
+        {
+            "port": device.port,
+            "brand": device._brand,
+            "commands": 0,
+            "elapsed": None,
+            "error": None,
+        }
+        for device in devices
+    ]
+    start = time.perf_counter()
+
+    def run(device: Hvps, result: Dict) -> None:
+        try:
+            result["commands"] = device.emergency_off()
+        except Exception as e:
+            result["error"] = repr(e)
+            _logger.error("Emergency off of %s failed: %r", result["port"], e)
+        result["elapsed"] = time.perf_counter() - start
+
+    threads = [
+        threading.Thread(
+            target=run, args=(device, result), name=f"hvps-emergency-{result['port']}"
+        )
+        for device, result in zip(devices, results)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    _logger.warning("Emergency off of %d devices in %.3f s", len(devices), elapsed)
+    return {
+        "ok": all(result["error"] is None for result in results),
+        "elapsed": elapsed,
+        "devices": results,
+    }
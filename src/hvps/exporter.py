@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+from .instrumentation import Stats, _stats
+from .polling import Poller
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# monitored channel values: sample key, metric name and help
+_CHANNEL_METRICS = [
+    ("vmon", "hvps_channel_voltage_volts", "Measured channel voltage."),
+    ("imon", "hvps_channel_current_amperes", "Measured channel current."),
+    ("vset", "hvps_channel_voltage_set_volts", "Channel voltage set point."),
+    ("status", "hvps_channel_status", "Channel status register."),
+]
+
+
+def _format_value(value) -> str:
+    if value is True or value is False:
+        return "1" if value else "0"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\""))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Family:
+    def __init__(self, name: str, metric_type: str, help: str):
+        self.name = name
+        self.type = metric_type
+        self.help = help
+        self.samples: List[Tuple[str, Dict, object]] = []
+
+    def add(self, labels: Dict, value, suffix: str = "") -> None:
+        self.samples.append((suffix, labels, value))
+
+    def add_histogram(self, labels: Dict, histogram: Dict) -> None:
+        for bound, count in histogram["buckets"]:
+            self.add({**labels, "le": _format_value(bound)}, count, "_bucket")
+        self.add(labels, histogram["count"], "_count")
+        self.add(labels, histogram["sum"], "_sum")
+
+    def render(self, lines: List[str]) -> None:
+        if not self.samples:
+            return
+        lines.append(f"# TYPE {self.name} {self.type}")
+        lines.append(f"# HELP {self.name} {self.help}")
+        for suffix, labels, value in self.samples:
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+            )
+
+
+def render_metrics(pollers: List[Poller], stats: Stats | None = None) -> str:
+    """
+    Render the snapshots of the pollers and the transport statistics in the OpenMetrics text format.
+
+    Only the in-memory snapshots are read, the serial ports are never accessed.
+
+    Args:
+        pollers (List[Poller]): The pollers.
+        stats (Stats | None, optional): The transport statistics to include. Defaults to None (not included).
+
+    Returns:
+        str: The exposition, ending with "# EOF".
+    """
+    channel_families = {
+        key: _Family(name, "gauge", help) for key, name, help in _CHANNEL_METRICS
+    }
+    status_bit = _Family(
+        "hvps_channel_status_bit", "gauge", "Named bits of the channel status register."
+    )
+    sample_time = _Family(
+        "hvps_channel_sample_timestamp_seconds",
+        "gauge",
+        "Time the channel was last read.",
+    )
+    up = _Family("hvps_up", "gauge", "Whether the last poll of the crate succeeded.")
+    polls = _Family("hvps_polls", "counter", "Number of polls of the crate.")
+    poll_errors = _Family(
+        "hvps_poll_errors", "counter", "Number of failed polls of the crate."
+    )
+    poll_duration = _Family(
+        "hvps_poll_duration_seconds", "gauge", "Duration of the last poll of the crate."
+    )
+    last_success = _Family(
+        "hvps_poll_last_success_timestamp_seconds",
+        "gauge",
+        "Start time of the last successful poll of the crate.",
+    )
+
+    for poller in pollers:
+        crate = {"crate": poller.name}
+        status = poller.status()
+        up.add(crate, status["up"])
+        polls.add(crate, status["passes"], "_total")
+        poll_errors.add(crate, status["errors"], "_total")
+        if status["duration"] is not None:
+            poll_duration.add(crate, status["duration"])
+        if status["last_success"] is not None:
+            last_success.add(crate, status["last_success"])
+
+        for sample in poller.snapshot():
+            labels = {
+                "crate": sample["crate"],
+                "brand": sample["brand"],
+                "board": sample["board"],
+                "channel": sample["channel"],
+            }
+            for key, family in channel_families.items():
+                family.add(labels, sample[key])
+            for bit, value in sample["status_bits"].items():
+                status_bit.add({**labels, "bit": bit}, value)
+            sample_time.add(labels, sample["time"])
+
+    families = [
+        *channel_families.values(),
+        status_bit,
+        sample_time,
+        up,
+        polls,
+        poll_errors,
+        poll_duration,
+        last_success,
+    ]
+
+    if stats is not None:
+        commands = _Family(
+            "hvps_transport_commands", "counter", "Number of commands sent."
+        )
+        errors = _Family(
+            "hvps_transport_errors", "counter", "Number of commands that failed."
+        )
+        bytes_written = _Family(
+            "hvps_transport_written_bytes", "counter", "Bytes written to the port."
+        )
+        bytes_read = _Family(
+            "hvps_transport_read_bytes", "counter", "Bytes read from the port."
+        )
+        duration = _Family(
+            "hvps_transport_command_duration_seconds",
+            "histogram",
+            "Total duration of the commands.",
+        )
+        phase_duration = _Family(
+            "hvps_transport_phase_duration_seconds",
+            "histogram",
+            "Duration of each phase of the commands (lock_wait, write, ttfb, read, parse).",
+        )
+        for command in stats.snapshot()["commands"]:
+            labels = {
+                "port": command["port"],
+                "mnemonic": command["mnemonic"],
+                "board": "" if command["board"] is None else command["board"],
+            }
+            commands.add(labels, command["count"], "_total")
+            errors.add(labels, command["errors"], "_total")
+            bytes_written.add(labels, command["bytes_written"], "_total")
+            bytes_read.add(labels, command["bytes_read"], "_total")
+            duration.add_histogram(labels, command["total"])
+            for phase, histogram in command["phases"].items():
+                if histogram["count"] > 0:
+                    phase_duration.add_histogram({**labels, "phase": phase}, histogram)
+        families += [
+            commands,
+            errors,
+            bytes_written,
+            bytes_read,
+            duration,
+            phase_duration,
+        ]
+
+    lines: List[str] = []
+    for family in families:
+        family.render(lines)
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _Server
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404, "Only /metrics is served")
+            return
+        body = render_metrics(self.server.pollers, self.server.stats).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(format, *args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pollers: List[Poller], stats: Stats | None):
+        super().__init__(address, _Handler)
+        self.pollers = pollers
+        self.stats = stats
+
+
+class Exporter:
+    def __init__(
+        self,
+        pollers: List[Poller],
+        host: str = "127.0.0.1",
+        port: int = 9560,
+        stats: bool = True,
+    ):
+        """
+        Serve the monitored channel values and the transport statistics on a local HTTP `/metrics` endpoint
+        (OpenMetrics text format, compatible with Prometheus).
+
+        Scrapes are rendered from the snapshots of the pollers, so the scrape frequency has no effect on the serial
+        lines. Starting the exporter starts the pollers, and enables the transport statistics if requested.
+
+        Args:
+            pollers (List[Poller]): One poller per serial port.
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The TCP port to listen on, 0 to pick a free one. Defaults to 9560.
+            stats (bool, optional): Include the transport statistics (`hvps.stats()`). Defaults to True.
+        """
+        self.pollers = pollers
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self._server: _Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """The address the exporter listens on, (host, port)."""
+        if self._server is None:
+            return self.host, self.port
+        return self._server.server_address[:2]
+
+    def start(self) -> None:
+        """Start the pollers and serve in a background thread."""
+        if self._server is not None:
+            return
+        if self.stats:
+            _stats.enable()
+        for poller in self.pollers:
+            poller.start()
+        self._server = _Server(
+            (self.host, self.port), self.pollers, _stats if self.stats else None
+        )
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="hvps-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and stop the pollers."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+        for poller in self.pollers:
+            poller.stop()
+
+    def __enter__(self) -> Exporter:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def serve_forever(self) -> None:
+        """Start and block until interrupted (KeyboardInterrupt), then stop."""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def load_config(path: str) -> Dict:
+    """
+    Read an exporter, daemon or server configuration file (TOML).
+
+    Example:
+        [exporter]
+        host = "127.0.0.1"
+        port = 9560
+        stats = true
+
+        [daemon]  # python -m hvps daemon, see `hvps.daemon`
+        address = "unix:/run/hvps.sock"
+
+        [server]  # python -m hvps server, see `hvps.server`
+        port = 9562
+
+        [[device]]
+        brand = "caen"
+        port = "/dev/ttyUSB0"
+        baudrate = 115200
+        timeout = 1.0
+        interval = 1.0
+        boards = [0, 1]  # optional, found with Caen.scan_boards if not set
+        name = "crate-1"  # optional, defaults to the port
+        pipeline = false  # optional, defaults to true for socket:// and rfc2217:// urls, see `Poller`
+
+        [[device]]
+        brand = "iseg"
+        url = "socket://terminal-server:4001"  # instead of port, see `Hvps`
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        Dict: The configuration.
+
+    Raises:
+        ValueError: If the configuration is not valid.
+    """
+    try:
+        import tomllib
+    except ImportError:  # python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ImportError(
+                "Reading the configuration requires python >= 3.11 or the 'tomli' package (pip install hvps[exporter])"
+            )
+
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+
+    devices = config.get("device", [])
+    if not isinstance(devices, list) or len(devices) == 0:
+        raise ValueError(f"No [[device]] found in {path}")
+    for device in devices:
+        if device.get("brand") not in ("caen", "iseg"):
+            raise ValueError(
+                f"Invalid brand {device.get('brand')!r} in {path}, must be 'caen' or 'iseg'"
+            )
+        if ("port" in device) == ("url" in device):
+            raise ValueError(f"Each device needs either a port or a url in {path}")
+    ports = [device.get("port", device.get("url")) for device in devices]
+    if len(set(ports)) != len(ports):
+        raise ValueError(f"Each port can only be used by one device in {path}")
+    return config
+
+
+def _pollers(config: Dict) -> List[Poller]:
+    """Create one poller per device of a configuration (see `load_config`)."""
+    from . import Caen, Iseg
+
+    pollers = []
+    for device in config["device"]:
+        device_class = Caen if device["brand"] == "caen" else Iseg
+        pollers.append(
+            Poller(
+                device_class(
+                    port=device.get("port"),
+                    url=device.get("url"),
+                    baudrate=device.get("baudrate", 115200),
+                    timeout=device.get("timeout", 1.0),
+                ),
+                interval=device.get("interval", 1.0),
+                boards=device.get("boards"),
+                name=device.get("name"),
+                pipeline=device.get("pipeline"),
+            )
+        )
+    return pollers
+
+
+def from_config(config: Dict) -> Exporter:
+    """
+    Create the exporter described by a configuration (see `load_config`), with one poller per device.
+
+    Args:
+        config (Dict): The configuration.
+
+    Returns:
+        Exporter: The exporter (not started).
+    """
+    exporter = config.get("exporter", {})
+    return Exporter(
+        _pollers(config),
+        host=exporter.get("host", "127.0.0.1"),
+        port=exporter.get("port", 9560),
+        stats=exporter.get("stats", True),
+    )
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Dict, List, Tuple
+
+# the values kept for each sample, with their array type codes
+FIELDS = {"time": "d", "vmon": "d", "imon": "d", "status": "I"}
+
+
+class ChannelHistory:
+    def __init__(self, capacity: int = 3600):
+        """
+        The last `capacity` samples of a channel, in preallocated ring buffers (one `array.array` per field of
+        `FIELDS`: time in seconds since the epoch, vmon in V, imon in A and the status register).
+
+        Appending is O(1) and never allocates: once full, the oldest sample is overwritten, so the memory used is
+        fixed (28 bytes per sample). Samples must be appended in order of time. Appending and reading take a lock
+        for the few operations that update or copy the buffers, so a reader in another thread never sees a sample
+        half written, or the position of a sample with the values of another one.
+
+        Args:
+            capacity (int, optional): The number of samples kept. Defaults to 3600.
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._buffers = {
+            field: array(code, bytes(array(code).itemsize * capacity))
+            for field, code in FIELDS.items()
+        }
+        # index of the next sample, and number of samples
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, time: float, vmon: float, imon: float, status: int) -> None:
+        """Add a sample, replacing the oldest one if full."""
+        buffers = self._buffers
+        with self._lock:
+            i = self._next
+            buffers["time"][i] = time
+            buffers["vmon"][i] = vmon
+            buffers["imon"][i] = imon
+            buffers["status"][i] = status
+            self._next = (i + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def _index(self, n: int) -> int:
+        # position in the buffers of the n-th oldest sample
+        return (self._next - self._count + n) % self.capacity
+
+    def _bisect(self, time: float) -> int:
+        # number of samples older than `time`
+        times = self._buffers["time"]
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if times[self._index(middle)] < time:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _range(self, start: float | None, end: float | None) -> Tuple[int, int]:
+        first = 0 if start is None else self._bisect(start)
+        last = self._count if end is None else self._bisect(end)
+        return first, max(first, last)
+
+    def window(
+        self, start: float | None = None, end: float | None = None
+    ) -> List[Dict[str, memoryview]]:
+        """
+        The samples with `start <= time < end`, without copy.
+
+        The samples may wrap around the end of the ring buffers, so they are returned as one or two contiguous
+        segments, oldest first. Each segment maps each field to a memoryview of its buffer (e.g. for
+        `numpy.frombuffer`). The views see the samples appended later, which overwrite the oldest ones: copy them if
+        they are kept.
+
+        Args:
+            start (float | None, optional): The first time, in seconds since the epoch. Defaults to None (oldest).
+            end (float | None, optional): The end time (excluded). Defaults to None (newest included).
+
+        Returns:
+            List[Dict[str, memoryview]]: The segments, empty if there are no samples in the window.
+        """
+        with self._lock:
+            return self._window(start, end)
+
+    def _window(
+        self, start: float | None, end: float | None
+    ) -> List[Dict[str, memoryview]]:
+        first, last = self._range(start, end)
+        if first == last:
+            return []
+        begin = self._index(first)
+        stop = begin + last - first
+        if stop <= self.capacity:
+            spans = [(begin, stop)]
+        else:
+            spans = [(begin, self.capacity), (0, stop - self.capacity)]
+        return [
+            {field: memoryview(buffer)[i:j] for field, buffer in self._buffers.items()}
+            for i, j in spans
+        ]
+
+    def values(
+        self, field: str, start: float | None = None, end: float | None = None
+    ) -> List:
+        """
+        A copy of the values of a field with `start <= time < end`, oldest first (see `window`).
+
+        Args:
+            field (str): One of `FIELDS`.
+            start (float | None, optional): The first time. Defaults to None (oldest).
+            end (float | None, optional): The end time (excluded). Defaults to None (newest included).
+
+        Returns:
+            List: The values.
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Invalid field {field!r}, must be one of {list(FIELDS)}")
+        values = []
+        # copied before the next sample is appended
+        with self._lock:
+            for segment in self._window(start, end):
+                values += segment[field].tolist()
+        return values
+
+    def latest(self) -> Dict | None:
+        """
+        The newest sample.
+
+        Returns:
+            Dict | None: The value of each field, None if there are no samples.
+        """
+        with self._lock:
+            if self._count == 0:
+                return None
+            i = self._index(self._count - 1)
+            return {field: buffer[i] for field, buffer in self._buffers.items()}
+
+
+class History:
+    def __init__(self, capacity: int = 3600):
+        """
+        The history of all the channels polled (see `ChannelHistory`). Add `publish` as a sink of the pollers.
+
+        Example:
+            history = History(capacity=36000)  # 1 hour at 10 Hz
+            poller.add_sink(history.publish)
+            vmon = history.channel("crate-1", 0, 3).values("vmon", start=time.time() - 60)
+
+        Args:
+            capacity (int, optional): The number of samples kept for each channel. Defaults to 3600.
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._channels: Dict[Tuple, ChannelHistory] = {}
+
+    def publish(self, samples: List[Dict]) -> None:
+        """
+        Append the samples of a polling pass (sink of the pollers, see `Poller.poll`).
+
+        Args:
+            samples (List[Dict]): The samples.
+        """
+        with self._lock:
+            for sample in samples:
+                key = (sample["crate"], sample["board"], sample["channel"])
+                history = self._channels.get(key)
+                if history is None:
+                    history = self._channels[key] = ChannelHistory(self.capacity)
+                history.append(
+                    sample["time"], sample["vmon"], sample["imon"], sample["status"]
+                )
+
+    def channels(self) -> List[Tuple]:
+        """The channels with a history, as (crate, board, channel)."""
+        with self._lock:
+            return list(self._channels)
+
+    def channel(self, crate: str, board: int, channel: int) -> ChannelHistory:
+        """
+        The history of a channel.
+
+        Raises:
+            ValueError: If the channel has not been polled.
+        """
+        history = self._channels.get((crate, board, channel))
+        if history is None:
+            raise ValueError(
+                f"No history for channel {channel} of board {board} of {crate!r}"
+            )
+        return history
@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# phases of a command, in order
+PHASES = ["lock_wait", "write", "ttfb", "read", "parse"]
+
+# upper bounds of the histogram buckets in seconds: 1 us to ~16 s, doubling
+BUCKETS = [1e-6 * 2**i for i in range(25)]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "min", "max")
+
+    def __init__(self):
+        """A latency histogram with logarithmic buckets (see `BUCKETS`)."""
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Estimate a quantile from the buckets (upper bound of the bucket containing it, limited to the maximum).
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float | None: The estimated value in seconds, None if the histogram is empty.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count > 0:
+                bound = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "p50": self.quantile(0.50),
+            "p90": self.quantile(0.90),
+            "p99": self.quantile(0.99),
+            # cumulative counts per upper bound, as in OpenMetrics histograms
+            "buckets": [
+                (bound, count)
+                for bound, count in zip(
+                    [*BUCKETS, float("inf")], _cumulative(self.counts)
+                )
+            ],
+        }
+
+
+def _cumulative(counts: List[int]) -> List[int]:
+    total = 0
+    result = []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+class _CommandStats:
+    __slots__ = ("count", "errors", "bytes_written", "bytes_read", "phases", "total")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.phases: Dict[str, Histogram] = {phase: Histogram() for phase in PHASES}
+        self.total = Histogram()
+
+
+class _NullTimer:
+    """Timer used while the statistics are disabled: it only forwards the I/O."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def lap(self, phase: str) -> None:
+        pass
+
+    @staticmethod
+    def write(ser, data: bytes) -> None:
+        ser.write(data)
+
+    @staticmethod
+    def readline(ser) -> bytes:
+        return ser.readline()
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _CommandTimer:
+    __slots__ = (
+        "_stats",
+        "_key",
+        "_start",
+        "_last",
+        "_phases",
+        "_bytes_written",
+        "_bytes_read",
+    )
+
+    def __init__(self, stats: Stats, key: Tuple[str | None, str, int | None]):
+        self._stats = stats
+        self._key = key
+        self._phases: Dict[str, float] = {}
+        self._bytes_written = 0
+        self._bytes_read = 0
+
+    def __enter__(self):
+        self._start = self._last = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stats._record(
+            self._key,
+            self._phases,
+            time.perf_counter() - self._start,
+            self._bytes_written,
+            self._bytes_read,
+            exc_type is not None,
+        )
+        return False
+
+    def lap(self, phase: str) -> None:
+        """Attribute the time elapsed since the previous lap to `phase`."""
+        now = time.perf_counter()
+        self._phases[phase] = self._phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def write(self, ser, data: bytes) -> None:
+        ser.write(data)
+        self._bytes_written += len(data)
+        self.lap("write")
+
+    def readline(self, ser) -> bytes:
+        """
+        Read a line, measuring the time to the first byte of the first line read separately. The line is read
+        within the timeout of the port, as without statistics.
+        """
+        if "ttfb" in self._phases:
+            line = ser.readline()
+        else:
+            start = self._last
+            line = ser.read(1)
+            self.lap("ttfb")
+            if line and line != b"\n":
+                timeout = ser.timeout
+                if timeout is None:
+                    line += ser.readline()
+                else:
+                    # the rest of the line gets the time left, not a timeout of its own
+                    ser.timeout = max(timeout - (self._last - start), 0.0)
+                    try:
+                        line += ser.readline()
+                    finally:
+                        ser.timeout = timeout
+        self._bytes_read += len(line)
+        self.lap("read")
+        return line
+
+
+class Stats:
+    def __init__(self, enabled: bool = False):
+        """
+        Per-command statistics of the serial transport.
+
+        Commands are grouped by port, command mnemonic (e.g. "MON:VMON" for CAEN, ":MEAS:VOLT?" for iseg) and board.
+        For each group the number of commands, errors and bytes transferred are counted, and the time spent waiting
+        for the port lock, writing, waiting for the first byte of the response (ttfb), reading the rest of the
+        response and parsing it are recorded in histograms.
+
+        While disabled (the default, unless the `HVPS_STATS` environment variable is set to 1) nothing is
+        measured and the serial I/O is not modified.
+
+        Args:
+            enabled (bool, optional): Start enabled. Defaults to False.
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._commands: Dict[Tuple[str | None, str, int | None], _CommandStats] = {}
+        self._since = time.time()
+
+    def enable(self) -> None:
+        """Start recording statistics."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop recording statistics (the recorded ones are kept)."""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Remove all recorded statistics."""
+        with self._lock:
+            self._commands = {}
+            self._since = time.time()
+
+    def timer(
+        self,
+        ser,
+        command: bytes,
+        board: int | None,
+        mnemonic: Callable[[bytes], str],
+    ):
+        """
+        Get the timer of a command. Used by the transport functions as a context manager around the command.
+
+        Args:
+            ser (serial.Serial): The serial port.
+            command (bytes): The command written.
+            board (int | None): The board number addressed by the command.
+            mnemonic (Callable[[bytes], str]): Extracts the mnemonic from the command (only called if enabled).
+
+        Returns:
+            The timer, with `lap(phase)`, `write(ser, data)` and `readline(ser)` methods.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _CommandTimer(
+            self, (getattr(ser, "port", None), mnemonic(command), board)
+        )
+
+    def burst(
+        self,
+        ser,
+        commands: List[Tuple[bytes, int | None]],
+        total: float,
+        mnemonic: Callable[[bytes], str],
+    ) -> None:
+        """
+        Record the answered commands of a pipelined burst. They share the round trip, so each one is counted with an
+        equal share of the time of the burst (without phases).
+
+        Args:
+            ser (serial.Serial): The serial port.
+            commands (List[Tuple[bytes, int | None]]): Each command answered and the board it addresses.
+            total (float): The time of the burst, in seconds.
+            mnemonic (Callable[[bytes], str]): Extracts the mnemonic from a command.
+        """
+        if not self.enabled or not commands:
+            return
+        port = getattr(ser, "port", None)
+        share = total / len(commands)
+        for command, board in commands:
+            self._record(
+                (port, mnemonic(command), board), {}, share, len(command), 0, False
+            )
+
+    def _record(
+        self,
+        key: Tuple[str | None, str, int | None],
+        phases: Dict[str, float],
+        total: float,
+        bytes_written: int,
+        bytes_read: int,
+        error: bool,
+    ) -> None:
+        with self._lock:
+            command = self._commands.get(key)
+            if command is None:
+                command = self._commands[key] = _CommandStats()
+            command.count += 1
+            if error:
+                command.errors += 1
+            command.bytes_written += bytes_written
+            command.bytes_read += bytes_read
+            for phase, value in phases.items():
+                command.phases[phase].add(value)
+            command.total.add(total)
+
+    def snapshot(self) -> Dict:
+        """
+        Get a copy of the recorded statistics.
+
+        Returns:
+            Dict: With keys "enabled", "since" (time of the last reset, seconds since the epoch), "elapsed"
+            (seconds since the last reset) and "commands": a list with one entry per port, mnemonic and board, with
+            keys "port", "mnemonic", "board", "count", "errors", "bytes_written", "bytes_read", "total"
+            (histogram of the total time) and "phases" (histogram of each phase). Histograms are dictionaries
+            with keys "count", "sum", "min", "max", "p50", "p90", "p99" (in seconds) and "buckets"
+            (cumulative count per upper bound).
+        """
+        with self._lock:
+            commands = [
+                {
+                    "port": port,
+                    "mnemonic": mnemonic,
+                    "board": board,
+                    "count": command.count,
+                    "errors": command.errors,
+                    "bytes_written": command.bytes_written,
+                    "bytes_read": command.bytes_read,
+                    "total": command.total.snapshot(),
+                    "phases": {
+                        phase: histogram.snapshot()
+                        for phase, histogram in command.phases.items()
+                    },
+                }
+                for (port, mnemonic, board), command in self._commands.items()
+            ]
+            since = self._since
+        return {
+            "enabled": self.enabled,
+            "since": since,
+            "elapsed": time.time() - since,
+            "commands": commands,
+        }
+
+
+_stats = Stats(enabled=os.environ.get("HVPS_STATS", "0") == "1")
+
+
+def stats() -> Stats:
+    """
+    Get the statistics of the serial transport, shared by all devices.
+
+    Example:
+        hvps.stats().enable()
+        ...
+        for command in hvps.stats().snapshot()["commands"]:
+            print(command["mnemonic"], command["count"], command["total"]["p99"])
+
+    Returns:
+        Stats: The statistics.
+    """
+    return _stats
@@ -0,0 +1,505 @@
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+# layout of a segment file (little endian):
+#   header (64 bytes): magic b"HVPSLOG1", record size (uint32), padding (4 bytes), count (uint64, records written),
+#     oldest and newest times (float64), lag (float64, how much older a record is than the newest record before it:
+#     0 if the records are in time order, otherwise several pollers published concurrently), padding
+#   then fixed-size records of 32 bytes: time (float64, seconds since the epoch), vmon (float64, V), imon (float64, A),
+#     status (uint32, status register), crate (uint16, index in crates.json), board (uint8), channel (uint8)
+# each segment "<n>.hvlog" has a sparse time index "<n>.hvidx": (newest time up to the record (float64), record number
+# (uint64)) of every `index_interval`-th record
+MAGIC = b"HVPSLOG1"
+_HEADER = struct.Struct("<8sI4xQddd16x")
+_RECORD = struct.Struct("<dddIHBB")
+_INDEX = struct.Struct("<dQ")
+_COUNT_OFFSET = 16
+_SPAN = struct.Struct("<Qddd")
+_TIME = struct.Struct("<d")
+
+# numpy dtype of a record (see `LogReader.read`)
+DTYPE = {
+    "names": ["time", "vmon", "imon", "status", "crate", "board", "channel"],
+    "formats": ["<f8", "<f8", "<f8", "<u4", "<u2", "u1", "u1"],
+    "offsets": [0, 8, 16, 24, 28, 30, 31],
+    "itemsize": _RECORD.size,
+}
+
+_CRATES = "crates.json"
+
+_logger = logging.getLogger(__name__)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "Reading the log as arrays requires numpy (pip install hvps[numpy])"
+        )
+    return numpy
+
+
+def _segment_numbers(path: str) -> List[int]:
+    return sorted(
+        int(name[: -len(".hvlog")])
+        for name in os.listdir(path)
+        if name.endswith(".hvlog") and name[: -len(".hvlog")].isdigit()
+    )
+
+
+def _segment_path(path: str, number: int, extension: str) -> str:
+    return os.path.join(path, f"{number:06d}.{extension}")
+
+
+class LogWriter:
+    def __init__(
+        self,
+        path: str,
+        segment_records: int = 1 << 20,
+        index_interval: int = 1024,
+    ):
+        """
+        Append the samples of the pollers to memory-mapped binary segment files in the directory `path` (add
+        `publish` as a sink of the pollers). Read them with `LogReader`.
+
+        Each segment is allocated at once for `segment_records` records of 32 bytes (32 MiB by default) and mapped
+        in memory: appending a sample is a copy into the mapping, without system call. Everything else runs in a
+        background thread, so the poller is never blocked by the disk: the next segment is allocated while the
+        current one is written, full segments are flushed and closed, and the time index and the names of the
+        crates are written there. The layout of the files is documented at the top of this module. A new segment
+        is started when one is full, and when the writer is opened on an existing log; closed segments are
+        truncated to their records (or left at full size if a reader still maps them where this is not allowed,
+        e.g. on Windows: readers only use the records counted in the header).
+
+        Args:
+            path (str): The directory of the log, created if needed.
+            segment_records (int, optional): The number of records of a segment. Defaults to 1048576.
+            index_interval (int, optional): The number of records between entries of the time index.
+                Defaults to 1024.
+        """
+        if segment_records < 1 or index_interval < 1:
+            raise ValueError(
+                f"Invalid segment size {segment_records} or index interval {index_interval}, must be positive"
+            )
+        self.path = path
+        self.segment_records = segment_records
+        self.index_interval = index_interval
+        os.makedirs(path, exist_ok=True)
+        self._crates: List[str] = []
+        crates = os.path.join(path, _CRATES)
+        if os.path.exists(crates):
+            with open(crates, encoding="utf-8") as file:
+                self._crates = json.load(file)
+        self._crate_index = {crate: i for i, crate in enumerate(self._crates)}
+        numbers = _segment_numbers(path)
+        # several pollers may publish concurrently
+        self._lock = threading.Lock()
+        self._count = 0
+        # oldest and newest times and lag of the current segment
+        self._oldest = self._newest = self._lag = 0.0
+        # the next segment, allocated by the writer thread
+        self._spare: Tuple[int, mmap.mmap] | None = None
+        self._allocated = threading.Event()
+        # index files of the segments, only used by the writer thread
+        self._indexes: Dict[int, BinaryIO] = {}
+        self._jobs: queue.Queue = queue.Queue()
+        self._allocate(numbers[-1] + 1 if numbers else 0)
+        self._number, self._map = self._activate()
+        self._thread = threading.Thread(
+            target=self._write, name="hvps-log", daemon=True
+        )
+        self._thread.start()
+
+    def _allocate(self, number: int) -> None:
+        try:
+            size = _HEADER.size + self.segment_records * _RECORD.size
+            # the header stays zero (readers skip the segment) until the segment is used
+            with open(_segment_path(self.path, number, "hvlog"), "w+b") as file:
+                file.truncate(size)
+                self._spare = number, mmap.mmap(file.fileno(), size)
+        finally:
+            self._allocated.set()
+
+    def _activate(self) -> Tuple[int, mmap.mmap]:
+        # called by the publisher: start writing the spare segment and allocate the next one
+        self._allocated.wait()
+        spare, self._spare = self._spare, None
+        self._allocated.clear()
+        if spare is None:
+            number = self._number + 1
+            self._jobs.put(functools.partial(self._allocate, number))
+            raise OSError(f"Could not allocate segment {number} of {self.path!r}")
+        number, map = spare
+        _HEADER.pack_into(map, 0, MAGIC, _RECORD.size, 0, 0.0, 0.0, 0.0)
+        self._count = 0
+        self._jobs.put(functools.partial(self._allocate, number + 1))
+        return number, map
+
+    def _truncate(self, number: int, count: int) -> None:
+        # release the space of the records not written
+        try:
+            os.truncate(
+                _segment_path(self.path, number, "hvlog"),
+                _HEADER.size + count * _RECORD.size,
+            )
+        except OSError as error:
+            # a reader maps the segment (Windows): it stays at full size
+            _logger.warning(
+                "Could not truncate segment %d of %r: %s", number, self.path, error
+            )
+
+    def _close_segment(self, number: int, map: mmap.mmap, count: int) -> None:
+        map.flush()
+        map.close()
+        index = self._indexes.pop(number, None)
+        if index is not None:
+            index.close()
+        if count < self.segment_records:
+            self._truncate(number, count)
+
+    def _write_index(self, number: int, time: float, count: int) -> None:
+        index = self._indexes.get(number)
+        if index is None:
+            index = self._indexes[number] = open(
+                _segment_path(self.path, number, "hvidx"), "wb"
+            )
+        index.write(_INDEX.pack(time, count))
+
+    def _write_crates(self, crates: List[str]) -> None:
+        temporary = os.path.join(self.path, f"{_CRATES}.tmp")
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(crates, file)
+        os.replace(temporary, os.path.join(self.path, _CRATES))
+
+    def _flush(self, map: mmap.mmap) -> None:
+        map.flush()
+        for index in self._indexes.values():
+            index.flush()
+
+    def _write(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    break
+                job()
+            except OSError as error:
+                _logger.error("Could not write the log %r: %s", self.path, error)
+            finally:
+                self._jobs.task_done()
+        if self._spare is not None:
+            number, map = self._spare
+            self._spare = None
+            map.close()
+            try:
+                os.remove(_segment_path(self.path, number, "hvlog"))
+            except OSError as error:
+                # readers skip it, its header is zero
+                _logger.warning(
+                    "Could not remove segment %d of %r: %s", number, self.path, error
+                )
+
+    def _crate(self, crate: str) -> int:
+        index = self._crate_index.get(crate)
+        if index is None:
+            index = self._crate_index[crate] = len(self._crates)
+            self._crates.append(crate)
+            self._jobs.put(functools.partial(self._write_crates, list(self._crates)))
+        return index
+
+    def publish(self, samples: List[Dict]) -> None:
+        """
+        Append the samples of a polling pass (sink of the pollers, see `Poller.poll`).
+
+        Args:
+            samples (List[Dict]): The samples.
+        """
+        with self._lock:
+            if self._map is None:
+                raise ValueError(f"The log writer of {self.path!r} is closed")
+            for sample in samples:
+                if self._count == self.segment_records:
+                    number, map, count = self._number, self._map, self._count
+                    # only waits if the segment filled up before the next one was allocated
+                    self._number, self._map = self._activate()
+                    self._jobs.put(
+                        functools.partial(self._close_segment, number, map, count)
+                    )
+                time = sample["time"]
+                if self._count == 0:
+                    self._oldest = self._newest = time
+                    self._lag = 0.0
+                elif time < self._newest:
+                    # the passes of several pollers are interleaved
+                    self._lag = max(self._lag, self._newest - time)
+                    self._oldest = min(self._oldest, time)
+                else:
+                    self._newest = time
+                if self._count % self.index_interval == 0:
+                    self._jobs.put(
+                        functools.partial(
+                            self._write_index, self._number, self._newest, self._count
+                        )
+                    )
+                _RECORD.pack_into(
+                    self._map,
+                    _HEADER.size + self._count * _RECORD.size,
+                    time,
+                    sample["vmon"],
+                    sample["imon"],
+                    sample["status"],
+                    self._crate(str(sample["crate"])),
+                    sample["board"],
+                    sample["channel"],
+                )
+                self._count += 1
+                # readers only see complete records
+                _SPAN.pack_into(
+                    self._map,
+                    _COUNT_OFFSET,
+                    self._count,
+                    self._oldest,
+                    self._newest,
+                    self._lag,
+                )
+
+    def flush(self) -> None:
+        """Write the mapped pages, the index and the names of the crates to the disk (waits for the writer thread)."""
+        with self._lock:
+            if self._map is not None:
+                self._jobs.put(functools.partial(self._flush, self._map))
+        self._jobs.join()
+
+    def close(self) -> None:
+        """Close the current segment and stop the writer thread, once everything is written."""
+        with self._lock:
+            if self._map is None:
+                return
+            self._jobs.put(
+                functools.partial(
+                    self._close_segment, self._number, self._map, self._count
+                )
+            )
+            self._map = None
+            self._jobs.put(None)
+        self._thread.join()
+
+    def __enter__(self) -> LogWriter:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _Segment:
+    def __init__(self, path: str, number: int):
+        with open(_segment_path(path, number, "hvlog"), "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, *_ = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or record_size != _RECORD.size:
+            self.map.close()
+            raise ValueError(f"Segment {number} of {path!r} is not a log segment")
+        self.index = array("d")
+        self.positions = array("Q")
+        index_path = _segment_path(path, number, "hvidx")
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as file:
+                data = file.read()
+            for time, position in _INDEX.iter_unpack(
+                data[: len(data) // _INDEX.size * _INDEX.size]
+            ):
+                self.index.append(time)
+                self.positions.append(position)
+
+    def header(self) -> Tuple[int, float, float, float]:
+        # count, oldest and newest time and lag, read again for the segments being written
+        return _SPAN.unpack_from(self.map, _COUNT_OFFSET)
+
+    def _time(self, i: int) -> float:
+        return _TIME.unpack_from(self.map, _HEADER.size + i * _RECORD.size)[0]
+
+    def _bisect(self, time: float, count: int) -> int:
+        # number of records older than `time`, narrowed with the sparse index
+        entry = bisect_left(self.index, time)
+        low = self.positions[entry - 1] if entry > 0 else 0
+        high = self.positions[entry] if entry < len(self.positions) else count
+        low, high = min(low, count), min(high, count)
+        while low < high:
+            middle = (low + high) // 2
+            if self._time(middle) < time:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _bound(self, time: float, count: int) -> int:
+        # records out of order: the index (newest time up to each entry) only bounds the position of `time`
+        entry = bisect_left(self.index, time)
+        return min(
+            self.positions[entry] if entry < len(self.positions) else count, count
+        )
+
+    def range(self, start: float | None, end: float | None) -> Tuple[int, int, bool]:
+        """The records `begin:stop` that may be in the range, and whether they all are."""
+        count, oldest, newest, lag = self.header()
+        if (
+            count == 0
+            or (start is not None and newest < start)
+            or (end is not None and oldest >= end)
+        ):
+            return 0, 0, True
+        if lag == 0:
+            begin = 0 if start is None else self._bisect(start, count)
+            stop = count if end is None else self._bisect(end, count)
+            return begin, max(begin, stop), True
+        # a record is at most `lag` older than the newest record before it: the records from the first index entry
+        # newer than `end + lag` are too new, those up to the last entry older than `start` are too old
+        begin = 0
+        if start is not None:
+            entry = bisect_left(self.index, start)
+            begin = min(self.positions[entry - 1], count) if entry > 0 else 0
+        stop = count if end is None else self._bound(end + lag, count)
+        return begin, max(begin, stop), False
+
+    def close(self) -> None:
+        self.map.close()
+
+
+class LogReader:
+    def __init__(self, path: str):
+        """
+        Read a log written by `LogWriter` (possibly while it is written, by another process).
+
+        Time ranges are found with the sparse index of each segment and a binary search in the mapped records, so
+        reading a range costs the same whatever the size of the log. In the segments where several pollers
+        published concurrently (records not in time order), the index only bounds the range and the records within
+        the bounds are filtered by time.
+
+        Args:
+            path (str): The directory of the log.
+        """
+        self.path = path
+        self._segments: Dict[int, _Segment] = {}
+
+    @property
+    def crates(self) -> List[str]:
+        """The names of the crates, by index (the "crate" field of the records)."""
+        crates = os.path.join(self.path, _CRATES)
+        if not os.path.exists(crates):
+            return []
+        with open(crates, encoding="utf-8") as file:
+            return json.load(file)
+
+    def _ranges(
+        self, start: float | None, end: float | None
+    ) -> Iterator[Tuple[_Segment, int, int, bool]]:
+        for number in _segment_numbers(self.path):
+            segment = self._segments.get(number)
+            if segment is None:
+                try:
+                    with open(_segment_path(self.path, number, "hvlog"), "rb") as file:
+                        magic = file.read(len(MAGIC))
+                except FileNotFoundError:
+                    # an unused segment removed by the writer
+                    continue
+                if magic.strip(b"\0") == b"":
+                    # allocated by the writer, not used yet
+                    continue
+                segment = self._segments[number] = _Segment(self.path, number)
+            begin, stop, exact = segment.range(start, end)
+            if begin < stop:
+                yield segment, begin, stop, exact
+
+    def records(
+        self, start: float | None = None, end: float | None = None
+    ) -> Iterator[Dict]:
+        """
+        The records with `start <= time < end`, in the order they were written (oldest first, unless several
+        pollers published concurrently), without numpy.
+
+        Args:
+            start (float | None, optional): The first time, in seconds since the epoch. Defaults to None (oldest).
+            end (float | None, optional): The end time (excluded). Defaults to None (newest included).
+
+        Returns:
+            Iterator[Dict]: With keys "time", "crate" (name), "board", "channel", "vmon", "imon" and "status".
+        """
+        crates = self.crates
+        for segment, begin, stop, exact in self._ranges(start, end):
+            data = segment.map[
+                _HEADER.size + begin * _RECORD.size : _HEADER.size + stop * _RECORD.size
+            ]
+            for time, vmon, imon, status, crate, board, channel in _RECORD.iter_unpack(
+                data
+            ):
+                if not exact and (
+                    (start is not None and time < start)
+                    or (end is not None and time >= end)
+                ):
+                    continue
+                yield {
+                    "time": time,
+                    "crate": crates[crate] if crate < len(crates) else str(crate),
+                    "board": board,
+                    "channel": channel,
+                    "vmon": vmon,
+                    "imon": imon,
+                    "status": status,
+                }
+
+    def read(self, start: float | None = None, end: float | None = None):
+        """
+        The records with `start <= time < end` as a numpy structured array (`DTYPE`, the crates are indices in
+        `crates`). Only the records of the range are copied from the mapped segments.
+
+        Args:
+            start (float | None, optional): The first time. Defaults to None (oldest).
+            end (float | None, optional): The end time (excluded). Defaults to None (newest included).
+
+        Returns:
+            numpy.ndarray: The records, in the order they were written.
+        """
+        numpy = _numpy()
+        dtype = numpy.dtype(DTYPE)
+        parts = []
+        for segment, begin, stop, exact in self._ranges(start, end):
+            part = numpy.frombuffer(
+                segment.map,
+                dtype=dtype,
+                count=stop - begin,
+                offset=_HEADER.size + begin * _RECORD.size,
+            )
+            if not exact:
+                selected = numpy.ones(len(part), dtype=bool)
+                if start is not None:
+                    selected &= part["time"] >= start
+                if end is not None:
+                    selected &= part["time"] < end
+                part = part[selected]
+            parts.append(part)
+        if not parts:
+            return numpy.empty(0, dtype=dtype)
+        return numpy.concatenate(parts)
+
+    def close(self) -> None:
+        for segment in self._segments.values():
+            segment.close()
+        self._segments = {}
+
+    def __enter__(self) -> LogReader:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
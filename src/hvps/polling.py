@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from .devices.hvps import Hvps
+from .scheduling import priority
+
+# names of the bits of the iseg channel status register, from bit 0 (see the EDCP manual, "Channel Status")
+_ISEG_CHANNEL_STATUS_BITS = [
+    "IS_POSITIVE",
+    "IS_ARC",
+    "IS_INPUT_ERROR",
+    "IS_ON",
+    "IS_RAMPING",
+    "IS_EMERGENCY_OFF",
+    "IS_CONSTANT_CURRENT",
+    "IS_CONSTANT_VOLTAGE",
+    "IS_LOW_CURRENT_RANGE",
+    "IS_CURRENT_BOUNDS",
+    "IS_VOLTAGE_BOUNDS",
+    "IS_EXTERNAL_INHIBIT",
+    "IS_CURRENT_TRIP",
+    "IS_CURRENT_LIMIT",
+    "IS_VOLTAGE_LIMIT",
+]
+
+
+# the channel properties read by each pass
+_CAEN_PARAMETERS = ["vmon", "imon", "vset", "stat"]
+
+
+def _caen_values(values: Dict) -> Dict:
+    bits = values["stat"]
+    return {
+        "vmon": values["vmon"],
+        # CAEN currents are in uA
+        "imon": values["imon"] * 1e-6,
+        "vset": values["vset"],
+        "status": sum(1 << i for i, value in enumerate(bits.values()) if value),
+        "status_bits": bits,
+    }
+
+
+def _read_caen_channel(channel) -> Dict:
+    return _caen_values(
+        {parameter: getattr(channel, parameter) for parameter in _CAEN_PARAMETERS}
+    )
+
+
+def _read_iseg_channel(channel) -> Dict:
+    status = channel.channel_status
+    return {
+        "vmon": channel.measured_voltage,
+        "imon": channel.measured_current,
+        "vset": channel.voltage_set,
+        "status": status,
+        "status_bits": {
+            name: bool(status >> i & 1)
+            for i, name in enumerate(_ISEG_CHANNEL_STATUS_BITS)
+        },
+    }
+
+
+_CHANNEL_READERS: Dict[str, Callable[..., Dict]] = {
+    "caen": _read_caen_channel,
+    "iseg": _read_iseg_channel,
+}
+
+
+# the links with a round trip long enough for pipelining (pyserial URLs)
+_PIPELINED_URLS = ("socket://", "rfc2217://")
+
+
+class Poller:
+    def __init__(
+        self,
+        device: Hvps,
+        interval: float = 1.0,
+        boards: List[int] | None = None,
+        name: str | None = None,
+        pipeline: bool | None = None,
+    ):
+        """
+        Periodically read the monitored values of all the channels of a device in a background thread.
+
+        Each pass reads the measured voltage and current, the voltage set point and the status register of every
+        channel, and replaces the snapshot with the new values. The commands of the background passes have the
+        "background" priority (see `hvps.scheduling`). Readers of the snapshot (e.g. `hvps.exporter`) never
+        access the serial port, so they do not add traffic to the bus. Sinks are called with the samples of each pass.
+
+        Args:
+            device (Hvps): The device (`Caen` or `Iseg`), it is connected when the poller starts if needed.
+            interval (float, optional): The time between the start of two passes, in seconds. Defaults to 1.0.
+            boards (List[int] | None, optional): The boards to read (CAEN only). If None, the boards connected are
+                found with `Caen.scan_boards` on the first pass (on each pass until a board answers). Defaults to
+                None.
+            name (str | None, optional): The name of the crate, used as label of the samples. Defaults to the port.
+            pipeline (bool | None, optional): Read all the channels of a CAEN board with a single pipelined burst
+                (see `Caen.read_channels`), one round trip per board instead of one per value. The responses of a
+                burst are only matched to their commands by order, so it is meant for links with a high latency.
+                Defaults to None: only for network links (`socket://` and `rfc2217://` URLs).
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval must be positive, got {interval}")
+        if device._brand not in _CHANNEL_READERS:
+            raise ValueError(f"Brand {device._brand!r} not supported")
+        self.device = device
+        self.interval = interval
+        self.boards = boards
+        if pipeline is None:
+            pipeline = (device.url or "").startswith(_PIPELINED_URLS)
+        self.pipeline = pipeline
+        self.name = name if name is not None else device.port
+        self.logger = logging.getLogger(__name__)
+
+        self._read_channel = _CHANNEL_READERS[device._brand]
+        self._sinks: List[Callable[[List[Dict]], None]] = []
+        self._samples: List[Dict] = []
+        self._status: Dict = {
+            "up": False,
+            "passes": 0,
+            "errors": 0,
+            "last_pass": None,
+            "last_success": None,
+            "duration": None,
+        }
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_sink(self, sink: Callable[[List[Dict]], None]) -> None:
+        """
+        Call `sink` with the list of samples after each successful pass (from the polling thread).
+
+        Args:
+            sink (Callable[[List[Dict]], None]): The function to call. Exceptions raised by it are logged and ignored.
+        """
+        self._sinks.append(sink)
+
+    def _modules(self) -> List:
+        if self.device._brand == "iseg":
+            return [self.device.module(0)]
+        if self.boards is None:
+            boards = sorted(self.device.scan_boards().keys())
+            if not boards:
+                # still booting or not answering: the pass fails and the boards are scanned again on the next one
+                raise ValueError(f"No board of {self.name} answered the scan")
+            self.boards = boards
+        return [self.device.module(board) for board in self.boards]
+
+    def _read_module(self, module) -> List[Tuple]:
+        channels = module.channels
+        if self.pipeline and self.device._brand == "caen":
+            values = self.device.read_channels(
+                module.module,
+                _CAEN_PARAMETERS,
+                [channel.channel for channel in channels],
+            )
+            return list(zip(channels, map(_caen_values, values)))
+        return [(channel, self._read_channel(channel)) for channel in channels]
+
+    def poll(self) -> List[Dict]:
+        """
+        Read all the channels once and update the snapshot.
+
+        Returns:
+            List[Dict]: One sample per channel, with keys "crate", "brand", "board", "channel", "time" (seconds since
+            the epoch), "vmon" (V), "imon" (A), "vset" (V), "status" (status register) and "status_bits" (the value of
+            each named bit of the status register).
+        """
+        if not self.device.connected:
+            self.device.connect()
+        samples = []
+        for module in self._modules():
+            for channel, values in self._read_module(module):
+                sample = {
+                    "crate": self.name,
+                    "brand": self.device._brand,
+                    "board": module.module,
+                    "channel": channel.channel,
+                    "time": time.time(),
+                }
+                sample.update(values)
+                samples.append(sample)
+        # replaced, never modified: readers can keep using the previous list
+        self._samples = samples
+        return samples
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            start = time.time()
+            try:
+                # commands of the application (setters, reads, emergency) go first
+                with priority("background"):
+                    samples = self.poll()
+            except Exception as e:
+                self.logger.warning("Polling %s failed: %r", self.name, e)
+                self._status = {
+                    **self._status,
+                    "up": False,
+                    "passes": self._status["passes"] + 1,
+                    "errors": self._status["errors"] + 1,
+                    "last_pass": start,
+                    "duration": time.time() - start,
+                }
+            else:
+                self._status = {
+                    **self._status,
+                    "up": True,
+                    "passes": self._status["passes"] + 1,
+                    "last_pass": start,
+                    "last_success": start,
+                    "duration": time.time() - start,
+                }
+                for sink in self._sinks:
+                    try:
+                        sink(samples)
+                    except Exception as e:
+                        self.logger.warning("Sink %r failed: %r", sink, e)
+            self._stop.wait(max(0.0, self.interval - (time.time() - start)))
+
+    def start(self) -> None:
+        """Start polling in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"hvps-poller-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling and wait for the current pass to finish."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> Poller:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        """True while the background thread is running."""
+        return self._thread is not None
+
+    def snapshot(self) -> List[Dict]:
+        """
+        The samples of the last successful pass (see `poll`). It does not access the serial port.
+
+        Returns:
+            List[Dict]: The samples, empty before the first successful pass.
+        """
+        return self._samples
+
+    def status(self) -> Dict:
+        """
+        The state of the poller.
+
+        Returns:
+            Dict: With keys "up" (the last pass succeeded), "passes", "errors" (number of failed passes),
+            "last_pass" and "last_success" (start time of the passes, seconds since the epoch, None if none)
+            and "duration" (of the last pass, seconds).
+        """
+        return self._status
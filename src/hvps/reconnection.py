@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, TypeVar
+
+import serial
+
+T = TypeVar("T")
+
+
+class Reconnector:
+    def __init__(
+        self,
+        reopen: Callable[[], None],
+        close: Callable[[], None],
+        identify: Callable[[], object],
+        logger: logging.Logger | logging.LoggerAdapter | None = None,
+        retries: int = 5,
+        backoff: float = 0.1,
+        max_backoff: float = 5.0,
+    ):
+        """
+        Reopens the serial port of a device when a command fails with a `serial.SerialException` (e.g. a USB-serial
+        adapter that drops out for a moment). Disabled by default.
+
+        The port is closed and reopened with exponential backoff (`backoff`, doubled after each failed attempt up to
+        `max_backoff`), at most `retries` times. Once open, the device is identified again (serial numbers) and the
+        port is closed if it is not the device identified when the reconnection was enabled.
+
+        Reads are idempotent and are sent again after a reconnection, so their callers do not see the glitch.
+        Set commands are never sent again (the device may have applied them before the link dropped): the error is
+        raised once the port is back, and the caller decides.
+
+        Args:
+            reopen (Callable[[], None]): Closes and opens the port.
+            close (Callable[[], None]): Closes the port.
+            identify (Callable[[], object]): Reads the identity of the device (compared with ==).
+            logger (logging.Logger | logging.LoggerAdapter | None, optional): The logger. Defaults to the logger of
+                this module.
+            retries (int, optional): The maximum number of attempts to reopen the port. Defaults to 5.
+            backoff (float, optional): The delay before the first attempt, in seconds. Defaults to 0.1.
+            max_backoff (float, optional): The maximum delay between attempts, in seconds. Defaults to 5.0.
+        """
+        if retries < 1:
+            raise ValueError(f"retries must be at least 1, got {retries}")
+        if backoff < 0 or max_backoff < backoff:
+            raise ValueError(
+                f"Invalid backoff {backoff} s (maximum {max_backoff} s), must be 0 <= backoff <= max_backoff"
+            )
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._reopen = reopen
+        self._close = close
+        self._identify = identify
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+        self._enabled = False
+        self._identity: object = None
+        self._lock = threading.Lock()
+        # incremented after each reconnection, so concurrent failures reconnect only once
+        self._generation = 0
+        self._local = threading.local()
+        self.failures = 0
+        self.attempts = 0
+        self.reconnects = 0
+        self.replayed = 0
+        self.not_replayed = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the port is reopened after a failure."""
+        return self._enabled
+
+    def enable(self, identify: bool = True) -> None:
+        """
+        Reopen the port after failures from now on.
+
+        Args:
+            identify (bool, optional): Read the identity of the device now (the port must be open), to check it after
+                each reconnection (for CAEN devices, the serial numbers of the boards whose module objects exist).
+                Defaults to True.
+        """
+        self._identity = self._identify() if identify else None
+        self._enabled = True
+
+    def disable(self) -> None:
+        """Let the failures propagate (the default)."""
+        self._enabled = False
+
+    def run(self, function: Callable[[], T], replay: bool) -> T:
+        """
+        Call `function` (a command), reopening the port if it fails with a `serial.SerialException`.
+
+        Args:
+            function (Callable[[], T]): Sends the command and reads the response.
+            replay (bool): Whether the command can be sent again after a reconnection (reads).
+
+        Returns:
+            T: The result of `function`.
+
+        Raises:
+            serial.SerialException: If the command failed and it cannot be sent again, or the port could not be
+                reopened.
+            ValueError: If another device answers on the port after the reconnection.
+        """
+        if not self._enabled or getattr(self._local, "reconnecting", False):
+            return function()
+        for _ in range(self.retries):
+            generation = self._generation
+            try:
+                return function()
+            except serial.SerialException as e:
+                with self._lock:
+                    self.failures += 1
+                    if generation == self._generation:
+                        self._logger.warning("Serial link failed: %r, reconnecting", e)
+                        self._reconnect(e)
+                    if not replay:
+                        self.not_replayed += 1
+                        raise
+                    self.replayed += 1
+                self._logger.info("Sending the command again after reconnection")
+        # the link keeps failing right after each reconnection
+        return function()
+
+    def _reconnect(self, error: Exception) -> None:
+        # called with the lock held
+        self._local.reconnecting = True
+        try:
+            delay = self.backoff
+            for attempt in range(1, self.retries + 1):
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+                self.attempts += 1
+                try:
+                    self._reopen()
+                    identity = self._identify() if self._identity is not None else None
+                except (serial.SerialException, ValueError) as e:
+                    # the port is not back yet, or the first response after reopening is garbled
+                    self._logger.info("Reconnection attempt %d failed: %r", attempt, e)
+                    error = e
+                    continue
+                if identity != self._identity:
+                    self._close()
+                    raise ValueError(
+                        f"Another device answers after reconnection: {identity!r}, expected {self._identity!r}"
+                    )
+                self._generation += 1
+                self.reconnects += 1
+                self._logger.warning("Reconnected after %d attempts", attempt)
+                return
+        finally:
+            self._local.reconnecting = False
+        raise serial.SerialException(
+            f"Could not reconnect after {self.retries} attempts"
+        ) from error
+
+    def snapshot(self) -> Dict:
+        """
+        The counters of the reconnector.
+
+        Returns:
+            Dict: With keys "enabled", "failures" (commands failed with a serial error), "attempts" (to reopen the
+            port), "reconnects" (successful), "replayed" (reads sent again) and "not_replayed" (set commands failed).
+        """
+        # without the lock, which is held during a reconnection
+        return {
+            "enabled": self._enabled,
+            "failures": self.failures,
+            "attempts": self.attempts,
+            "reconnects": self.reconnects,
+            "replayed": self.replayed,
+            "not_replayed": self.not_replayed,
+        }
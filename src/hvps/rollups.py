@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Sequence, Tuple
+
+# the durations of the buckets, in seconds: 1 s, 1 min and 1 h
+RESOLUTIONS = [1.0, 60.0, 3600.0]
+
+# how long the buckets of each resolution are kept by default, in seconds: 1 hour of seconds, 1 week of minutes and
+# 1 year of hours. Other resolutions keep `MAX_BUCKETS` buckets.
+RETENTION = {1.0: 3600.0, 60.0: 7 * 86400.0, 3600.0: 365 * 86400.0}
+MAX_BUCKETS = 10000
+
+
+class _Level:
+    # the buckets of one resolution: the completed ones in arrays, the current one in attributes
+    __slots__ = (
+        "resolution",
+        "max_buckets",
+        "starts",
+        "mins",
+        "maxs",
+        "sums",
+        "counts",
+        "index",
+        "min",
+        "max",
+        "sum",
+        "count",
+        "trimmed",
+    )
+
+    def __init__(self, resolution: float, retention: float | None):
+        self.resolution = resolution
+        self.max_buckets = max(math.ceil(retention / resolution), 1)
+        self.starts = array("d")
+        self.mins = array("d")
+        self.maxs = array("d")
+        self.sums = array("d")
+        self.counts = array("L")
+        self.index: int | None = None
+        self.count = 0
+        # whether old buckets were removed (retention)
+        self.trimmed = False
+
+    def add(self, time: float, value: float) -> None:
+        index = math.floor(time / self.resolution)
+        if self.count > 0 and index > self.index:
+            self._close()
+        if self.count == 0:
+            self.index = index
+            self.min = self.max = self.sum = value
+            self.count = 1
+            return
+        # late samples (clock going back) are added to the current bucket
+        if value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+        self.sum += value
+        self.count += 1
+
+    def _close(self) -> None:
+        self.starts.append(self.index * self.resolution)
+        self.mins.append(self.min)
+        self.maxs.append(self.max)
+        self.sums.append(self.sum)
+        self.counts.append(self.count)
+        self.count = 0
+        if len(self.starts) >= 2 * self.max_buckets:
+            # amortized O(1): the oldest half is removed at once
+            excess = len(self.starts) - self.max_buckets
+            self.trimmed = True
+            for buffer in (self.starts, self.mins, self.maxs, self.sums, self.counts):
+                del buffer[:excess]
+
+    def covers(self, start: float) -> bool:
+        # whether the buckets from `start` are still kept
+        first = self.first()
+        return not self.trimmed or (first is not None and first <= start)
+
+    def first(self) -> float | None:
+        # the start of the oldest bucket
+        if self.starts:
+            return self.starts[0]
+        return None if self.count == 0 else self.index * self.resolution
+
+    def last(self) -> float | None:
+        # the end of the newest bucket
+        if self.count > 0:
+            return (self.index + 1) * self.resolution
+        return self.starts[-1] + self.resolution if self.starts else None
+
+    def buckets(self, start: float | None, end: float | None) -> Dict[str, List]:
+        # the buckets [s, s + resolution) overlapping [start, end)
+        first = (
+            0 if start is None else bisect_right(self.starts, start - self.resolution)
+        )
+        last = len(self.starts) if end is None else bisect_left(self.starts, end)
+        last = max(first, last)
+        counts = self.counts[first:last].tolist()
+        sums = self.sums[first:last].tolist()
+        result = {
+            "time": self.starts[first:last].tolist(),
+            "min": self.mins[first:last].tolist(),
+            "max": self.maxs[first:last].tolist(),
+            "mean": [total / count for total, count in zip(sums, counts)],
+            "count": counts,
+        }
+        if self.count > 0:
+            current = self.index * self.resolution
+            if (start is None or current + self.resolution > start) and (
+                end is None or current < end
+            ):
+                result["time"].append(current)
+                result["min"].append(self.min)
+                result["max"].append(self.max)
+                result["mean"].append(self.sum / self.count)
+                result["count"].append(self.count)
+        return result
+
+
+class Rollup:
+    def __init__(
+        self,
+        resolutions: Sequence[float] = RESOLUTIONS,
+        retention: Dict[float, float] | None = None,
+    ):
+        """
+        The minimum, maximum and mean of a series of values over buckets of several durations (`RESOLUTIONS`),
+        updated incrementally: each value costs O(1) per resolution, whatever the length of the series.
+
+        The memory used is proportional to the time span covered (one bucket per second, minute and hour), not to
+        the number of values, and bounded: each resolution keeps its buckets for a limited time (`RETENTION`), so a
+        long-running service does not grow. Set how long to keep them with `retention`.
+
+        Args:
+            resolutions (Sequence[float], optional): The durations of the buckets, in seconds. Defaults to
+                `RESOLUTIONS`.
+            retention (Dict[float, float] | None, optional): For some resolutions, how long to keep their buckets, in
+                seconds (e.g. {1.0: 86400.0} to keep the 1 s buckets for one day). The others are kept as in
+                `RETENTION`, or `MAX_BUCKETS` buckets. Defaults to None.
+        """
+        if not resolutions or any(resolution <= 0 for resolution in resolutions):
+            raise ValueError(f"Invalid resolutions {resolutions}, must be positive")
+        retention = retention or {}
+        if any(seconds is None or seconds <= 0 for seconds in retention.values()):
+            raise ValueError(f"Invalid retention {retention}, must be positive")
+        self._levels = [
+            _Level(
+                resolution,
+                retention.get(
+                    resolution, RETENTION.get(resolution, MAX_BUCKETS * resolution)
+                ),
+            )
+            for resolution in sorted(resolutions)
+        ]
+
+    @property
+    def resolutions(self) -> List[float]:
+        """The durations of the buckets, in seconds, finest first."""
+        return [level.resolution for level in self._levels]
+
+    def append(self, time: float, value: float) -> None:
+        """
+        Add a value.
+
+        Args:
+            time (float): The time of the value, in seconds (e.g. since the epoch). Values must be added in order of
+                time, late values are counted in the current buckets.
+            value (float): The value.
+        """
+        for level in self._levels:
+            level.add(time, value)
+
+    def query(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        max_points: int = 1000,
+        resolution: float | None = None,
+    ) -> Dict[str, List]:
+        """
+        The buckets overlapping `start <= time < end`, at the finest resolution that gives at most `max_points`
+        buckets for the span and still keeps the buckets from `start` (see `retention`), the coarsest one if none
+        does, so that plotting any span reads a bounded number of buckets.
+
+        Args:
+            start (float | None, optional): The start of the span. Defaults to None (the first value).
+            end (float | None, optional): The end of the span (excluded). Defaults to None (the last value).
+            max_points (int, optional): The maximum number of buckets wanted. Defaults to 1000.
+            resolution (float | None, optional): Use this resolution instead (one of `resolutions`).
+                Defaults to None.
+
+        Returns:
+            Dict[str, List]: With keys "resolution" (seconds), and "time" (start of each bucket), "min", "max",
+            "mean" and "count" (number of values) with one item per bucket, oldest first.
+        """
+        if resolution is None:
+            level = self._choose(start, end, max_points)
+        else:
+            levels = [level for level in self._levels if level.resolution == resolution]
+            if not levels:
+                raise ValueError(
+                    f"Invalid resolution {resolution}, must be one of {self.resolutions}"
+                )
+            level = levels[0]
+        return {"resolution": level.resolution, **level.buckets(start, end)}
+
+    def _choose(
+        self, start: float | None, end: float | None, max_points: int
+    ) -> _Level:
+        if start is None:
+            # the oldest bucket is in the level kept the longest
+            starts = [level.first() for level in self._levels]
+            start = min((first for first in starts if first is not None), default=None)
+        if end is None:
+            end = self._levels[0].last()
+        span = 0.0 if start is None or end is None else max(end - start, 0.0)
+        for level in self._levels:
+            # finer levels are kept for a shorter time, they may not go back to `start`
+            if span / level.resolution <= max_points and (
+                start is None or level.covers(start)
+            ):
+                return level
+        return self._levels[-1]
+
+
+class Rollups:
+    def __init__(
+        self,
+        fields: Sequence[str] = ("vmon", "imon"),
+        resolutions: Sequence[float] = RESOLUTIONS,
+        retention: Dict[float, float] | None = None,
+    ):
+        """
+        The rollups (see `Rollup`) of some fields of all the channels polled. Add `publish` as a sink of the pollers.
+
+        Example:
+            rollups = Rollups()
+            poller.add_sink(rollups.publish)
+            week = rollups.rollup("crate-1", 0, 3, "imon").query(start=time.time() - 7 * 86400)
+
+        Args:
+            fields (Sequence[str], optional): The fields of the samples (see `Poller.poll`). Defaults to ("vmon",
+                "imon").
+            resolutions (Sequence[float], optional): The durations of the buckets. Defaults to `RESOLUTIONS`.
+            retention (Dict[float, float] | None, optional): How long to keep the buckets of each resolution.
+                Defaults to None (see `Rollup`).
+        """
+        self.fields = list(fields)
+        self.resolutions = list(resolutions)
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._rollups: Dict[Tuple, Rollup] = {}
+
+    def publish(self, samples: List[Dict]) -> None:
+        """
+        Add the samples of a polling pass (sink of the pollers, see `Poller.poll`).
+
+        Args:
+            samples (List[Dict]): The samples.
+        """
+        with self._lock:
+            for sample in samples:
+                for field in self.fields:
+                    key = (sample["crate"], sample["board"], sample["channel"], field)
+                    rollup = self._rollups.get(key)
+                    if rollup is None:
+                        rollup = self._rollups[key] = Rollup(
+                            self.resolutions, self.retention
+                        )
+                    rollup.append(sample["time"], sample[field])
+
+    def rollup(self, crate: str, board: int, channel: int, field: str) -> Rollup:
+        """
+        The rollup of a field of a channel.
+
+        Raises:
+            ValueError: If the channel has not been polled or the field is not rolled up.
+        """
+        rollup = self._rollups.get((crate, board, channel, field))
+        if rollup is None:
+            raise ValueError(
+                f"No rollup of {field!r} for channel {channel} of board {board} of {crate!r}"
+            )
+        return rollup
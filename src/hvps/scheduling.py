@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterator, List
+
+from .instrumentation import Histogram
+
+# priority classes of the commands, most urgent first
+PRIORITIES = ["emergency", "set", "interactive", "background"]
+
+_EMERGENCY = 0
+
+_INDEX = {name: index for index, name in enumerate(PRIORITIES)}
+
+_priority: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "hvps_priority", default=None
+)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a command cannot be queued because the queue of the port is full."""
+
+
+def _check_priority(name: str) -> int:
+    index = _INDEX.get(name)
+    if index is None:
+        raise ValueError(f"Invalid priority {name!r}, must be one of {PRIORITIES}")
+    return index
+
+
+@contextlib.contextmanager
+def priority(name: str) -> Iterator[None]:
+    """
+    Run the commands sent in this context (thread or task) with the priority class `name`.
+
+    Without a context, commands that switch channels off or clear alarms run as "emergency", other setters as "set"
+    and reads as "interactive". The class of the context replaces it, except for emergency commands, which are never
+    demoted.
+
+    Example:
+        with hvps.scheduling.priority("background"):
+            values = [channel.vmon for channel in module.channels]
+
+    Args:
+        name (str): The priority class, one of `PRIORITIES`.
+    """
+    _check_priority(name)
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _ClassStats:
+    __slots__ = ("granted", "rejected", "max_queued", "wait")
+
+    def __init__(self):
+        self.granted = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self.wait = Histogram()
+
+
+class CommandScheduler:
+    def __init__(self, max_queue: int = 64):
+        """
+        Grants exclusive access to a serial port to one command at a time, by priority class.
+
+        Commands waiting for the port are served by priority class (`PRIORITIES`, most urgent first), and in order of
+        arrival within a class, so a command switching channels off does not wait behind a batch of queued reads.
+        A command in progress is never interrupted.
+
+        It replaces the lock of the port: `with scheduler:` waits for the port with the priority of the context
+        (see `priority`), `with scheduler.slot(default):` with a default class for the command.
+
+        Args:
+            max_queue (int, optional): The maximum number of commands waiting for the port. Further commands raise
+                `QueueFullError`, except emergency commands, which are always queued. Defaults to 64.
+        """
+        if max_queue < 1:
+            raise ValueError(f"max_queue must be at least 1, got {max_queue}")
+        self.max_queue = max_queue
+        self._condition = threading.Condition(threading.Lock())
+        self._busy = False
+        self._queues: List[Deque[object]] = [deque() for _ in PRIORITIES]
+        self._queued = 0
+        self._stats = [_ClassStats() for _ in PRIORITIES]
+
+    def _next(self) -> object | None:
+        for queue in self._queues:
+            if queue:
+                return queue[0]
+        return None
+
+    def acquire(self, name: str = "interactive") -> None:
+        """
+        Wait for the port.
+
+        Args:
+            name (str, optional): The priority class. Defaults to "interactive".
+
+        Raises:
+            QueueFullError: If the queue is full (not for emergency commands).
+        """
+        index = _check_priority(name)
+        stats = self._stats[index]
+        with self._condition:
+            if not self._busy and self._queued == 0:
+                self._busy = True
+                stats.granted += 1
+                stats.wait.add(0.0)
+                return
+            if index != _EMERGENCY and self._queued >= self.max_queue:
+                stats.rejected += 1
+                raise QueueFullError(
+                    f"{self._queued} commands waiting for the port, {name} command rejected"
+                )
+            start = time.perf_counter()
+            ticket = object()
+            queue = self._queues[index]
+            queue.append(ticket)
+            self._queued += 1
+            stats.max_queued = max(stats.max_queued, len(queue))
+            try:
+                while self._busy or self._next() is not ticket:
+                    self._condition.wait()
+            except BaseException:
+                queue.remove(ticket)
+                self._queued -= 1
+                self._condition.notify_all()
+                raise
+            queue.popleft()
+            self._queued -= 1
+            self._busy = True
+            stats.granted += 1
+            stats.wait.add(time.perf_counter() - start)
+
+    def release(self) -> None:
+        """Give the port to the next command."""
+        with self._condition:
+            if not self._busy:
+                raise RuntimeError("release of an unlocked scheduler")
+            self._busy = False
+            if self._queued:
+                self._condition.notify_all()
+
+    def locked(self) -> bool:
+        """True while a command holds the port."""
+        return self._busy
+
+    def slot(self, default: str = "interactive") -> _Slot:
+        """
+        Hold the port during a command (context manager).
+
+        Args:
+            default (str, optional): The class of the command, used unless the context sets one (see `priority`).
+                Emergency commands keep their class. Defaults to "interactive".
+        """
+        name = _priority.get()
+        if name is None or default == "emergency":
+            name = default
+        return _Slot(self, name)
+
+    def __enter__(self) -> CommandScheduler:
+        self.acquire(_priority.get() or "interactive")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def snapshot(self) -> Dict:
+        """
+        The statistics of the scheduler.
+
+        Returns:
+            Dict: With keys "queued" (commands waiting now), "max_queue" and "classes": for each priority class,
+            "granted" and "rejected" (number of commands), "max_queued" (longest queue of the class) and "wait"
+            (histogram of the time waited for the port, see `hvps.instrumentation.Histogram.snapshot`).
+        """
+        with self._condition:
+            return {
+                "queued": self._queued,
+                "max_queue": self.max_queue,
+                "classes": {
+                    name: {
+                        "granted": stats.granted,
+                        "rejected": stats.rejected,
+                        "max_queued": stats.max_queued,
+                        "wait": stats.wait.snapshot(),
+                    }
+                    for name, stats in zip(PRIORITIES, self._stats)
+                },
+            }
+
+    def reset(self) -> None:
+        """Remove the recorded statistics."""
+        with self._condition:
+            self._stats = [_ClassStats() for _ in PRIORITIES]
+
+
+class _Slot:
+    # a class rather than a generator based context manager, it is on the path of every command
+    __slots__ = ("_scheduler", "_name")
+
+    def __init__(self, scheduler: CommandScheduler, name: str):
+        self._scheduler = scheduler
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._scheduler.acquire(self._name)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._scheduler.release()
+
+
+def _slot(lock, default: str):
+    """Hold `lock` for a command of class `default` (any lock is accepted, e.g. during port discovery)."""
+    if isinstance(lock, CommandScheduler):
+        return lock.slot(default)
+    return lock
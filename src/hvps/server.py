@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from .polling import Poller
+
+# the values of a sample sent when they change, the status bits are sent with the status
+_FIELDS = ["vmon", "imon", "vset", "status"]
+
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# the largest frame accepted from a client (they only send pings and close frames)
+MAX_FRAME = 1 << 16
+
+# close status codes (RFC 6455, section 7.4.1)
+_PROTOCOL_ERROR = 1002
+_TOO_BIG = 1009
+
+_logger = logging.getLogger(__name__)
+
+
+def _frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    # a final, unmasked frame (server to client)
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class _FrameError(ValueError):
+    # a frame the connection is closed for, with the status code of the close frame
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def _read_frame(
+    rfile, max_length: int | None = MAX_FRAME, masked: bool = True
+) -> Tuple[int, bytes] | None:
+    # (opcode, payload) of a frame, None if the connection is closed. Frames from a client must be masked
+    # (RFC 6455, section 5.1) and their length is checked before reading them
+    header = rfile.read(2)
+    if len(header) < 2:
+        return None
+    opcode, length = header[0] & 0x0F, header[1] & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", rfile.read(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", rfile.read(8))
+    if masked and not header[1] & 0x80:
+        raise _FrameError(_PROTOCOL_ERROR, "Frame not masked")
+    if max_length is not None and length > max_length:
+        raise _FrameError(
+            _TOO_BIG, f"Frame of {length} bytes, at most {max_length} accepted"
+        )
+    mask = rfile.read(4) if header[1] & 0x80 else b"\0\0\0\0"
+    payload = rfile.read(length)
+    if len(payload) < length:
+        return None
+    return opcode, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+def _key(sample: Dict) -> Tuple:
+    return sample["crate"], sample["board"], sample["channel"]
+
+
+def _delta(previous: Dict | None, sample: Dict) -> Dict | None:
+    # the fields of `sample` that changed, with the channel identifiers, None if none
+    changed = {
+        field: sample[field]
+        for field in _FIELDS
+        if previous is None or previous[field] != sample[field]
+    }
+    if not changed:
+        return None
+    if "status" in changed:
+        changed["status_bits"] = sample["status_bits"]
+    return {
+        "crate": sample["crate"],
+        "board": sample["board"],
+        "channel": sample["channel"],
+        **changed,
+    }
+
+
+class _Client:
+    __slots__ = ("connection", "queue", "closed", "send_lock", "close_status")
+
+    def __init__(self, connection: socket.socket, size: int):
+        self.connection = connection
+        self.queue: queue.Queue = queue.Queue(size)
+        self.closed = False
+        self.send_lock = threading.Lock()
+        # payload of the close frame sent to the client (status code, none by default)
+        self.close_status = b""
+
+    def send(self, data: bytes) -> None:
+        with self.send_lock:
+            self.connection.sendall(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            # unblocks the writer and the reader of the connection
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: _Server
+
+    def handle(self):
+        headers = self._handshake()
+        if headers is None:
+            return
+        client = self.server.live.subscribe(self.connection)
+        reader = threading.Thread(
+            target=self._read, args=(client,), name="hvps-server-reader", daemon=True
+        )
+        reader.start()
+        try:
+            while not client.closed:
+                message = client.queue.get()
+                if message is None:
+                    break
+                client.send(message)
+        except OSError as e:
+            _logger.debug("Client %s gone: %r", self.client_address, e)
+        finally:
+            self.server.live.unsubscribe(client)
+            try:
+                client.send(_frame(client.close_status, 0x8))
+            except OSError:
+                pass
+            client.close()
+
+    def _handshake(self) -> Dict[str, str] | None:
+        request_line = self.rfile.readline(65537)
+        headers = {}
+        while True:
+            line = self.rfile.readline(65537)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if (
+            not request_line.startswith(b"GET ")
+            or headers.get("upgrade", "").lower() != "websocket"
+            or key is None
+        ):
+            self.wfile.write(
+                b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+            )
+            return None
+        accept = base64.b64encode(hashlib.sha1(key.encode() + _GUID).digest())
+        self.wfile.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        return headers
+
+    def _read(self, client: _Client) -> None:
+        # answers pings, ends the connection on a close frame
+        try:
+            while not client.closed:
+                frame = _read_frame(self.rfile)
+                if frame is None or frame[0] == 0x8:
+                    break
+                if frame[0] == 0x9:
+                    client.send(_frame(frame[1], 0xA))
+        except _FrameError as e:
+            _logger.debug("Closing the connection of %s: %s", self.client_address, e)
+            client.close_status = struct.pack("!H", e.code)
+        except (OSError, struct.error):
+            pass
+        self.server.live.unsubscribe(client)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, live: LiveServer):
+        super().__init__(address, _Handler)
+        self.live = live
+
+
+class LiveServer:
+    def __init__(
+        self,
+        pollers: List[Poller],
+        host: str = "127.0.0.1",
+        port: int = 9562,
+        queue_size: int = 64,
+    ):
+        """
+        Push the values of the channels to any number of WebSocket clients (e.g. control room displays).
+
+        Each device is read by a single poller, whatever the number of clients. A client receives the full state
+        on connection (`{"type": "snapshot", "channels": [...]}`, the samples of `Poller.poll`), then one message
+        per polling pass with the channels that changed (`{"type": "delta", "time": ..., "channels": [...]}`, only
+        the "vmon", "imon", "vset" and "status" values that changed, with "status_bits" if the status changed).
+        Passes without changes send nothing.
+
+        Each client has a queue of `queue_size` messages. A client that does not read fast enough to keep its queue
+        from filling up is disconnected, so slow clients never delay the others nor the pollers. It can reconnect
+        to get a new snapshot. Clients only send pings and close frames: the connection is closed on frames larger
+        than `MAX_FRAME` (status 1009) or not masked (status 1002).
+
+        Args:
+            pollers (List[Poller]): One poller per device, started with the server.
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The TCP port to listen on, 0 to pick a free one. Defaults to 9562.
+            queue_size (int, optional): The maximum number of messages waiting for a client. Defaults to 64.
+        """
+        if queue_size < 1:
+            raise ValueError(f"Queue size must be positive, got {queue_size}")
+        self.pollers = pollers
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._state: Dict[Tuple, Dict] = {}
+        self._clients: List[_Client] = []
+        self._server: _Server | None = None
+        self._thread: threading.Thread | None = None
+        self.messages = 0
+        self.dropped = 0
+        for poller in pollers:
+            poller.add_sink(self.publish)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """The address the server listens on, (host, port)."""
+        if self._server is None:
+            return self.host, self.port
+        return self._server.server_address[:2]
+
+    def subscribe(self, connection: socket.socket) -> _Client:
+        """Register a client, with the current state as first message."""
+        client = _Client(connection, self.queue_size)
+        with self._lock:
+            message = {"type": "snapshot", "channels": list(self._state.values())}
+            client.queue.put_nowait(_frame(json.dumps(message).encode()))
+            self._clients.append(client)
+        return client
+
+    def unsubscribe(self, client: _Client) -> None:
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+        # ends the writer
+        try:
+            client.queue.put_nowait(None)
+        except queue.Full:
+            client.close()
+
+    def publish(self, samples: List[Dict]) -> None:
+        """
+        Update the state with the samples of a polling pass and send the changes to the clients (sink of the
+        pollers).
+
+        Args:
+            samples (List[Dict]): The samples (see `Poller.poll`).
+        """
+        with self._lock:
+            channels = []
+            for sample in samples:
+                key = _key(sample)
+                delta = _delta(self._state.get(key), sample)
+                self._state[key] = sample
+                if delta is not None:
+                    channels.append(delta)
+            if not channels:
+                return
+            message = _frame(
+                json.dumps(
+                    {"type": "delta", "time": time.time(), "channels": channels}
+                ).encode()
+            )
+            self.messages += 1
+            for client in list(self._clients):
+                try:
+                    client.queue.put_nowait(message)
+                except queue.Full:
+                    _logger.warning("Dropping a slow client")
+                    self.dropped += 1
+                    self._clients.remove(client)
+                    client.close()
+
+    def status(self) -> Dict:
+        """
+        The state of the server.
+
+        Returns:
+            Dict: With keys "clients" (connected), "channels" (in the state), "messages" (deltas sent) and
+            "dropped" (slow clients disconnected).
+        """
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "channels": len(self._state),
+                "messages": self.messages,
+                "dropped": self.dropped,
+            }
+
+    def start(self) -> None:
+        """Start the pollers and serve in a background thread."""
+        if self._server is not None:
+            return
+        self._server = _Server((self.host, self.port), self)
+        for poller in self.pollers:
+            poller.start()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="hvps-server", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving, disconnect the clients and stop the pollers."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+        for poller in self.pollers:
+            poller.stop()
+
+    def __enter__(self) -> LiveServer:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def serve_forever(self) -> None:
+        """Start and block until interrupted (KeyboardInterrupt), then stop."""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def from_config(config: Dict) -> LiveServer:
+    """
+    Create the server described by a configuration (see `hvps.exporter.load_config`), with one poller per device,
+    listening on the `host` and `port` of the `[server]` table.
+
+    Args:
+        config (Dict): The configuration.
+
+    Returns:
+        LiveServer: The server (not started).
+    """
+    from .exporter import _pollers
+
+    server = config.get("server", {})
+    return LiveServer(
+        _pollers(config),
+        host=server.get("host", "127.0.0.1"),
+        port=server.get("port", 9562),
+        queue_size=server.get("queue_size", 64),
+    )
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import struct
+import sys
+import threading
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+# layout of the shared memory block (little endian):
+#   header (32 bytes): magic b"HVPSTAB1", capacity (uint32), count (uint32, records in use), record size (uint32)
+#   then `capacity` records of 88 bytes, in order of first publication:
+#     seq (uint64, seqlock: odd while the record is written), time (float64, seconds since the epoch),
+#     vmon (float64, V), imon (float64, A), vset (float64, V), status (uint32, status register), board (int32),
+#     channel (int32), 4 bytes of padding, crate (32 bytes, utf-8, zero padded)
+MAGIC = b"HVPSTAB1"
+_HEADER = struct.Struct("<8sIII12x")
+_RECORD = struct.Struct("<QddddIii4x32s")
+_SEQ = struct.Struct("<Q")
+_COUNT_OFFSET = 12
+
+# numpy dtype of a record (see `SharedTableReader.view`)
+DTYPE = {
+    "names": [
+        "seq",
+        "time",
+        "vmon",
+        "imon",
+        "vset",
+        "status",
+        "board",
+        "channel",
+        "crate",
+    ],
+    "formats": ["<u8", "<f8", "<f8", "<f8", "<f8", "<u4", "<i4", "<i4", "S32"],
+    "offsets": [0, 8, 16, 24, 32, 40, 44, 48, 56],
+    "itemsize": _RECORD.size,
+}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "The array views of the shared table require numpy (pip install hvps[numpy])"
+        )
+    return numpy
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # attach without handing the block to the resource tracker of this process, which would destroy it on exit
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    block = shared_memory.SharedMemory(name=name)
+    if sys.platform != "win32":
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+class SharedTable:
+    def __init__(self, name: str | None = None, capacity: int = 1024):
+        """
+        The latest values of the channels, in a shared memory block that any number of local processes can read at
+        memory speed (see `SharedTableReader`), without going through the process that owns the serial ports.
+
+        Add `publish` as a sink of the pollers. Each channel (crate, board and channel) gets a fixed record on its
+        first publication. Records are protected by a sequence lock: the counter `seq` of a record is odd while it is
+        written, so readers retry when it is odd or changes during their copy. Writers never wait for readers.
+
+        The layout of the block is documented at the top of this module (`MAGIC`, `DTYPE`).
+
+        Args:
+            name (str | None, optional): The name of the block, used by the readers. Defaults to a random name.
+            capacity (int, optional): The maximum number of channels. Defaults to 1024.
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._block = shared_memory.SharedMemory(
+            name=name, create=True, size=_HEADER.size + capacity * _RECORD.size
+        )
+        _HEADER.pack_into(self._block.buf, 0, MAGIC, capacity, 0, _RECORD.size)
+        self._slots: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory block."""
+        return self._block.name
+
+    def publish(self, samples: List[Dict]) -> None:
+        """
+        Write the samples of a polling pass (sink of the pollers, see `Poller.poll`).
+
+        Args:
+            samples (List[Dict]): The samples.
+
+        Raises:
+            ValueError: If there are more channels than the capacity of the table.
+        """
+        buffer = self._block.buf
+        with self._lock:
+            for sample in samples:
+                key = (sample["crate"], sample["board"], sample["channel"])
+                slot = self._slots.get(key)
+                new = slot is None
+                if new:
+                    if len(self._slots) == self.capacity:
+                        raise ValueError(
+                            f"Shared table full ({self.capacity} channels)"
+                        )
+                    slot = self._slots[key] = len(self._slots)
+                offset = _HEADER.size + slot * _RECORD.size
+                (seq,) = _SEQ.unpack_from(buffer, offset)
+                _SEQ.pack_into(buffer, offset, seq + 1)
+                _RECORD.pack_into(
+                    buffer,
+                    offset,
+                    seq + 1,
+                    sample["time"],
+                    sample["vmon"],
+                    sample["imon"],
+                    sample["vset"],
+                    sample["status"],
+                    sample["board"],
+                    sample["channel"],
+                    str(sample["crate"]).encode()[:32],
+                )
+                _SEQ.pack_into(buffer, offset, seq + 2)
+                if new:
+                    # readers only see complete records
+                    struct.pack_into("<I", buffer, _COUNT_OFFSET, len(self._slots))
+
+    def close(self) -> None:
+        """Close the block in this process and destroy it (readers keep their mapping until they close it)."""
+        self._block.close()
+        self._block.unlink()
+
+    def __enter__(self) -> SharedTable:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SharedTableReader:
+    def __init__(self, name: str, retries: int = 100):
+        """
+        Read the latest values of the channels from a `SharedTable`, possibly in another process.
+
+        Args:
+            name (str): The name of the block (`SharedTable.name`).
+            retries (int, optional): The attempts to read a record while it is being written. Defaults to 100.
+
+        Raises:
+            ValueError: If the block is not a shared table.
+        """
+        self.retries = retries
+        self._block = _attach(name)
+        magic, self.capacity, _, record_size = _HEADER.unpack_from(self._block.buf, 0)
+        if magic != MAGIC or record_size != _RECORD.size:
+            self._block.close()
+            raise ValueError(f"{name!r} is not a shared table")
+
+    @property
+    def count(self) -> int:
+        """The number of channels in the table."""
+        return struct.unpack_from("<I", self._block.buf, _COUNT_OFFSET)[0]
+
+    def read(self) -> List[Dict]:
+        """
+        Read a consistent copy of each record, without numpy.
+
+        Returns:
+            List[Dict]: For each channel, its "crate", "board", "channel", "time", "vmon", "imon", "vset" and
+            "status".
+
+        Raises:
+            ValueError: If a record keeps being written during `retries` attempts.
+        """
+        buffer = self._block.buf
+        records = []
+        for slot in range(self.count):
+            offset = _HEADER.size + slot * _RECORD.size
+            for _ in range(self.retries):
+                values = _RECORD.unpack_from(buffer, offset)
+                if (
+                    values[0] % 2 == 0
+                    and _SEQ.unpack_from(buffer, offset)[0] == values[0]
+                ):
+                    break
+            else:
+                raise ValueError(f"Record {slot} is being written, try again")
+            _, time, vmon, imon, vset, status, board, channel, crate = values
+            records.append(
+                {
+                    "crate": crate.rstrip(b"\0").decode("utf-8", "ignore"),
+                    "board": board,
+                    "channel": channel,
+                    "time": time,
+                    "vmon": vmon,
+                    "imon": imon,
+                    "vset": vset,
+                    "status": status,
+                }
+            )
+        return records
+
+    def view(self):
+        """
+        The records as a numpy structured array (`DTYPE`) mapped on the block, without copy. The values change
+        while they are used, and a record may be read while it is written: use `snapshot` for consistent values.
+
+        Returns:
+            numpy.ndarray: The records in use.
+        """
+        numpy = _numpy()
+        return numpy.ndarray(
+            (self.count,),
+            dtype=numpy.dtype(DTYPE),
+            buffer=self._block.buf,
+            offset=_HEADER.size,
+        )
+
+    def snapshot(self):
+        """
+        A consistent copy of the records as a numpy structured array (`DTYPE`).
+
+        Returns:
+            numpy.ndarray: The records in use.
+
+        Raises:
+            ValueError: If some records keep being written during `retries` attempts.
+        """
+        numpy = _numpy()
+        view = self.view()
+        copy = view.copy()
+        for _ in range(self.retries):
+            torn = (copy["seq"] % 2 == 1) | (copy["seq"] != view["seq"])
+            if not torn.any():
+                return copy
+            copy[torn] = view[torn]
+        raise ValueError(
+            f"Records {numpy.flatnonzero(torn).tolist()} are being written, try again"
+        )
+
+    def close(self) -> None:
+        """Close the mapping (after deleting the arrays returned by `view`)."""
+        self._block.close()
+
+    def __enter__(self) -> SharedTableReader:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
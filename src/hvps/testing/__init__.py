@@ -0,0 +1,18 @@
+from .emulator import Emulator, FAULTS
+from .caen import CaenEmulator, CaenBoardState, CaenChannelState
+from .iseg import IsegEmulator, IsegModuleState, IsegChannelState
+from .memory import InMemorySerial
+from .network import TcpServer
+
+__all__ = [
+    "Emulator",
+    "FAULTS",
+    "CaenEmulator",
+    "CaenBoardState",
+    "CaenChannelState",
+    "IsegEmulator",
+    "IsegModuleState",
+    "IsegChannelState",
+    "InMemorySerial",
+    "TcpServer",
+]
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List
+
+from .emulator import Emulator
+
+# (number of integer digits, number of decimals) used to format the values as the device does (e.g. VSET: "0100.0")
+_NUMBER_FORMATS = {
+    "VSET": (4, 1),
+    "VMIN": (4, 1),
+    "VMAX": (4, 1),
+    "VMON": (4, 1),
+    "ISET": (4, 2),
+    "IMIN": (4, 2),
+    "IMAX": (4, 2),
+    "IMON": (4, 2),
+    "MAXV": (4, 0),
+    "MVMIN": (4, 0),
+    "MVMAX": (4, 0),
+    "RUP": (3, 0),
+    "RUPMIN": (3, 0),
+    "RUPMAX": (3, 0),
+    "RDW": (3, 0),
+    "RDWMIN": (3, 0),
+    "RDWMAX": (3, 0),
+    "TRIP": (4, 1),
+    "TRIPMIN": (4, 1),
+    "TRIPMAX": (4, 1),
+}
+
+# parameters that can be set, with the parameter holding their limits
+_SET_PARAMETERS = {
+    "VSET": ("VMIN", "VMAX"),
+    "ISET": ("IMIN", "IMAX"),
+    "MAXV": ("MVMIN", "MVMAX"),
+    "RUP": ("RUPMIN", "RUPMAX"),
+    "RDW": ("RDWMIN", "RDWMAX"),
+    "TRIP": ("TRIPMIN", "TRIPMAX"),
+    "PDWN": ["RAMP", "KILL"],
+    "IMRANGE": ["HIGH", "LOW"],
+}
+
+_COMMAND_REGEX = re.compile(
+    r"^\$BD:(?P<bd>\d{1,2}),CMD:(?P<cmd>[A-Z]+),(?:CH:(?P<ch>\d+),)?PAR:(?P<par>[A-Z]+)(?:,VAL:(?P<val>.*))?$"
+)
+
+
+class CaenChannelState:
+    def __init__(self):
+        """The state of an emulated CAEN channel. Monitored values follow the set values without ramping."""
+        self.parameters = {
+            "VSET": 0.0,
+            "VMIN": 0.0,
+            "VMAX": 8000.0,
+            "VDEC": 1,
+            "ISET": 10.0,
+            "IMIN": 0.0,
+            "IMAX": 3000.0,
+            "ISDEC": 2,
+            "IMRANGE": "HIGH",
+            "IMDEC": 2,
+            "MAXV": 8100.0,
+            "MVMIN": 0.0,
+            "MVMAX": 8100.0,
+            "MVDEC": 0,
+            "RUP": 50.0,
+            "RUPMIN": 1.0,
+            "RUPMAX": 500.0,
+            "RUPDEC": 0,
+            "RDW": 50.0,
+            "RDWMIN": 1.0,
+            "RDWMAX": 500.0,
+            "RDWDEC": 0,
+            "TRIP": 10.0,
+            "TRIPMIN": 0.0,
+            "TRIPMAX": 1000.0,
+            "TRIPDEC": 1,
+            "PDWN": "RAMP",
+            "POL": "+",
+        }
+        self.on = False
+        # load resistance used to compute IMON (uA) from VMON (V)
+        self.resistance = 10e6
+
+    @property
+    def vmon(self) -> float:
+        return min(self.parameters["VSET"], self.parameters["MAXV"]) if self.on else 0.0
+
+    @property
+    def imon(self) -> float:
+        return self.vmon / self.resistance * 1e6
+
+    @property
+    def stat(self) -> int:
+        return 1 if self.on else 0
+
+    def get(self, parameter: str) -> str | None:
+        if parameter == "VMON":
+            value = self.vmon
+        elif parameter == "IMON":
+            value = self.imon
+        elif parameter == "STAT":
+            return f"{self.stat:05d}"
+        elif parameter in self.parameters:
+            value = self.parameters[parameter]
+        else:
+            return None
+
+        if parameter in _NUMBER_FORMATS:
+            digits, decimals = _NUMBER_FORMATS[parameter]
+            width = digits + (decimals + 1 if decimals > 0 else 0)
+            return f"{value:0{width}.{decimals}f}"
+        return str(value)
+
+
+class CaenBoardState:
+    def __init__(
+        self,
+        name: str = "N1471H",
+        number_of_channels: int = 4,
+        serial_number: str = "00001",
+        firmware_release: str = "01.00",
+    ):
+        """The state of an emulated CAEN board."""
+        self.name = name
+        self.serial_number = serial_number
+        self.firmware_release = firmware_release
+        self.interlock_status = "NO"
+        self.interlock_mode = "CLOSED"
+        self.control_mode = "REMOTE"
+        self.local_bus_termination_status = "OFF"
+        self.alarm = 0
+        self.channels: List[CaenChannelState] = [
+            CaenChannelState() for _ in range(number_of_channels)
+        ]
+
+    @property
+    def number_of_channels(self) -> int:
+        return len(self.channels)
+
+    def get(self, parameter: str) -> str | None:
+        return {
+            "BDNAME": self.name,
+            "BDNCH": str(self.number_of_channels),
+            "BDFREL": self.firmware_release,
+            "BDSNUM": self.serial_number,
+            "BDILK": self.interlock_status,
+            "BDILKM": self.interlock_mode,
+            "BDCTR": self.control_mode,
+            "BDTERM": self.local_bus_termination_status,
+            "BDALARM": f"{self.alarm:05d}",
+        }.get(parameter)
+
+
+class CaenEmulator(Emulator):
+    def __init__(
+        self,
+        boards: List[int] | Dict[int, CaenBoardState] | None = None,
+        **kwargs,
+    ):
+        """Emulator of CAEN boards (N1470 family) speaking the `$BD:..,CMD:MON/SET,...` serial protocol.
+
+        Boards not present on the line do not answer. Setting a channel parameter with channel number equal to the
+        number of channels of the board (e.g. CH:4 on a 4 channel board) applies it to all channels, and monitoring
+        it returns the values of all channels separated by ";".
+
+        Args:
+            boards (List[int] | Dict[int, CaenBoardState] | None, optional): The board numbers present on the line,
+                or the board states by board number. Defaults to a single N1471H board at address 0.
+            **kwargs: Latency, jitter, baud rate and seed, see `Emulator`.
+
+        Example:
+            with CaenEmulator(boards=[0, 3]) as emulator:
+                with Caen(port=emulator.port, timeout=1.0) as caen:
+                    print(caen.module(3).name)
+        """
+        super().__init__(**kwargs)
+        if boards is None:
+            boards = [0]
+        if not isinstance(boards, dict):
+            boards = {
+                bd: CaenBoardState(serial_number=f"{bd + 1:05d}") for bd in boards
+            }
+        self.boards: Dict[int, CaenBoardState] = boards
+
+    def error_response(self, command: bytes) -> bytes:
+        match = _COMMAND_REGEX.match(command.decode("ascii", "replace").strip())
+        bd = int(match.group("bd")) if match else 0
+        return f"#BD:{bd:02d},CMD:ERR\r\n".encode("ascii")
+
+    def handle(self, command: bytes) -> bytes:
+        try:
+            line = command.decode("ascii").strip()
+        except UnicodeDecodeError:
+            return b""
+        match = _COMMAND_REGEX.match(line)
+        if match is None:
+            # cannot know which board is addressed
+            return b"#CMD:ERR\r\n"
+
+        bd = int(match.group("bd"))
+        board = self.boards.get(bd)
+        if board is None:
+            return b""
+
+        def reply(field: str) -> bytes:
+            return f"#BD:{bd:02d},{field}\r\n".encode("ascii")
+
+        cmd = match.group("cmd")
+        parameter = match.group("par")
+        value = match.group("val")
+        if cmd not in ["MON", "SET"]:
+            return reply("CMD:ERR")
+
+        if match.group("ch") is None:
+            return self._handle_board(board, cmd, parameter, value, reply)
+
+        ch = int(match.group("ch"))
+        if ch == board.number_of_channels:
+            channels = board.channels  # all channels
+        elif ch < board.number_of_channels:
+            channels = [board.channels[ch]]
+        else:
+            return reply("CH:ERR")
+
+        if cmd == "MON":
+            values = [channel.get(parameter) for channel in channels]
+            if values[0] is None:
+                return reply("PAR:ERR")
+            return reply(f"CMD:OK,VAL:{';'.join(values)}")
+
+        if board.control_mode != "REMOTE":
+            return reply("LOC:ERR")
+        if parameter in ["ON", "OFF"]:
+            for channel in channels:
+                channel.on = parameter == "ON"
+            return reply("CMD:OK")
+        if parameter not in _SET_PARAMETERS:
+            return reply("PAR:ERR")
+        limits = _SET_PARAMETERS[parameter]
+        if isinstance(limits, list):
+            if value not in limits:
+                return reply("VAL:ERR")
+        else:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return reply("VAL:ERR")
+            for channel in channels:
+                minimum, maximum = (channel.parameters[limit] for limit in limits)
+                if not minimum <= value <= maximum:
+                    return reply("VAL:ERR")
+        for channel in channels:
+            channel.parameters[parameter] = value
+        return reply("CMD:OK")
+
+    @staticmethod
+    def _handle_board(board: CaenBoardState, cmd, parameter, value, reply) -> bytes:
+        if cmd == "MON":
+            response = board.get(parameter)
+            if response is None:
+                return reply("PAR:ERR")
+            return reply(f"CMD:OK,VAL:{response}")
+
+        if parameter == "BDILKM":
+            if value not in ["OPEN", "CLOSED"]:
+                return reply("VAL:ERR")
+            board.interlock_mode = value
+            return reply("CMD:OK")
+        if parameter == "BDCLR":
+            board.alarm = 0
+            return reply("CMD:OK")
+        return reply("PAR:ERR")
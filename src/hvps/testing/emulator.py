@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import os
+import random
+import select
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+FAULTS = ["drop", "garbage", "truncate", "error", "delay"]
+
+
+class Emulator(ABC):
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        baudrate: int | None = None,
+        seed: int | None = None,
+    ):
+        """Serve an emulated device over a pseudo-terminal.
+
+        The emulator reads command lines from the master side of a pseudo-terminal and writes the responses back,
+        so that an unmodified `Hvps` object can connect to the slave side (`emulator.port`).
+
+        Args:
+            latency (float, optional): The processing time of each command, in seconds. Defaults to 0.0.
+            jitter (float, optional): Maximum random deviation of the latency, in seconds. Defaults to 0.0.
+            baudrate (int | None, optional): If set, the time needed to transmit the command and the response at this
+                baud rate (10 bits per byte) is added to the latency. Defaults to None.
+            seed (int | None, optional): The seed of the random number generator (jitter, garbage). Defaults to None.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.baudrate = baudrate
+        self._random = random.Random(seed)
+
+        self._faults: List[Dict] = []
+        self._lock = threading.Lock()
+
+        # number of commands received
+        self.commands = 0
+
+        self._master: int | None = None
+        self._slave: int | None = None
+        self._wakeup: tuple | None = None
+        self._thread: threading.Thread | None = None
+        self._port: str | None = None
+
+    @abstractmethod
+    def handle(self, command: bytes) -> bytes:
+        """Process a command line and return the bytes written back (empty if the device does not answer).
+
+        Args:
+            command (bytes): The command line, including the line terminator.
+
+        Returns:
+            bytes: The response.
+        """
+        pass
+
+    @abstractmethod
+    def error_response(self, command: bytes) -> bytes:
+        """The response of the device to a command it could not process (used by the "error" fault).
+
+        Args:
+            command (bytes): The command line, including the line terminator.
+
+        Returns:
+            bytes: The error response.
+        """
+        pass
+
+    @property
+    def port(self) -> str:
+        """The serial port (pseudo-terminal slave) the device is served on.
+
+        Returns:
+            str: The port name (e.g. /dev/pts/3).
+        """
+        if self._port is None:
+            raise RuntimeError("Emulator is not running")
+        return self._port
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def inject_fault(
+        self,
+        fault: str,
+        count: int = 1,
+        match: bytes | None = None,
+        delay: float = 0.0,
+    ) -> None:
+        """Make the next command(s) fail.
+
+        Args:
+            fault (str): The type of fault. One of:
+                "drop": the device does not answer,
+                "garbage": the device answers a line of random bytes,
+                "truncate": the response is cut before the line terminator,
+                "error": the device answers with an error response,
+                "delay": the response is delayed by `delay` seconds.
+            count (int, optional): The number of commands affected. Defaults to 1.
+            match (bytes | None, optional): Only commands containing these bytes are affected. Defaults to None (any).
+            delay (float, optional): The extra delay of the "delay" fault, in seconds. Defaults to 0.0.
+
+        Raises:
+            ValueError: If the fault type is not valid.
+        """
+        if fault not in FAULTS:
+            raise ValueError(f"Invalid fault '{fault}'. Valid faults are: {FAULTS}")
+        with self._lock:
+            self._faults.append(
+                {"fault": fault, "count": count, "match": match, "delay": delay}
+            )
+
+    def clear_faults(self) -> None:
+        """Remove all pending faults."""
+        with self._lock:
+            self._faults.clear()
+
+    def _take_fault(self, command: bytes) -> Dict | None:
+        with self._lock:
+            for fault in self._faults:
+                if fault["match"] is None or fault["match"] in command:
+                    fault["count"] -= 1
+                    if fault["count"] <= 0:
+                        self._faults.remove(fault)
+                    return fault
+        return None
+
+    def process(self, command: bytes) -> bytes:
+        """Process a command line as the device would, including latency and faults.
+
+        Args:
+            command (bytes): The command line, including the line terminator.
+
+        Returns:
+            bytes: The response.
+        """
+        self.commands += 1
+        fault = self._take_fault(command)
+        response = self.handle(command)
+
+        delay = self.latency
+        if self.jitter > 0:
+            delay += self._random.uniform(-self.jitter, self.jitter)
+        if fault is not None:
+            if fault["fault"] == "drop":
+                response = b""
+            elif fault["fault"] == "garbage":
+                response = (
+                    bytes(self._random.randrange(33, 127) for _ in range(16)) + b"\r\n"
+                )
+            elif fault["fault"] == "truncate":
+                response = response[: len(response) // 2]
+            elif fault["fault"] == "error":
+                response = self.error_response(command)
+            elif fault["fault"] == "delay":
+                delay += fault["delay"]
+        if self.baudrate is not None:
+            delay += (len(command) + len(response)) * 10 / self.baudrate
+
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+    def start(self) -> Emulator:
+        """Start serving the device on a new pseudo-terminal.
+
+        Returns:
+            Emulator: self
+
+        Raises:
+            NotImplementedError: If pseudo-terminals are not available (Windows).
+        """
+        if os.name != "posix":
+            raise NotImplementedError(
+                "The emulator requires pseudo-terminals, which are only available on POSIX systems"
+            )
+        import tty
+
+        if self.running:
+            return self
+
+        self._master, self._slave = os.openpty()
+        # raw mode: no echo or line ending translation by the terminal driver
+        tty.setraw(self._slave)
+        self._port = os.ttyname(self._slave)
+        self._wakeup = os.pipe()
+
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving the device and close the pseudo-terminal."""
+        if self._thread is None:
+            return
+        os.write(self._wakeup[1], b"\0")
+        self._thread.join()
+        self._thread = None
+        for fd in [self._master, self._slave, *self._wakeup]:
+            os.close(fd)
+        self._master = self._slave = self._wakeup = None
+        self._port = None
+
+    def __enter__(self) -> Emulator:
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __del__(self):
+        try:
+            self.stop()
+        except Exception:
+            pass
+
+    def _serve(self):
+        buffer = b""
+        while True:
+            readable, _, _ = select.select([self._master, self._wakeup[0]], [], [])
+            if self._wakeup[0] in readable:
+                return
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                return
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                response = self.process(line + b"\n")
+                while response:
+                    written = os.write(self._master, response)
+                    response = response[written:]
@@ -0,0 +1,642 @@
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, List
+
+from .emulator import Emulator
+
+_PART_REGEX = re.compile(
+    r"^(?P<header>[^\s?,(]+)(?P<query>\?)?\s*(?P<argument>[^,(]*?)\s*,?\s*(?:\(@(?P<channels>[^)]*)\))?$"
+)
+
+# channel status register bits
+_CHANNEL_STATUS_IS_POSITIVE = 1 << 0
+_CHANNEL_STATUS_IS_ON = 1 << 3
+_CHANNEL_STATUS_IS_EMERGENCY_OFF = 1 << 5
+
+# channel control register bits
+_CHANNEL_CONTROL_SET_ON = 1 << 3
+_CHANNEL_CONTROL_SET_EMERGENCY_OFF = 1 << 5
+
+# module status register bits (see `hvps.devices.iseg.module.Module.module_status`)
+_MODULE_STATUS_IS_FINE_ADJUSTMENT = 1 << 0
+_MODULE_STATUS_VOLTAGE_ON = 1 << 3
+_MODULE_STATUS_IS_INPUT_ERROR = 1 << 6
+_MODULE_STATUS_IS_SAFETY_LOOP_GOOD = 1 << 10
+_MODULE_STATUS_IS_MODULE_GOOD = 1 << 12
+_MODULE_STATUS_IS_SUPPLY_GOOD = 1 << 13
+_MODULE_STATUS_IS_TEMPERATURE_GOOD = 1 << 14
+_MODULE_STATUS_IS_KILL_ENABLE = 1 << 15
+
+
+def _format_number(value: float, unit: str = "") -> str:
+    """Format a number as the device does, in scientific notation followed by the unit (e.g. "1.23400E3V")."""
+    mantissa, exponent = f"{value:.5E}".split("E")
+    return f"{mantissa}E{int(exponent)}{unit}"
+
+
+def _format_value(value, unit: str = "") -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float):
+        return _format_number(value, unit)
+    if isinstance(value, list):
+        return ",".join(_format_value(v, unit) for v in value)
+    return str(value)
+
+
+def _parse_number(argument: str) -> float:
+    # the unit suffix is optional
+    return float(re.sub(r"[A-Za-z/%]+$", "", argument.strip()))
+
+
+def _parse_integer(argument: str) -> int:
+    value = _parse_number(argument)
+    if value != int(value):
+        raise ValueError(f"Invalid integer '{argument}'")
+    return int(value)
+
+
+def _parse_channels(channels: str, number_of_channels: int) -> List[int]:
+    """Parse a channel list such as "0", "0-3" or "0,2-3"."""
+    result = []
+    for item in channels.split(","):
+        first, _, last = item.strip().partition("-")
+        first = int(first)
+        last = int(last) if last else first
+        if not 0 <= first <= last < number_of_channels:
+            raise ValueError(f"Invalid channel list '{channels}'")
+        result += range(first, last + 1)
+    return result
+
+
+class IsegChannelState:
+    def __init__(self, voltage_nominal: float = 6000.0, current_nominal: float = 0.002):
+        """The state of an emulated iseg channel. Measured values follow the set values without ramping."""
+        self.trip_action = 0
+        self.trip_timeout = 1000  # ms
+        self.external_inhibit_action = 1
+        self.output_mode = 1
+        self.available_output_modes = [1, 2, 3]
+        self.output_polarity = "p"
+        self.available_output_polarities = ["p", "n"]
+
+        self.voltage_nominal = voltage_nominal
+        self.voltage_set = 0.0
+        self.voltage_bounds = 0.0
+        self.voltage_mode_list = [
+            voltage_nominal / 3,
+            voltage_nominal * 2 / 3,
+            voltage_nominal,
+        ]
+        self.voltage_mode = voltage_nominal
+
+        self.current_nominal = current_nominal
+        self.current_set = current_nominal
+        self.current_bounds = 0.0
+        self.current_mode_list = [current_nominal / 2, current_nominal]
+        self.current_mode = current_nominal
+
+        # ramp speeds in V/s and A/s
+        self.voltage_ramp_up_speed = voltage_nominal / 100
+        self.voltage_ramp_down_speed = voltage_nominal / 100
+        self.voltage_ramp_speed_minimum = voltage_nominal / 5000
+        self.voltage_ramp_speed_maximum = voltage_nominal / 5
+        self.current_ramp_up_speed = current_nominal / 100
+        self.current_ramp_down_speed = current_nominal / 100
+        self.current_ramp_speed_minimum = current_nominal / 5000
+        self.current_ramp_speed_maximum = current_nominal / 5
+
+        self.on = False
+        self.emergency_off = False
+        self.event_status = 0
+        self.event_mask = 0
+
+        # load resistance used to compute the measured current (A) from the measured voltage (V)
+        self.resistance = 10e6
+
+    @property
+    def measured_voltage(self) -> float:
+        if not self.on or self.emergency_off:
+            return 0.0
+        return -self.voltage_set if self.output_polarity == "n" else self.voltage_set
+
+    @property
+    def measured_current(self) -> float:
+        return self.measured_voltage / self.resistance
+
+    @property
+    def control(self) -> int:
+        control = 0
+        if self.on:
+            control |= _CHANNEL_CONTROL_SET_ON
+        if self.emergency_off:
+            control |= _CHANNEL_CONTROL_SET_EMERGENCY_OFF
+        return control
+
+    @property
+    def status(self) -> int:
+        status = 0
+        if self.output_polarity == "p":
+            status |= _CHANNEL_STATUS_IS_POSITIVE
+        if self.on and not self.emergency_off:
+            status |= _CHANNEL_STATUS_IS_ON
+        if self.emergency_off:
+            status |= _CHANNEL_STATUS_IS_EMERGENCY_OFF
+        return status
+
+    def get(self, header: str) -> str | None:
+        """The response to a channel query (e.g. ":MEAS:VOLT"), None if the query is not valid."""
+        queries = {
+            ":CONF:TRIP:ACTION": (self.trip_action, ""),
+            ":CONF:TRIP:TIME": (self.trip_timeout, ""),
+            ":CONF:INHP:ACTION": (self.external_inhibit_action, ""),
+            ":CONF:OUTPUT:MODE": (self.output_mode, ""),
+            ":CONF:OUTPUT:MODE:LIST": (self.available_output_modes, ""),
+            ":CONF:OUTPUT:POL": (self.output_polarity, ""),
+            ":CONF:OUTPUT:POL:LIST": (self.available_output_polarities, ""),
+            ":READ:VOLT": (self.voltage_set, "V"),
+            ":READ:VOLT:LIM": (self.voltage_nominal, "V"),
+            ":READ:VOLT:NOM": (self.voltage_nominal, "V"),
+            ":READ:VOLT:MODE": (self.voltage_mode, "V"),
+            ":READ:VOLT:MODE:LIST": (self.voltage_mode_list, "V"),
+            ":READ:VOLT:BOUNDS": (self.voltage_bounds, "V"),
+            ":READ:VOLT:ON": (self.on, ""),
+            ":READ:VOLT:EMCY": (self.emergency_off, ""),
+            ":READ:CURR": (self.current_set, "A"),
+            ":READ:CURR:LIM": (self.current_nominal, "A"),
+            ":READ:CURR:NOM": (self.current_nominal, "A"),
+            ":READ:CURR:MODE": (self.current_mode, "A"),
+            ":READ:CURR:MODE:LIST": (self.current_mode_list, "A"),
+            ":READ:CURR:BOUNDS": (self.current_bounds, "A"),
+            ":READ:RAMP:VOLT": (self.voltage_ramp_up_speed, "V/s"),
+            ":READ:RAMP:VOLT:MIN": (self.voltage_ramp_speed_minimum, "V/s"),
+            ":READ:RAMP:VOLT:MAX": (self.voltage_ramp_speed_maximum, "V/s"),
+            ":READ:RAMP:CURR": (self.current_ramp_up_speed, "A/s"),
+            ":READ:RAMP:CURR:MIN": (self.current_ramp_speed_minimum, "A/s"),
+            ":READ:RAMP:CURR:MAX": (self.current_ramp_speed_maximum, "A/s"),
+            ":READ:CHAN:CONTROL": (self.control, ""),
+            ":READ:CHAN:STATUS": (self.status, ""),
+            ":READ:CHAN:EVENT:STATUS": (self.event_status, ""),
+            ":READ:CHAN:EVENT:MASK": (self.event_mask, ""),
+            ":MEAS:VOLT": (self.measured_voltage, "V"),
+            ":MEAS:CURR": (self.measured_current, "A"),
+            ":CONF:RAMP:VOLT:UP": (self.voltage_ramp_up_speed, "V/s"),
+            ":CONF:RAMP:VOLT:DOWN": (self.voltage_ramp_down_speed, "V/s"),
+            ":CONF:RAMP:CURR:UP": (self.current_ramp_up_speed, "A/s"),
+            ":CONF:RAMP:CURR:DOWN": (self.current_ramp_down_speed, "A/s"),
+        }
+        if header not in queries:
+            return None
+        return _format_value(*queries[header])
+
+    def set(self, header: str, argument: str) -> bool:
+        """Process a channel setting.
+
+        Returns:
+            bool: True if the header is a valid channel setting (even if the value is rejected), False otherwise.
+
+        Raises:
+            ValueError: If the value is rejected by the device.
+        """
+
+        def check_range(value: float, minimum: float, maximum: float) -> float:
+            if not minimum <= value <= maximum:
+                raise ValueError(f"Value {value} out of range [{minimum}, {maximum}]")
+            return value
+
+        def check_allowed(value, allowed: list):
+            if value not in allowed:
+                raise ValueError(f"Value {value} not in {allowed}")
+            return value
+
+        voltage_ramp_limits = (
+            self.voltage_ramp_speed_minimum,
+            self.voltage_ramp_speed_maximum,
+        )
+        current_ramp_limits = (
+            self.current_ramp_speed_minimum,
+            self.current_ramp_speed_maximum,
+        )
+        settings: Dict[str, Callable[[str], Dict]] = {
+            ":CONF:TRIP:ACTION": lambda a: {
+                "trip_action": check_allowed(_parse_integer(a), [*range(5)])
+            },
+            ":CONF:TRIP:TIME": lambda a: {
+                "trip_timeout": check_range(_parse_integer(a), 1, 4095)
+            },
+            ":CONF:INHP:ACTION": lambda a: {
+                "external_inhibit_action": check_allowed(_parse_integer(a), [*range(5)])
+            },
+            ":CONF:OUTPUT:MODE": lambda a: {
+                "output_mode": check_allowed(
+                    _parse_integer(a), self.available_output_modes
+                )
+            },
+            ":CONF:OUTPUT:POL": lambda a: {
+                "output_polarity": check_allowed(
+                    a.strip().lower(), self.available_output_polarities
+                )
+            },
+            ":VOLT:BOUNDS": lambda a: {
+                "voltage_bounds": check_range(
+                    _parse_number(a), 0.0, self.voltage_nominal
+                )
+            },
+            ":CURR": lambda a: {
+                "current_set": check_range(_parse_number(a), 0.0, self.current_nominal)
+            },
+            ":CURR:BOUNDS": lambda a: {
+                "current_bounds": check_range(
+                    _parse_number(a), 0.0, self.current_nominal
+                )
+            },
+            ":CONF:RAMP:VOLT": lambda a: {
+                "voltage_ramp_up_speed": check_range(
+                    _parse_number(a), *voltage_ramp_limits
+                ),
+                "voltage_ramp_down_speed": _parse_number(a),
+            },
+            ":CONF:RAMP:VOLT:UP": lambda a: {
+                "voltage_ramp_up_speed": check_range(
+                    _parse_number(a), *voltage_ramp_limits
+                )
+            },
+            ":CONF:RAMP:VOLT:DOWN": lambda a: {
+                "voltage_ramp_down_speed": check_range(
+                    _parse_number(a), *voltage_ramp_limits
+                )
+            },
+            ":CONF:RAMP:CURR": lambda a: {
+                "current_ramp_up_speed": check_range(
+                    _parse_number(a), *current_ramp_limits
+                ),
+                "current_ramp_down_speed": _parse_number(a),
+            },
+            ":CONF:RAMP:CURR:UP": lambda a: {
+                "current_ramp_up_speed": check_range(
+                    _parse_number(a), *current_ramp_limits
+                )
+            },
+            ":CONF:RAMP:CURR:DOWN": lambda a: {
+                "current_ramp_down_speed": check_range(
+                    _parse_number(a), *current_ramp_limits
+                )
+            },
+            ":EVENT:MASK": lambda a: {"event_mask": _parse_integer(a)},
+        }
+
+        if header == ":VOLT":
+            argument = " ".join(argument.upper().split())
+            if argument == "ON":
+                self.on = True
+            elif argument == "OFF":
+                self.on = False
+            elif argument == "EMCY OFF":
+                self.emergency_off = True
+            elif argument == "EMCY CLR":
+                self.emergency_off = False
+                self.on = False
+            else:
+                self.voltage_set = check_range(
+                    _parse_number(argument), 0.0, self.voltage_nominal
+                )
+            return True
+        if header == ":EVENT":
+            if argument.strip().upper() == "CLEAR":
+                self.event_status = 0
+            else:
+                self.event_status &= ~_parse_integer(argument)
+            return True
+        if header not in settings:
+            return False
+        for attribute, value in settings[header](argument).items():
+            setattr(self, attribute, value)
+        return True
+
+
+class IsegModuleState:
+    def __init__(
+        self,
+        model: str = "NHR 42 60r",
+        number_of_channels: int = 4,
+        serial_number: str = "5200068",
+        firmware_release: str = "2.0.6",
+        voltage_nominal: float = 6000.0,
+        current_nominal: float = 0.002,
+    ):
+        """The state of an emulated iseg module."""
+        self.model = model
+        self.serial_number = serial_number
+        self.firmware_release = firmware_release
+        self.firmware_name = "E16D0"
+        self.instruction_set = "EDCP"
+
+        self.filter_averaging_steps = 64
+        self.kill_enable = 0
+        self.adjustment = 1
+        self.can_address = 0
+        self.can_bitrate = 250000
+        self.serial_baud_rate = 9600
+        self.serial_echo = 1
+
+        self.voltage_limit = 100.0  # %
+        self.current_limit = 100.0  # %
+        self.voltage_ramp_speed = 1.0  # %/s
+        self.current_ramp_speed = 1.0  # %/s
+
+        # +24 V, -24 V, +5 V, +3.3 V, +12 V, -12 V, +2.5 V
+        self.supply_voltages = [24.0, -24.0, 5.0, 3.3, 12.0, -12.0, 2.5]
+        self.temperature = 35.0
+
+        self.control = 0
+        self.event_status = 0
+        self.event_mask = 0
+        self.event_channel_mask = 0
+        self.setvalue_changes = 0
+        self.input_error = False
+        self.configuration_mode = False
+        self.local_lockout = False
+
+        self.channels: List[IsegChannelState] = [
+            IsegChannelState(
+                voltage_nominal=voltage_nominal, current_nominal=current_nominal
+            )
+            for _ in range(number_of_channels)
+        ]
+
+    @property
+    def number_of_channels(self) -> int:
+        return len(self.channels)
+
+    @property
+    def id_string(self) -> str:
+        return f"iseg Spezialelektronik GmbH,{self.model},{self.serial_number},{self.firmware_release}"
+
+    @property
+    def status(self) -> int:
+        status = (
+            _MODULE_STATUS_IS_SAFETY_LOOP_GOOD
+            | _MODULE_STATUS_IS_MODULE_GOOD
+            | _MODULE_STATUS_IS_SUPPLY_GOOD
+            | _MODULE_STATUS_IS_TEMPERATURE_GOOD
+        )
+        if self.adjustment:
+            status |= _MODULE_STATUS_IS_FINE_ADJUSTMENT
+        if any(channel.on for channel in self.channels):
+            status |= _MODULE_STATUS_VOLTAGE_ON
+        if self.input_error:
+            status |= _MODULE_STATUS_IS_INPUT_ERROR
+        if self.kill_enable:
+            status |= _MODULE_STATUS_IS_KILL_ENABLE
+        return status
+
+    @property
+    def event_channel_status(self) -> int:
+        return sum(
+            1 << i for i, channel in enumerate(self.channels) if channel.event_status
+        )
+
+    def get(self, header: str) -> str | List[str] | None:
+        """The response to a module query (e.g. "*IDN"), None if the query is not valid.
+
+        The supply voltages query returns one value per supply, to be selected with a list (e.g. "(@0-6)").
+        """
+        if header == ":READ:MODULE:SUPPLY":
+            return [_format_number(v, "V") for v in self.supply_voltages]
+        supplies = ["P24V", "N24V", "P5V", "P3V", "P12V", "N12V"]
+        if header.startswith(":READ:MODULE:SUPPLY:"):
+            supply = header.rsplit(":", 1)[1]
+            if supply not in supplies:
+                return None
+            return _format_number(self.supply_voltages[supplies.index(supply)], "V")
+
+        queries = {
+            "*IDN": (self.id_string, ""),
+            "*INSTR": (self.instruction_set, ""),
+            ":READ:MODULE:CHANNELNUMBER": (self.number_of_channels, ""),
+            ":READ:FIRMWARE:RELEASE": (self.firmware_release, ""),
+            ":READ:FIRMWARE:NAME": (self.firmware_name, ""),
+            ":CONF:AVER": (self.filter_averaging_steps, ""),
+            ":CONF:KILL": (self.kill_enable, ""),
+            ":CONF:ADJUST": (self.adjustment, ""),
+            ":CONF:CAN:ADDR": (self.can_address, ""),
+            ":CONF:CAN:BITRATE": (self.can_bitrate, ""),
+            ":CONF:SERIAL:BAUD": (self.serial_baud_rate, ""),
+            ":CONF:SERIAL:ECHO": (self.serial_echo, ""),
+            ":READ:VOLT:LIM": (self.voltage_limit, "%"),
+            ":READ:CURR:LIM": (self.current_limit, "%"),
+            ":READ:RAMP:VOLT": (self.voltage_ramp_speed, "%/s"),
+            ":READ:RAMP:CURR": (self.current_ramp_speed, "%/s"),
+            ":READ:MODULE:CONTROL": (self.control, ""),
+            ":READ:MODULE:STATUS": (self.status, ""),
+            ":READ:MODULE:EVENT:STATUS": (self.event_status, ""),
+            ":READ:MODULE:EVENT:MASK": (self.event_mask, ""),
+            ":READ:MODULE:EVENT:CHANSTAT": (self.event_channel_status, ""),
+            ":READ:MODULE:EVENT:CHANMASK": (self.event_channel_mask, ""),
+            ":READ:MODULE:TEMPERATURE": (self.temperature, "C"),
+            ":READ:MODULE:SETVALUE": (self.setvalue_changes, ""),
+        }
+        if header not in queries:
+            return None
+        return _format_value(*queries[header])
+
+    def set(self, header: str, argument: str) -> bool:
+        """Process a module setting.
+
+        Returns:
+            bool: True if the header is a valid module setting (even if the value is rejected), False otherwise.
+
+        Raises:
+            ValueError: If the value is rejected by the device.
+        """
+
+        def check_allowed(value, allowed: list):
+            if value not in allowed:
+                raise ValueError(f"Value {value} not in {allowed}")
+            return value
+
+        def check_configuration_mode(value):
+            if not self.configuration_mode:
+                raise ValueError("The module is not in configuration mode")
+            return value
+
+        settings: Dict[str, Callable[[str], Dict]] = {
+            ":CONF:AVER": lambda a: {
+                "filter_averaging_steps": check_allowed(
+                    _parse_integer(a), [1, 16, 64, 256, 512, 1024]
+                )
+            },
+            ":CONF:KILL": lambda a: {
+                "kill_enable": check_allowed(_parse_integer(a), [0, 1])
+            },
+            ":CONF:ADJUST": lambda a: {
+                "adjustment": check_allowed(_parse_integer(a), [0, 1])
+            },
+            ":CONF:CAN:ADDR": lambda a: {
+                "can_address": check_configuration_mode(
+                    check_allowed(_parse_integer(a), [*range(64)])
+                )
+            },
+            ":CONF:CAN:BITRATE": lambda a: {
+                "can_bitrate": check_configuration_mode(
+                    check_allowed(_parse_integer(a), [125000, 250000])
+                )
+            },
+            ":CONF:SERIAL:BAUD": lambda a: {
+                "serial_baud_rate": check_allowed(_parse_integer(a), [9600, 115200])
+            },
+            ":CONF:SERIAL:ECHO": lambda a: {
+                "serial_echo": check_allowed(_parse_integer(a), [0, 1])
+            },
+            ":CONF:EVENT:MASK": lambda a: {"event_mask": _parse_integer(a)},
+            ":CONF:EVENT:CHANMASK": lambda a: {"event_channel_mask": _parse_integer(a)},
+            "*INSTR": lambda a: {
+                "instruction_set": check_allowed(a.strip().upper(), ["EDCP"])
+            },
+            "*LLO": lambda a: {"local_lockout": True},
+            "*GTL": lambda a: {"local_lockout": False},
+        }
+
+        if header == ":SYSTEM:USER:CONFIG":
+            serial_number = _parse_integer(argument)
+            if serial_number == 0:
+                self.configuration_mode = False
+            elif str(serial_number) == self.serial_number:
+                self.configuration_mode = True
+            else:
+                raise ValueError(f"Invalid serial number {serial_number}")
+            return True
+        if header == ":CONF:EVENT":
+            if argument.strip().upper() == "CLEAR":
+                self.event_status = 0
+            else:
+                self.event_status &= ~_parse_integer(argument)
+            return True
+        if header == "*CLS":
+            self.event_status = 0
+            self.input_error = False
+            for channel in self.channels:
+                channel.event_status = 0
+            return True
+        if header == "*RST":
+            for channel in self.channels:
+                channel.on = False
+                channel.emergency_off = False
+            return True
+        if header not in settings:
+            return False
+        for attribute, value in settings[header](argument).items():
+            setattr(self, attribute, value)
+        return True
+
+
+class IsegEmulator(Emulator):
+    def __init__(self, module: IsegModuleState | None = None, **kwargs):
+        """Emulator of an iseg module (NHR, SHR, ...) speaking the EDCP (SCPI-like) serial protocol.
+
+        Every command line is echoed back before the response (unless echo is disabled with
+        `:CONF:SERIAL:ECHO 0`). A line may contain several commands separated by ";" (e.g. `:VOLT 100,(@0);*OPC?`),
+        the responses of the queries are joined with ";". Channels are addressed with lists such as `(@0)`,
+        `(@0-3)` or `(@0,2)`, a query for several channels returns the values separated by ",".
+        Numbers are returned in scientific notation followed by their unit (e.g. `1.23400E3V`).
+
+        As on the real device, a setting with a value out of range is ignored (and sets the input error flag of the
+        module status) while `*OPC?` still answers "1". Lines that cannot be parsed are answered with "?".
+
+        Args:
+            module (IsegModuleState | None, optional): The state of the module. Defaults to a 4 channel NHR 42 60r.
+            **kwargs: Latency, jitter, baud rate and seed, see `Emulator`. Since the command is echoed,
+                the transmission time of each command is counted twice.
+
+        Example:
+            with IsegEmulator(baudrate=9600) as emulator:
+                with Iseg(port=emulator.port, baudrate=9600, timeout=1.0) as iseg:
+                    print(iseg.module(0).channel(0).measured_voltage)
+        """
+        super().__init__(**kwargs)
+        self.module = module if module is not None else IsegModuleState()
+
+    def error_response(self, command: bytes) -> bytes:
+        echo = command if self.module.serial_echo else b""
+        return echo + b"?\r\n"
+
+    def handle(self, command: bytes) -> bytes:
+        echo = command if self.module.serial_echo else b""
+        try:
+            line = command.decode("ascii").strip()
+        except UnicodeDecodeError:
+            return echo + b"?\r\n"
+        if line == "":
+            return echo
+
+        responses = []
+        for part in line.split(";"):
+            try:
+                response = self._handle_part(part.strip())
+            except (ValueError, IndexError):
+                return echo + b"?\r\n"
+            if response is not None:
+                responses.append(response)
+
+        if not responses:
+            return echo
+        return echo + f"{';'.join(responses)}\r\n".encode("ascii")
+
+    def _handle_part(self, part: str) -> str | None:
+        """Process a single command. Returns the response of a query, None for a setting.
+
+        Raises:
+            ValueError: If the command is not valid.
+        """
+        match = _PART_REGEX.match(part)
+        if match is None:
+            raise ValueError(f"Invalid command '{part}'")
+        header = match.group("header").upper()
+        if not header.startswith(("*", ":")):
+            header = f":{header}"
+        argument = match.group("argument")
+        channels = match.group("channels")
+        module = self.module
+
+        if match.group("query"):
+            if header == "*OPC":
+                return "1"
+            if channels is None or header == ":READ:MODULE:SUPPLY":
+                response = module.get(header)
+                if response is None:
+                    raise ValueError(f"Invalid query '{part}'")
+                if isinstance(response, list):
+                    if channels is not None:
+                        response = [
+                            response[i]
+                            for i in _parse_channels(channels, len(response))
+                        ]
+                    response = ",".join(response)
+                return response
+            values = [
+                module.channels[channel].get(header)
+                for channel in _parse_channels(channels, module.number_of_channels)
+            ]
+            if None in values:
+                raise ValueError(f"Invalid query '{part}'")
+            return ",".join(values)
+
+        if channels is None:
+            targets = [module]
+        else:
+            targets = [
+                module.channels[channel]
+                for channel in _parse_channels(channels, module.number_of_channels)
+            ]
+        for target in targets:
+            try:
+                valid = target.set(header, argument)
+            except ValueError:
+                # the value is ignored but the command is acknowledged
+                module.input_error = True
+                return None
+            if not valid:
+                raise ValueError(f"Invalid command '{part}'")
+        module.setvalue_changes += 1
+        return None
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from typing import Dict
+
+import serial
+
+from .emulator import Emulator
+
+
+class InMemorySerial:
+    def __init__(
+        self,
+        emulator: Emulator,
+        baudrate: int = 115200,
+        timeout: float | None = None,
+        cache: bool = False,
+    ):
+        """A serial port object connected in memory to an emulator, without pseudo-terminal or thread.
+
+        It implements the subset of the `serial.Serial` interface used by this package, so it can replace the serial
+        port of an `Hvps` object. Each command line written is processed synchronously by the emulator
+        (including its latency model) and the response is available for reading immediately.
+
+        Args:
+            emulator (Emulator): The emulated device. It does not need to be started.
+            baudrate (int, optional): The baud rate reported by the port. Defaults to 115200.
+            timeout (float | None, optional): The timeout reported by the port. Defaults to None.
+            cache (bool, optional): Remember the response to each command line and replay it without calling the
+                emulator again. Only valid while the state of the device does not change (e.g. reading values or
+                setting the same value repeatedly), it removes the cost of the emulator from benchmarks.
+                Defaults to False.
+
+        Example:
+            caen = Caen()
+            caen._serial = InMemorySerial(CaenEmulator())
+            caen.connect()
+        """
+        self.emulator = emulator
+        self.port = "memory"
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.write_timeout = timeout
+        self.is_open = False
+        # number of command lines written
+        self.commands = 0
+        self._cache: Dict[bytes, bytes] | None = {} if cache else None
+        self._input = bytearray()
+        self._output = b""
+        self._unplugged = False
+        self._open_failures = 0
+
+    def unplug(self, open_failures: int = 0) -> None:
+        """Simulate a USB-serial adapter dropping out: reads and writes raise `serial.SerialException` until the port
+        is reopened.
+
+        Args:
+            open_failures (int, optional): The number of following attempts to open the port that fail, as while the
+                adapter is not back. Defaults to 0.
+        """
+        self._unplugged = True
+        self._open_failures = open_failures
+
+    def _check_plugged(self) -> None:
+        if self._unplugged:
+            raise serial.SerialException("device disconnected")
+
+    def open(self) -> None:
+        if self._open_failures > 0:
+            self._open_failures -= 1
+            raise serial.SerialException(f"could not open port {self.port}")
+        self._unplugged = False
+        self._input.clear()
+        self._output = b""
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def _process(self, line: bytes) -> bytes:
+        if self._cache is None:
+            return self.emulator.process(line)
+        response = self._cache.get(line)
+        if response is None:
+            response = self._cache[line] = self.emulator.process(line)
+        return response
+
+    def write(self, data: bytes) -> int:
+        self._check_plugged()
+        self._output += data
+        while b"\n" in self._output:
+            line, self._output = self._output.split(b"\n", 1)
+            self.commands += 1
+            self._input += self._process(line + b"\n")
+        return len(data)
+
+    def readline(self) -> bytes:
+        self._check_plugged()
+        end = self._input.find(b"\n") + 1
+        if end == 0:
+            end = len(self._input)
+        line = bytes(self._input[:end])
+        del self._input[:end]
+        return line
+
+    def read(self, size: int = 1) -> bytes:
+        self._check_plugged()
+        data = bytes(self._input[:size])
+        del self._input[:size]
+        return data
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._input)
+
+    def reset_input_buffer(self) -> None:
+        self._input.clear()
+
+    def reset_output_buffer(self) -> None:
+        self._output = b""
+
+    def flush(self) -> None:
+        pass
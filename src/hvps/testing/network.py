@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import select
+import socket
+import threading
+import time
+
+from .emulator import Emulator
+
+
+class TcpServer:
+    def __init__(
+        self,
+        emulator: Emulator,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        delay: float = 0.0,
+    ):
+        """Serve an emulated device over raw TCP, as a terminal server does for a serial port.
+
+        Connect to it with the pyserial URL `url` (e.g. `Caen(url=server.url)`). One client is served at a time,
+        later connections wait until the previous one is closed.
+
+        Args:
+            emulator (Emulator): The emulated device. It does not need to be started.
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The TCP port, 0 to pick a free one. Defaults to 0.
+            delay (float, optional): The one-way network delay added to the data received and to the responses, in
+                seconds (half of the round-trip time). Defaults to 0.0.
+        """
+        self.emulator = emulator
+        self.host = host
+        self.port = port
+        self.delay = delay
+        # number of TCP segments (reads of the socket) received
+        self.segments = 0
+        self._socket: socket.socket | None = None
+        self._wakeup: tuple | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """The pyserial URL of the server (e.g. socket://127.0.0.1:40123).
+
+        Returns:
+            str: The URL.
+        """
+        if self._socket is None:
+            raise RuntimeError("Server is not running")
+        return f"socket://{self.host}:{self.port}"
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> TcpServer:
+        """Start listening in a background thread.
+
+        Returns:
+            TcpServer: self
+        """
+        if self.running:
+            return self
+        self._socket = socket.create_server((self.host, self.port))
+        self.port = self._socket.getsockname()[1]
+        self._wakeup = socket.socketpair()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the connections."""
+        if self._thread is None:
+            return
+        self._wakeup[0].send(b"\0")
+        self._thread.join()
+        self._thread = None
+        for sock in [self._socket, *self._wakeup]:
+            sock.close()
+        self._socket = self._wakeup = None
+
+    def __enter__(self) -> TcpServer:
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _serve(self):
+        while True:
+            readable, _, _ = select.select([self._socket, self._wakeup[1]], [], [])
+            if self._wakeup[1] in readable:
+                return
+            connection, _ = self._socket.accept()
+            with connection:
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if not self._serve_connection(connection):
+                    return
+
+    def _serve_connection(self, connection: socket.socket) -> bool:
+        # False if the server is stopping
+        buffer = b""
+        while True:
+            readable, _, _ = select.select([connection, self._wakeup[1]], [], [])
+            if self._wakeup[1] in readable:
+                return False
+            try:
+                data = connection.recv(4096)
+            except OSError:
+                return True
+            if not data:
+                return True
+            self.segments += 1
+            if self.delay > 0:
+                time.sleep(self.delay)
+            buffer += data
+            responses = b""
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                responses += self.emulator.process(line + b"\n")
+            if responses:
+                if self.delay > 0:
+                    time.sleep(self.delay)
+                try:
+                    connection.sendall(responses)
+                except OSError:
+                    return True
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, Iterator
+
+from .instrumentation import Histogram
+
+# no timeout applied to the port yet
+_UNSET = object()
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "hvps_deadline", default=None
+)
+
+
+class CommandTimeoutError(ValueError):
+    """
+    Raised when the response to a command does not arrive in time.
+
+    It is a ValueError, as the empty or incomplete responses it replaces. It is not a `TimeoutError`, which is an
+    `OSError`: handlers of port errors must not catch it by accident.
+
+    Attributes:
+        command (bytes): The command.
+        elapsed (float): The time waited since the command was written, in seconds.
+        timeout (float | None): The read timeout that expired, in seconds.
+    """
+
+    def __init__(self, command: bytes, elapsed: float, timeout: float | None):
+        super().__init__(
+            f"No response to {command!r} after {elapsed:.3f} s (timeout {timeout} s)"
+        )
+        self.command = command
+        self.elapsed = elapsed
+        self.timeout = timeout
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Fail the commands sent in this context (thread or task) that are not answered within `seconds` from now, with
+    a `CommandTimeoutError`. Commands are not sent once the deadline has passed. A nested deadline cannot extend
+    the enclosing one.
+
+    Example:
+        with hvps.timeouts.deadline(0.5):
+            vmon = channel.vmon
+
+    Args:
+        seconds (float): The time available, in seconds.
+    """
+    if seconds < 0:
+        raise ValueError(f"Deadline must not be negative, got {seconds}")
+    at = time.monotonic() + seconds
+    enclosing = _deadline.get()
+    token = _deadline.set(at if enclosing is None else min(at, enclosing))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class AdaptiveTimeouts:
+    def __init__(
+        self,
+        quantile: float = 0.99,
+        factor: float = 3.0,
+        minimum: float = 0.05,
+        initial: float = 5.0,
+        min_samples: int = 20,
+    ):
+        """
+        Read timeouts learned from the latency of each command class (the mnemonic, e.g. "MON:VMON" or ":VOLT").
+
+        Once `min_samples` responses of a class have been received, its commands wait for `factor` times the
+        `quantile` of their latency (at least `minimum`, estimated again every `min_samples` responses), but never
+        longer than the timeout of the port or the deadline of the context (see `deadline`). Before that, they wait
+        for the timeout of the port, or `initial` if it has none and there is no deadline, so a missing device no
+        longer blocks forever. A missing board then costs a few times the usual latency instead of the full timeout,
+        while slow classes (e.g. iseg sets followed by `*OPC?`) keep a longer timeout of their own.
+
+        When a response does not arrive in time, the input of the port is discarded until the line has been quiet
+        for the same timeout, so a late response is not taken as the response to the next command.
+
+        Args:
+            quantile (float, optional): The quantile of the latency. Defaults to 0.99.
+            factor (float, optional): The safety factor applied to the quantile. Defaults to 3.0.
+            minimum (float, optional): The shortest timeout, in seconds. Defaults to 0.05.
+            initial (float, optional): The timeout while there are not enough samples and the port has no timeout,
+                in seconds. Defaults to 5.0.
+            min_samples (int, optional): The number of samples needed to learn the timeout of a class.
+                Defaults to 20.
+        """
+        if not 0 < quantile <= 1:
+            raise ValueError(f"Quantile must be in (0, 1], got {quantile}")
+        if factor < 1:
+            raise ValueError(f"Factor must be at least 1, got {factor}")
+        if min_samples < 1:
+            raise ValueError(
+                f"Minimum number of samples must be positive, got {min_samples}"
+            )
+        self.enabled = True
+        self.quantile = quantile
+        self.factor = factor
+        self.minimum = minimum
+        self.initial = initial
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Histogram] = {}
+        # the learned timeout of the classes with enough samples
+        self._learned: Dict[str, float] = {}
+        self.timeouts = 0
+        # the timeout of the port set by the user, and the last timeout applied to the port for a command
+        self._port_timeout: float | None = None
+        self._applied = _UNSET
+
+    def port_timeout(self, ser) -> float | None:
+        """
+        The timeout of the port set by the user. `ser.timeout` holds the timeout of the last command, which is not
+        restored after each command: changing the timeout of a port is a system call.
+
+        Args:
+            ser (serial.Serial): The port.
+
+        Returns:
+            float | None: The timeout, in seconds.
+        """
+        current = ser.timeout
+        if current is not self._applied and current != self._applied:
+            # set since the last command
+            self._port_timeout = current
+            self._applied = _UNSET
+        return self._port_timeout
+
+    def set_port_timeout(self, ser, timeout: float | None) -> None:
+        """
+        Set the timeout of the port.
+
+        Args:
+            ser (serial.Serial): The port.
+            timeout (float | None): The timeout, in seconds.
+        """
+        ser.timeout = timeout
+        self._port_timeout = timeout
+        self._applied = _UNSET
+
+    def _apply(self, ser, timeout: float | None) -> None:
+        # only change the timeout of the port when needed
+        if timeout != ser.timeout:
+            ser.timeout = timeout
+        self._applied = timeout
+
+    def timeout(self, mnemonic: str, port_timeout: float | None) -> float | None:
+        """
+        The read timeout of a command.
+
+        Args:
+            mnemonic (str): The command class.
+            port_timeout (float | None): The timeout of the port, in seconds.
+
+        Returns:
+            float | None: The timeout in seconds (0 if the deadline of the context has passed, see `deadline`), None
+            to wait forever (only if disabled, without port timeout).
+        """
+        timeout = port_timeout
+        if self.enabled:
+            learned = self._learned.get(mnemonic)
+            if learned is not None:
+                timeout = learned if timeout is None else min(learned, timeout)
+        at = _deadline.get()
+        if at is not None:
+            remaining = max(at - time.monotonic(), 0.0)
+            return remaining if timeout is None else min(remaining, timeout)
+        if timeout is None and self.enabled:
+            return self.initial
+        return timeout
+
+    def record(self, mnemonic: str, latency: float) -> None:
+        """
+        Record the latency of a command that was answered.
+
+        Args:
+            mnemonic (str): The command class.
+            latency (float): The time from writing the command to receiving the response, in seconds.
+        """
+        with self._lock:
+            histogram = self._latencies.get(mnemonic)
+            if histogram is None:
+                histogram = self._latencies[mnemonic] = Histogram()
+            histogram.add(latency)
+            # the quantile is estimated again every `min_samples` samples, not for each command
+            if histogram.count % self.min_samples == 0:
+                self._learned[mnemonic] = self._learn(histogram)
+
+    def _learn(self, histogram: Histogram) -> float:
+        return max(histogram.quantile(self.quantile) * self.factor, self.minimum)
+
+    def expired(
+        self, command: bytes, elapsed: float, timeout: float | None
+    ) -> CommandTimeoutError:
+        """Count a timeout and return the exception to raise."""
+        with self._lock:
+            self.timeouts += 1
+        return CommandTimeoutError(command, elapsed, timeout)
+
+    def reset(self) -> None:
+        """Forget the latencies learned."""
+        with self._lock:
+            self._latencies = {}
+            self._learned = {}
+
+    def snapshot(self) -> Dict:
+        """
+        The learned timeouts.
+
+        Returns:
+            Dict: With keys "enabled", "timeouts" (commands that expired) and "classes": for each command class, the
+            number of samples, the quantile of the latency and the learned timeout (None until `min_samples`), in
+            seconds.
+        """
+        with self._lock:
+            latencies = dict(self._latencies)
+        classes = {}
+        for mnemonic, histogram in sorted(latencies.items()):
+            quantile = histogram.quantile(self.quantile)
+            classes[mnemonic] = {
+                "count": histogram.count,
+                "quantile": quantile,
+                "timeout": self._learned.get(mnemonic),
+            }
+        return {"enabled": self.enabled, "timeouts": self.timeouts, "classes": classes}
+
+
+class _ReadTimeout:
+    # a class rather than a generator based context manager, it is on the path of every command
+    __slots__ = (
+        "_ser",
+        "_timeouts",
+        "_command",
+        "_mnemonic",
+        "timeout",
+        "_start",
+    )
+
+    def __init__(
+        self,
+        ser,
+        timeouts: AdaptiveTimeouts | None,
+        command: bytes,
+        mnemonic: Callable[[bytes], str],
+    ):
+        self._ser = ser
+        self._timeouts = timeouts
+        self._command = command
+        self._mnemonic = mnemonic(command) if timeouts is not None else ""
+
+    def __enter__(self) -> _ReadTimeout:
+        timeouts = self._timeouts
+        if timeouts is None:
+            self.timeout = self._ser.timeout
+        else:
+            self.timeout = timeouts.timeout(
+                self._mnemonic, timeouts.port_timeout(self._ser)
+            )
+            if self.timeout is not None and self.timeout <= 0:
+                raise timeouts.expired(self._command, 0.0, self.timeout)
+            # kept for the next commands, usually of the same class
+            timeouts._apply(self._ser, self.timeout)
+        self._start = time.perf_counter()
+        return self
+
+    def check(self, line: bytes) -> bytes:
+        """
+        Raise a `CommandTimeoutError` if `line` is incomplete (the read timed out), once the late input is
+        discarded.
+        """
+        if line.endswith(b"\n"):
+            return line
+        elapsed = time.perf_counter() - self._start
+        # the timeout of the command is still applied to the port
+        _discard_input(self._ser)
+        if self._timeouts is None:
+            raise CommandTimeoutError(self._command, elapsed, self.timeout)
+        raise self._timeouts.expired(self._command, elapsed, self.timeout)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self._timeouts is not None:
+            self._timeouts.record(self._mnemonic, time.perf_counter() - self._start)
+        return False
+
+
+def _discard_input(ser) -> None:
+    """
+    Discard the input of `ser` until no data arrives during its timeout, e.g. the late response to a command that
+    timed out, which would otherwise be read as the response to the next command (and so on for every later one).
+    """
+    ser.reset_input_buffer()
+    if ser.timeout is None:
+        # would block until data arrives
+        return
+    while ser.read(max(ser.in_waiting, 1)):
+        pass
+
+
+def _read_timeout(
+    ser,
+    timeouts: AdaptiveTimeouts | None,
+    command: bytes,
+    mnemonic: Callable[[bytes], str],
+) -> _ReadTimeout:
+    """Apply the timeout of `command` to `ser` and record its latency (context manager)."""
+    return _ReadTimeout(ser, timeouts, command, mnemonic)
@@ -1,5 +1,4 @@
 from __future__ import annotations
-from serial.tools import list_ports
 from typing import List, Dict
 import re
 
@@ -30,6 +29,8 @@ def get_serial_ports() -> List[str]:
     Returns:
         list: A list of available serial ports.
     """
+    from serial.tools import list_ports
+
     return [port.device for port in list_ports.comports()]
 
 
@@ -145,7 +146,8 @@ def check_command_output_and_convert(
                     f"Invalid string '{response}'. Must be a {output_type}."
                 )
         elif output_type is List[float]:
-            response = response.split(",")
+            if isinstance(response, str):
+                response = response.split(",")
             try:
                 value = [float(remove_units(v)) for v in response]
             except ValueError:
@@ -154,7 +156,8 @@ def check_command_output_and_convert(
                 )
         elif output_type is List[int]:
             try:
-                response = response.split(",")
+                if isinstance(response, str):
+                    response = response.split(",")
                 value = [int(v) for v in response]
             except ValueError:
                 raise ValueError(f"Invalid string '{response}'. Must be a list of int.")
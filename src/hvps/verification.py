@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import threading
+from typing import Callable, Dict, Hashable, Iterator, List, Tuple
+
+# how setters check that a value was applied, by reading it back
+POLICIES = ["none", "deferred", "immediate"]
+
+_policy: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "hvps_verification", default=None
+)
+_batch: contextvars.ContextVar[_Batch | None] = contextvars.ContextVar(
+    "hvps_verification_batch", default=None
+)
+
+
+def _check_policy(policy: str) -> str:
+    if policy not in POLICIES:
+        raise ValueError(
+            f"Invalid verification policy {policy!r}, must be one of {POLICIES}"
+        )
+    return policy
+
+
+# a read-back: read the value, compare it to the value written, message of the error if it differs
+_Check = Tuple[Callable[[], object], Callable[[object], bool], str]
+
+
+class _Batch:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checks: Dict[Hashable, _Check] = {}
+
+    def __len__(self) -> int:
+        return len(self._checks)
+
+    def add(self, key: Hashable, check: _Check) -> None:
+        with self._lock:
+            # only the last value written to a setting is read back
+            self._checks.pop(key, None)
+            self._checks[key] = check
+
+    def verify(self) -> int:
+        with self._lock:
+            checks, self._checks = list(self._checks.values()), {}
+        errors: List[str] = []
+        for read, equal, message in checks:
+            try:
+                if not equal(read()):
+                    errors.append(message)
+            except Exception as e:
+                errors.append(f"{message} ({e!r})")
+        if errors:
+            raise ValueError("; ".join(errors))
+        return len(checks)
+
+
+@contextlib.contextmanager
+def verification(policy: str) -> Iterator[None]:
+    """
+    Verify the values written by the setters in this context (thread or task) with `policy`, instead of the policy
+    of the device (see `Verifier`).
+
+    With "deferred", the values are read back once, when the context exits without an exception, and a ValueError
+    lists all the values that were not applied. Nested "deferred" contexts join the outermost one.
+
+    Example:
+        with hvps.verification.verification("deferred"):
+            for channel in module.channels:
+                channel.vset = 1000.0
+                channel.iset = 50.0
+
+    Args:
+        policy (str): The verification policy, one of `POLICIES`.
+    """
+    _check_policy(policy)
+    token = _policy.set(policy)
+    batch_token = None
+    if policy == "deferred" and _batch.get() is None:
+        batch_token = _batch.set(_Batch())
+    try:
+        yield
+        if batch_token is not None:
+            _batch.get().verify()
+    finally:
+        if batch_token is not None:
+            _batch.reset(batch_token)
+        _policy.reset(token)
+
+
+class Verifier:
+    def __init__(self, policy: str = "immediate"):
+        """
+        Decides how the setters of a device check that a value was applied, by reading it back.
+
+        - "immediate": each setter reads the value back and raises a ValueError if it differs (the default).
+        - "deferred": the read-backs are queued and done by `verify`, once per setting (the last value written).
+        - "none": the values are not read back, halving the number of commands of the setters.
+
+        The policy can be replaced for a block of code with `verification`. Numbers are compared with the
+        precision of the device (e.g. `vdec` decimals for VSET on CAEN boards).
+
+        Args:
+            policy (str, optional): The verification policy, one of `POLICIES`. Defaults to "immediate".
+        """
+        self.policy = policy
+        self._batch = _Batch()
+
+    @property
+    def policy(self) -> str:
+        """The verification policy of the device, one of `POLICIES`."""
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy: str) -> None:
+        self._policy = _check_policy(policy)
+
+    @property
+    def pending(self) -> int:
+        """The number of read-backs waiting for `verify` (policy "deferred" set on the device)."""
+        return len(self._batch)
+
+    def check(
+        self,
+        key: Hashable,
+        read: Callable[[], object],
+        equal: Callable[[object], bool],
+        message: str,
+    ) -> None:
+        """
+        Verify a value written by a setter, according to the policy.
+
+        Args:
+            key (Hashable): Identifies the setting (e.g. the channel and the setter name).
+            read (Callable[[], object]): Reads the value back.
+            equal (Callable[[object], bool]): Whether the value read back is the value written.
+            message (str): The message of the error if it is not.
+
+        Raises:
+            ValueError: If the policy is "immediate" and the value was not applied.
+        """
+        policy = _policy.get() or self._policy
+        if policy == "none":
+            return
+        if policy == "deferred":
+            batch = _batch.get()
+            (batch if batch is not None else self._batch).add(
+                key, (read, equal, message)
+            )
+            return
+        if not equal(read()):
+            raise ValueError(message)
+
+    def verify(self) -> int:
+        """
+        Read back the values written since the last call while the policy of the device was "deferred".
+
+        Returns:
+            int: The number of values read back.
+
+        Raises:
+            ValueError: If some values were not applied (all of them are listed).
+        """
+        return self._batch.verify()
+
+
+def equal_with_decimals(
+    expected: object, decimals: Callable[[], int]
+) -> Callable[[object], bool]:
+    """
+    Compare a value read back to `expected`, rounded to the number of decimals of the device.
+
+    Args:
+        expected (object): The value written.
+        decimals (Callable[[], int]): Reads the number of decimals, only called if the values differ.
+
+    Returns:
+        Callable[[object], bool]: The comparison.
+    """
+
+    def equal(value: object) -> bool:
+        if value == expected:
+            return True
+        if not isinstance(value, (int, float)) or not isinstance(
+            expected, (int, float)
+        ):
+            return False
+        digits = decimals()
+        return round(value, digits) == round(expected, digits)
+
+    return equal
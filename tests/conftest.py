@@ -0,0 +1,39 @@
+import pytest
+
+from hvps import Caen
+from hvps.polling import Poller
+from hvps.testing import CaenEmulator, InMemorySerial
+
+
+@pytest.fixture
+def poller():
+    """A poller named "crate" of an emulated CAEN crate with a single board (0) of 4 channels"""
+    caen = Caen()
+    caen._serial = InMemorySerial(CaenEmulator(boards=[0]), timeout=0.1)
+    caen.connect()
+    poller = Poller(caen, interval=0.001, boards=[0], name="crate")
+    yield poller
+    poller.stop()
+
+
+@pytest.fixture
+def run_passes(poller):
+    """Run the polling thread of `poller` for a number of passes: its sinks get the samples as in production"""
+
+    def run(passes: int) -> None:
+        done = []
+
+        def count(samples):
+            # called after the sinks added before
+            done.append(samples)
+            if len(done) == passes:
+                poller._stop.set()
+
+        poller.add_sink(count)
+        poller.start()
+        poller._thread.join(timeout=10.0)
+        poller.stop()
+        poller._sinks.remove(count)
+        assert len(done) == passes
+
+    return run
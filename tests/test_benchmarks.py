@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+benchmarks = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "run.py")
+
+
+def test_benchmarks_run(tmp_path):
+    output = tmp_path / "results.json"
+    result = subprocess.run(
+        [sys.executable, benchmarks, "--iterations", "5", "--output", str(output)],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+    with open(output) as f:
+        results = json.load(f)
+    assert results["metadata"]["transport"] == "memory"
+    for case in ["caen.read_property", "iseg.module_scan", "iseg.parse_response"]:
+        assert results["results"][case]["ops_per_second"] > 0
+    assert results["results"]["caen.set_with_read_back"]["commands_per_call"] == 2.0
+    assert results["results"]["iseg.module_scan"]["commands_per_call"] == 20.0
+
+    # a run compared with itself has no regressions
+    result = subprocess.run(
+        [
+            sys.executable,
+            benchmarks,
+            "--iterations",
+            "5",
+            "--filter",
+            "parse",
+            "--compare",
+            str(output),
+            "--tolerance",
+            "100",
+            "--tail-tolerance",
+            "100",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout
+    assert "No regressions" in result.stdout
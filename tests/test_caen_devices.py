@@ -32,3 +32,61 @@ def test_caen_channel(caplog):
     assert "Creating channel 0" in caplog.text
 
     print(f"channel: {channel.channel}")
+
+
+class FakeDaisyChain:
+    """Serial object answering monitor commands of CAEN boards 1 and 4 of a daisy chain"""
+
+    def __init__(self):
+        self.is_open = True
+        self.baudrate = 115200
+        self.timeout = None
+        self.writes = 0
+        self._buffer = []
+
+    def write(self, data: bytes):
+        self.writes += 1
+        for command in data.splitlines():
+            bd = command[4:6]
+            if bd not in [b"01", b"04"]:
+                continue
+            values = {b"BDNAME": b"N1470", b"BDNCH": b"4", b"BDSNUM": b"1" + bd}
+            value = values[command.split(b"PAR:")[1]]
+            self._buffer.append(b"#BD:" + bd + b",CMD:OK,VAL:" + value + b"\r\n")
+
+    def readline(self):
+        return self._buffer.pop(0) if self._buffer else b""
+
+    def reset_input_buffer(self):
+        self._buffer = []
+
+    @property
+    def in_waiting(self):
+        return sum(len(line) for line in self._buffer)
+
+    def read(self, size: int = 1):
+        data = b"".join(self._buffer)
+        self._buffer = [data[size:]] if data[size:] else []
+        return data[:size]
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.mark.parametrize("pipeline", [True, False])
+def test_caen_scan_boards(pipeline):
+    caen = Caen()
+    caen._serial = FakeDaisyChain()
+
+    boards = caen.scan_boards(pipeline=pipeline)
+
+    assert boards == {
+        1: {"name": "N1470", "number_of_channels": 4, "serial_number": "101"},
+        4: {"name": "N1470", "number_of_channels": 4, "serial_number": "104"},
+    }
+    assert sorted(caen.modules.keys()) == [1, 4]
+    # the serial timeout is restored
+    assert caen._serial.timeout is None
+    if pipeline:
+        # one burst for the board names, one for the number of channels and one for the serial numbers
+        assert caen._serial.writes == 3
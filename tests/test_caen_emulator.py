@@ -0,0 +1,122 @@
+import os
+import time
+
+import pytest
+
+from hvps import Caen
+from hvps.testing import CaenEmulator
+from hvps.timeouts import CommandTimeoutError
+
+pytestmark = pytest.mark.skipif(
+    os.name != "posix", reason="The emulator requires pseudo-terminals"
+)
+
+
+def test_caen_emulator_protocol():
+    emulator = CaenEmulator(boards=[0, 5])
+
+    assert emulator.handle(b"$BD:00,CMD:MON,PAR:BDNAME\r\n") == (
+        b"#BD:00,CMD:OK,VAL:N1471H\r\n"
+    )
+    assert emulator.handle(b"$BD:05,CMD:MON,CH:1,PAR:VSET\r\n") == (
+        b"#BD:05,CMD:OK,VAL:0000.0\r\n"
+    )
+    assert emulator.handle(b"$BD:05,CMD:SET,CH:1,PAR:VSET,VAL:123.4\r\n") == (
+        b"#BD:05,CMD:OK\r\n"
+    )
+    assert emulator.boards[5].channels[1].parameters["VSET"] == 123.4
+
+    # broadcast channel
+    assert emulator.handle(b"$BD:00,CMD:SET,CH:4,PAR:ON\r\n") == b"#BD:00,CMD:OK\r\n"
+    assert all(channel.on for channel in emulator.boards[0].channels)
+    assert emulator.handle(b"$BD:00,CMD:MON,CH:4,PAR:STAT\r\n") == (
+        b"#BD:00,CMD:OK,VAL:00001;00001;00001;00001\r\n"
+    )
+
+    # missing boards do not answer
+    assert emulator.handle(b"$BD:01,CMD:MON,PAR:BDNAME\r\n") == b""
+
+    # errors
+    assert emulator.handle(b"$BD:00,CMD:MON,CH:7,PAR:VSET\r\n") == b"#BD:00,CH:ERR\r\n"
+    assert emulator.handle(b"$BD:00,CMD:MON,CH:0,PAR:XXX\r\n") == (
+        b"#BD:00,PAR:ERR\r\n"
+    )
+    assert emulator.handle(b"$BD:00,CMD:SET,CH:0,PAR:VSET,VAL:9000\r\n") == (
+        b"#BD:00,VAL:ERR\r\n"
+    )
+    emulator.boards[0].control_mode = "LOCAL"
+    assert emulator.handle(b"$BD:00,CMD:SET,CH:0,PAR:OFF\r\n") == b"#BD:00,LOC:ERR\r\n"
+
+
+def test_caen_emulator_multiple_boards():
+    with CaenEmulator(boards=[0, 3]) as emulator:
+        with Caen(port=emulator.port, timeout=1.0) as caen:
+            assert caen.module(0).name == "N1471H"
+            assert caen.module(3).serial_number == "00004"
+            assert sorted(caen.scan_boards().keys()) == [0, 3]
+
+            channel = caen.module(3).channel(2)
+            channel.vset = 100
+            channel.turn_on()
+            assert channel.on
+            assert channel.vmon == 100.0
+            assert channel.imon == 10.0
+            assert emulator.boards[0].channels[2].on is False
+
+
+def test_caen_emulator_latency():
+    with CaenEmulator(latency=0.02, jitter=0.005, seed=1) as emulator:
+        with Caen(port=emulator.port, timeout=1.0) as caen:
+            module = caen.module(0)
+            t0 = time.perf_counter()
+            for _ in range(5):
+                _ = module.name
+            elapsed = time.perf_counter() - t0
+    assert elapsed >= 5 * 0.015
+    assert emulator.commands == 5
+
+
+def test_caen_emulator_faults():
+    with CaenEmulator() as emulator:
+        with Caen(port=emulator.port, timeout=0.2) as caen:
+            channel = caen.module(0).channel(0)
+
+            emulator.inject_fault("drop", match=b"VMON")
+            with pytest.raises(CommandTimeoutError):
+                _ = channel.vmon
+            assert channel.vmon == 0.0
+
+            emulator.inject_fault("error")
+            with pytest.raises(ValueError):
+                _ = channel.vset
+
+            emulator.inject_fault("garbage", count=2)
+            for _ in range(2):
+                with pytest.raises(ValueError):
+                    _ = channel.vset
+
+            emulator.inject_fault("delay", delay=0.5)
+            with pytest.raises(ValueError):
+                _ = channel.vset
+            time.sleep(0.5)
+            caen.serial.reset_input_buffer()
+            assert channel.vset == 0.0
+
+    with pytest.raises(ValueError):
+        emulator.inject_fault("unknown")
+
+
+def test_late_response_is_discarded():
+    with CaenEmulator() as emulator:
+        parameters = emulator.boards[0].channels[0].parameters
+        parameters["VSET"], parameters["ISET"] = 123.0, 5.0
+        with Caen(port=emulator.port, timeout=0.2) as caen:
+            channel = caen.module(0).channel(0)
+
+            # answered after the timeout, while the line is not yet quiet
+            emulator.inject_fault("delay", delay=0.3, match=b"PAR:VSET")
+            with pytest.raises(CommandTimeoutError):
+                _ = channel.vset
+            # not the late VSET response
+            assert channel.iset == 5.0
+            assert channel.vset == 123.0
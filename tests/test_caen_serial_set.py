@@ -1,14 +1,18 @@
+import os
 import sys
 import pytest
 
 from hvps import Caen
+from hvps.testing import CaenEmulator
 from hvps.utils import get_serial_ports
 
 import logging
 
 # find a way to only run these tests if a serial port connection exists
 
-caen_serial_port = ""  # change this to the serial port you are using
+caen_serial_port = (
+    ""  # set to the serial port of a real device, otherwise the emulator is used
+)
 caen_baudrate = 115200
 timeout = 5.0
 
@@ -23,15 +27,25 @@ def is_macos():
 
 
 serial_skip_decorator = pytest.mark.skipif(
-    caen_serial_port == "", reason="No serial ports set"
+    caen_serial_port == "" and os.name != "posix",
+    reason="No serial ports set and no emulator available",
 )
 
 
+@pytest.fixture
+def port():
+    if caen_serial_port != "":
+        yield caen_serial_port
+    else:
+        with CaenEmulator(boards=[0]) as emulator:
+            yield emulator.port
+
+
 @serial_skip_decorator
-def test_caen_module_monitor():
+def test_caen_module_monitor(port):
     # no ports available
     caen = Caen(
-        port=caen_serial_port,
+        port=port,
         baudrate=caen_baudrate,
         timeout=timeout,
         logging_level=logging.DEBUG,
@@ -57,9 +71,9 @@ def test_caen_module_monitor():
 
 
 @serial_skip_decorator
-def test_caen_channel_set():
+def test_caen_channel_set(port):
     caen = Caen(
-        port=caen_serial_port,
+        port=port,
         baudrate=caen_baudrate,
         timeout=timeout,
         logging_level=logging.DEBUG,
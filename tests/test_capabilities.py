@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from hvps import Caen, Iseg
+from hvps.capabilities import CapabilityCache, UnsupportedCommandError, default_path
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+
+
+def test_caen_capabilities(tmp_path):
+    path = tmp_path / "capabilities.json"
+    emulator = CaenEmulator(boards=[0])
+    for channel in emulator.boards[0].channels:
+        del channel.parameters["IMRANGE"]
+    caen = Caen()
+    caen._serial = InMemorySerial(emulator, timeout=0.1)
+    caen.connect()
+    channel = caen.module(0).channel(0)
+
+    assert caen.probe_capabilities(CapabilityCache(str(path))) == {
+        0: {"model": "caen/N1471H/01.00", "unsupported": ["IMRANGE"], "probed": True}
+    }
+    commands = emulator.commands
+    with pytest.raises(UnsupportedCommandError, match="IMRANGE is not supported"):
+        _ = channel.imrange
+    with pytest.raises(UnsupportedCommandError):
+        channel.imrange = "LOW"
+    assert emulator.commands == commands
+    assert channel.vmon == 0.0
+
+    # another session with the same model only identifies the board
+    caen = Caen()
+    caen._serial = InMemorySerial(emulator, timeout=0.1)
+    caen.connect()
+    caen.module(0)
+    commands = emulator.commands
+    result = caen.probe_capabilities(CapabilityCache(str(path)))
+    assert result[0]["probed"] is False
+    assert emulator.commands - commands == 2  # name and firmware release
+    with pytest.raises(UnsupportedCommandError):
+        _ = caen.module(0).channel(0).imrange
+
+    assert json.loads(path.read_text())["caen/N1471H/01.00"]["unsupported"] == [
+        "IMRANGE"
+    ]
+
+
+def test_iseg_capabilities(tmp_path):
+    emulator = IsegEmulator()
+    state = emulator.module.channels[0]
+    get = state.get
+    state.get = lambda header: None if header == ":CONF:OUTPUT:MODE" else get(header)
+    iseg = Iseg()
+    iseg._serial = InMemorySerial(emulator, timeout=0.1)
+    iseg.connect()
+    channel = iseg.module(0).channel(0)
+
+    cache = CapabilityCache(str(tmp_path / "capabilities.json"))
+    result = iseg.probe_capabilities(cache)
+    assert result[0]["unsupported"] == [":CONF:OUTPUT:MODE (@)"]
+    with pytest.raises(UnsupportedCommandError):
+        _ = channel.output_mode
+    assert channel.available_output_modes is not None
+
+    cache.remove(result[0]["model"])
+    assert cache.get(result[0]["model"]) is None
+
+
+def test_cache_file(tmp_path, monkeypatch):
+    path = tmp_path / "capabilities.json"
+    path.write_text("not json")
+    cache = CapabilityCache(str(path))
+    assert cache.get("caen/N1471H/01.00") is None
+    cache.set("caen/N1471H/01.00", ["PDWN", "IMRANGE"])
+    assert CapabilityCache(str(path)).get("caen/N1471H/01.00") == ["IMRANGE", "PDWN"]
+
+    monkeypatch.setenv("HVPS_CACHE_DIR", str(tmp_path))
+    assert default_path() == str(path)
@@ -3,9 +3,12 @@ import subprocess
 import sys
 import pytest
 
+from hvps.testing import CaenEmulator
 from hvps.utils import get_serial_ports
 
-caen_serial_port = ""
+caen_serial_port = (
+    ""  # set to the serial port of a real device, otherwise the emulator is used
+)
 caen_baudrate = 115200
 
 
@@ -19,10 +22,20 @@ def is_macos():
 
 
 serial_skip_decorator = pytest.mark.skipif(
-    caen_serial_port == "", reason="No serial ports set"
+    caen_serial_port == "" and os.name != "posix",
+    reason="No serial ports set and no emulator available",
 )
 
 
+@pytest.fixture
+def port():
+    if caen_serial_port != "":
+        yield caen_serial_port
+    else:
+        with CaenEmulator(boards=[0]) as emulator:
+            yield emulator.port
+
+
 def run_main_with_arguments(arguments: list) -> tuple:
     main_file_path = os.path.join(
         os.path.dirname(__file__),
@@ -52,12 +65,12 @@ def run_main_with_arguments(arguments: list) -> tuple:
 
 
 @serial_skip_decorator
-def test_cli_serial():
+def test_cli_serial(port):
     """Tests the cli-api interface when serial port is connected"""
     for arguments in [
         [
             "--port",
-            caen_serial_port,
+            port,
             "--baud",
             caen_baudrate,
             "--channel",
@@ -75,3 +88,5 @@ def test_cli_serial():
         print(f"stdout: {stdout}")
         print(f"stderr: {stderr}")
         print(f"exit_code: {exit_code}")
+
+        assert exit_code == 0
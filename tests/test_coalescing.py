@@ -0,0 +1,194 @@
+import threading
+import time
+
+import pytest
+
+from hvps import Caen, Iseg
+from hvps.coalescing import ReadCoalescer, WriteCoalescer
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.001)
+
+
+def test_single_flight():
+    coalescer = ReadCoalescer()
+    release = threading.Event()
+    calls = []
+
+    def read():
+        calls.append(1)
+        release.wait()
+        return len(calls)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(coalescer.read("key", read)))
+        for _ in range(6)
+    ]
+    threads[0].start()
+    wait_until(lambda: len(calls) == 1)
+    for thread in threads[1:]:
+        thread.start()
+    wait_until(lambda: coalescer.snapshot()["shared"] == 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [1] * 6
+    assert coalescer.snapshot() == {
+        "freshness": 0.0,
+        "reads": 1,
+        "shared": 5,
+        "reused": 0,
+    }
+    # nothing is kept once the read is done
+    assert coalescer.read("key", read) == 2
+
+
+def test_freshness_and_invalidate():
+    coalescer = ReadCoalescer(freshness=60)
+    values = iter(range(10))
+    assert coalescer.read("a", lambda: next(values)) == 0
+    assert coalescer.read("a", lambda: next(values)) == 0
+    assert coalescer.read("b", lambda: next(values)) == 1
+    coalescer.invalidate()
+    assert coalescer.read("a", lambda: next(values)) == 2
+    assert coalescer.snapshot()["reused"] == 1
+
+    coalescer.freshness = 0.01
+    time.sleep(0.02)
+    assert coalescer.read("a", lambda: next(values)) == 3
+
+    with pytest.raises(ValueError):
+        ReadCoalescer(freshness=-1)
+
+
+def test_errors_are_shared_and_not_cached():
+    coalescer = ReadCoalescer(freshness=60)
+
+    def fail():
+        raise ValueError("no response")
+
+    with pytest.raises(ValueError):
+        coalescer.read("a", fail)
+    assert coalescer.read("a", lambda: 1) == 1
+
+
+@pytest.mark.parametrize("brand", ["caen", "iseg"])
+def test_concurrent_device_reads(brand):
+    if brand == "caen":
+        emulator = CaenEmulator(boards=[0], latency=0.05)
+        device = Caen()
+    else:
+        emulator = IsegEmulator(latency=0.05)
+        device = Iseg()
+    device._serial = InMemorySerial(emulator, timeout=1.0)
+    device.connect()
+    channel = device.module(0).channel(0)
+
+    def read():
+        return channel.vmon if brand == "caen" else channel.measured_voltage
+
+    commands = emulator.commands
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(read())) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [0.0] * 8
+    assert emulator.commands - commands < 8
+    assert device.coalescer.snapshot()["shared"] == 8 - (emulator.commands - commands)
+
+    # writes are never coalesced
+    commands = emulator.commands
+    if brand == "caen":
+        channel.vset = 10.0
+        channel.vset = 10.0
+    else:
+        channel.voltage_set = 10.0
+        channel.voltage_set = 10.0
+    assert emulator.commands - commands == 4  # set and read back, twice
+
+
+def test_last_writer_wins():
+    coalescer = WriteCoalescer()
+    coalescer.enabled = True
+    release = threading.Event()
+    written = []
+
+    def write(key, value):
+        release.wait()
+        written.append((key, value))
+
+    coalescer.submit("a", lambda: write("a", 0))
+    wait_until(lambda: coalescer.snapshot()["pending"] == 0)  # in progress
+    for value in range(1, 10):
+        coalescer.submit("a", lambda value=value: write("a", value))
+    coalescer.submit("b", lambda: write("b", 0))
+    release.set()
+    coalescer.flush(timeout=5)
+
+    assert written == [("a", 0), ("a", 9), ("b", 0)]
+    assert coalescer.snapshot() == {
+        "enabled": True,
+        "pending": 0,
+        "submitted": 11,
+        "sent": 3,
+        "dropped": 8,
+        "errors": 0,
+    }
+
+
+def test_write_errors_raised_by_flush():
+    coalescer = WriteCoalescer()
+
+    def fail():
+        raise ValueError("Last command haven't been processed.")
+
+    coalescer.submit("a", fail)
+    with pytest.raises(ValueError):
+        coalescer.flush(timeout=5)
+    coalescer.flush(timeout=5)
+    assert coalescer.snapshot()["errors"] == 1
+
+
+@pytest.mark.parametrize("brand", ["caen", "iseg"])
+def test_coalesced_device_writes(brand):
+    if brand == "caen":
+        emulator = CaenEmulator(boards=[0], latency=0.01)
+        device = Caen()
+    else:
+        emulator = IsegEmulator(latency=0.01)
+        device = Iseg()
+    device._serial = InMemorySerial(emulator, timeout=1.0)
+    device.connect()
+    channel = device.module(0).channel(0)
+    device.write_coalescer.enabled = True
+
+    commands = emulator.commands
+    for value in range(1, 51):
+        if brand == "caen":
+            channel.vset = float(value)
+        else:
+            channel.voltage_set = float(value)
+    device.write_coalescer.flush(timeout=5)
+
+    snapshot = device.write_coalescer.snapshot()
+    assert snapshot["sent"] + snapshot["dropped"] == 50
+    assert snapshot["sent"] < 50
+    assert emulator.commands - commands == 2 * snapshot["sent"]
+    device.write_coalescer.enabled = False
+    if brand == "caen":
+        assert channel.vset == 50.0
+        assert emulator.boards[0].channels[0].parameters["VSET"] == 50.0
+    else:
+        assert channel.voltage_set == 50.0
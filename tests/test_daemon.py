@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from hvps import Caen, Iseg
+from hvps.daemon import Client, Daemon, from_config
+from hvps.polling import Poller
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+from hvps.timeouts import CommandTimeoutError
+
+
+def connect(device, emulator):
+    device._serial = InMemorySerial(emulator, timeout=0.1)
+    device.connect()
+    return device
+
+
+@pytest.fixture
+def daemon():
+    caen_emulator = CaenEmulator(boards=[0])
+    iseg_emulator = IsegEmulator()
+    pollers = [
+        Poller(connect(Caen(), caen_emulator), interval=3600, boards=[0], name="caen"),
+        Poller(connect(Iseg(), iseg_emulator), interval=3600, name="iseg"),
+    ]
+    with Daemon(pollers, address="127.0.0.1:0") as daemon:
+        yield daemon, caen_emulator
+
+
+def test_remote_objects(daemon):
+    daemon, emulator = daemon
+    with Client(daemon.address, timeout=5.0) as client:
+        assert client.devices() == {"caen": "caen", "iseg": "iseg"}
+
+        caen = client.device("caen")
+        channel = caen.module(0).channel(2)
+        channel.vset = 75.0
+        assert emulator.boards[0].channels[2].parameters["VSET"] == 75.0
+        assert channel.vset == 75.0
+        assert channel.stat["ON"] is False
+        channel.turn_on()
+        assert channel.stat["ON"] is True
+        assert len(caen.module(0).channels) == 4
+        assert "0" in caen.scan_boards()
+
+        iseg = client.device("iseg").module(0).channel(0)
+        iseg.voltage_set = 20.0
+        assert iseg.voltage_set == 20.0
+
+
+def test_snapshots_do_not_touch_serial(daemon):
+    daemon, emulator = daemon
+    with Client(daemon.address, timeout=5.0) as client:
+        # the first pass of the pollers happens when they start
+        samples = client.snapshot()
+        while not samples:
+            samples = client.snapshot()
+        commands = emulator.commands
+        assert len(client.device("caen").snapshot()) == 4
+        assert emulator.commands == commands
+
+
+def test_errors(daemon):
+    daemon, emulator = daemon
+    with Client(daemon.address, timeout=5.0) as client:
+        channel = client.device("caen").module(0).channel(0)
+        with pytest.raises(ValueError, match="CommandTimeoutError"):
+            emulator.inject_fault("drop")
+            channel.vmon
+        with pytest.raises(ValueError):
+            channel.unknown
+        with pytest.raises(ValueError):
+            # the daemon owns the port
+            client.device("caen").disconnect()
+        with pytest.raises(ValueError):
+            client.device("missing").port
+        with pytest.raises(ValueError):
+            channel.vmon = 1.0
+        for name, value in [
+            ("port", "/dev/ttyUSB1"),
+            ("baudrate", 9600),
+            ("timeout", 60),
+        ]:
+            with pytest.raises(ValueError, match="cannot be set remotely"):
+                setattr(client.device("caen"), name, value)
+        assert daemon.pollers["caen"].device.timeout == 0.1
+        # the connection is still usable
+        assert channel.vset == 0.0
+    assert issubclass(CommandTimeoutError, ValueError)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="Unix sockets")
+def test_unix_socket(tmp_path):
+    address = f"unix:{tmp_path / 'hvps.sock'}"
+    pollers = [Poller(connect(Caen(), CaenEmulator(boards=[0])), boards=[0])]
+    with Daemon(pollers, address=address) as daemon:
+        assert daemon.address == address
+        with Client(address, timeout=5.0) as client:
+            assert client.devices() == {"memory": "caen"}
+            assert client.device("memory").module(0).channel(0).vset == 0.0
+        # only for the user of the daemon
+        assert os.stat(tmp_path / "hvps.sock").st_mode & 0o777 == 0o600
+    assert not (tmp_path / "hvps.sock").exists()
+
+
+def test_config():
+    config = {
+        "daemon": {"address": "unix:/tmp/hvps-test.sock"},
+        "device": [{"brand": "caen", "url": "loop://", "name": "crate"}],
+    }
+    daemon = from_config(config)
+    assert daemon.address == "unix:/tmp/hvps-test.sock"
+    assert list(daemon.pollers) == ["crate"]
+    assert from_config(config, address="127.0.0.1:0").address == "127.0.0.1:0"
+
+    with pytest.raises(ValueError):
+        Daemon([], address="nowhere")
@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+
+import pytest
+
+from hvps.database import SqliteLogger
+
+
+def sample(time, vmon, on=True):
+    return {
+        "crate": "crate",
+        "board": 0,
+        "channel": 1,
+        "time": time,
+        "vmon": vmon,
+        "imon": 1e-6,
+        "vset": 100.0,
+        "status": int(on),
+        "status_bits": {"ON": on, "RUP": False},
+    }
+
+
+def test_batched_writes_and_queries(tmp_path):
+    path = str(tmp_path / "monitor.db")
+    with SqliteLogger(path) as database:
+        for i in range(120):
+            database.publish([sample(float(i), float(i), on=i < 100)])
+        database.flush()
+        assert database.written == 120
+
+        vmon = database.downsample("crate", 0, 1, "vmon", interval=60.0)
+        assert vmon == {
+            "time": [0.0, 60.0],
+            "min": [0.0, 60.0],
+            "max": [59.0, 119.0],
+            "mean": [29.5, 89.5],
+            "count": [60, 60],
+        }
+        assert database.downsample("crate", 0, 1, start=10.0, end=20.0, interval=5.0)[
+            "count"
+        ] == [5, 5]
+        assert database.downsample("crate", 0, 2)["time"] == []
+
+        # the first sample records all the bits, then only the changes
+        assert database.transitions("crate", 0, 1) == [
+            {"time": 0.0, "bit": "ON", "value": True},
+            {"time": 0.0, "bit": "RUP", "value": False},
+            {"time": 100.0, "bit": "ON", "value": False},
+        ]
+
+        with pytest.raises(ValueError):
+            database.downsample("crate", 0, 1, "status; DROP TABLE samples")
+        with pytest.raises(ValueError):
+            database.downsample("crate", 0, 1, interval=0)
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list(samples)")}
+    assert indexes == {"samples_channel_time"}
+    connection.close()
+
+
+def test_full_queue_drops_passes(tmp_path):
+    database = SqliteLogger(str(tmp_path / "monitor.db"), queue_size=2)
+    # not started: nothing is written
+    for i in range(5):
+        database.publish([sample(float(i), 1.0)])
+    assert database.dropped == 3
+    database.start()
+    database.stop()
+    assert database.written == 2
+    with pytest.raises(ValueError):
+        SqliteLogger(str(tmp_path / "other.db"), batch_size=0)
+
+
+def test_poller_sink(tmp_path, poller, run_passes):
+    with SqliteLogger(str(tmp_path / "monitor.db")) as database:
+        poller.add_sink(database.publish)
+        run_passes(3)
+        database.flush()
+        assert database.written == 12
+        assert database.downsample("crate", 0, 3, "vset")["count"] == [3]
+
+
+def test_concurrent_drops_are_counted(tmp_path):
+    database = SqliteLogger(str(tmp_path / "monitor.db"), queue_size=1)
+    database.publish([sample(0.0, 1.0)])
+    threads = [
+        threading.Thread(
+            target=lambda: [database.publish([sample(1.0, 1.0)]) for _ in range(1000)]
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert database.dropped == 4000
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import os
+import json
+
+import pytest
+import serial
+
+import hvps
+from hvps import discovery
+
+
+class FakePortInfo:
+    def __init__(self, device, vid=None, pid=None, serial_number=None):
+        self.device = device
+        self.vid = vid
+        self.pid = pid
+        self.serial_number = serial_number
+        self.location = None
+
+
+class FakeSerial:
+    """Minimal serial object answering like a CAEN (boards 0 and 3) or iseg device at a given baud rate"""
+
+    def __init__(self, brand: str | None, baudrate: int, device_baudrate: int):
+        self._brand = brand if baudrate == device_baudrate else None
+        self._buffer = []
+        self.is_open = True
+        self.baudrate = baudrate
+        self.timeout = 0.1
+
+    def reset_input_buffer(self):
+        self._buffer = []
+
+    @property
+    def in_waiting(self):
+        return sum(len(line) for line in self._buffer)
+
+    def read(self, size: int = 1):
+        data = b"".join(self._buffer)
+        self._buffer = [data[size:]] if data[size:] else []
+        return data[:size]
+
+    def write(self, data: bytes):
+        for line in data.splitlines(keepends=True):
+            self._answer(line)
+
+    def _answer(self, data: bytes):
+        if self._brand == "caen":
+            bd = data[4:6]
+            if bd not in [b"00", b"03"]:
+                return
+            values = {b"BDNAME": b"N1471H", b"BDSNUM": b"00123", b"BDNCH": b"4"}
+            parameter = data.split(b"PAR:")[1].strip()
+            self._buffer.append(
+                b"#BD:" + bd + b",CMD:OK,VAL:" + values[parameter] + b"\r\n"
+            )
+        elif self._brand == "iseg":
+            self._buffer.append(data)  # echo
+            if data == b"*IDN?\r\n":
+                self._buffer.append(
+                    b"iseg Spezialelektronik GmbH,NHR 42 60r,5200068,2.0.6\r\n"
+                )
+            else:
+                self._buffer.append(b"?\r\n")
+
+    def readline(self):
+        return self._buffer.pop(0) if self._buffer else b""
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_ports(monkeypatch, tmp_path):
+    devices = {
+        "/dev/ttyUSB0": ("caen", 9600),
+        "/dev/ttyUSB1": ("iseg", 115200),
+        "/dev/ttyUSB2": (None, 9600),
+    }
+    opened = []
+
+    def open_serial(port, baudrate, timeout):
+        if port not in devices:
+            raise serial.SerialException(f"could not open port {port}")
+        opened.append((port, baudrate))
+        brand, device_baudrate = devices[port]
+        return FakeSerial(brand, baudrate, device_baudrate)
+
+    port_infos = [
+        FakePortInfo("/dev/ttyUSB0", 0x0403, 0x6001, "CAEN0"),
+        FakePortInfo("/dev/ttyUSB1", 0x0403, 0x6001, "ISEG0"),
+        FakePortInfo("/dev/ttyUSB2"),
+    ]
+    monkeypatch.setattr(discovery, "_open_serial", open_serial)
+    monkeypatch.setattr(discovery.list_ports, "comports", lambda: port_infos)
+    monkeypatch.setenv("HVPS_CACHE_DIR", str(tmp_path))
+    return opened
+
+
+def test_discover(fake_ports):
+    devices = hvps.discover()
+    assert [device["port"] for device in devices] == ["/dev/ttyUSB0", "/dev/ttyUSB1"]
+
+    caen, iseg = devices
+    assert caen["brand"] == "caen"
+    assert caen["baudrate"] == 9600
+    assert caen["model"] == "N1471H"
+    assert caen["serial_number"] == "00123"
+    assert caen["boards"] == [0, 3]
+    assert caen["number_of_channels"] == 4
+
+    assert iseg["brand"] == "iseg"
+    assert iseg["baudrate"] == 115200
+    assert iseg["model"] == "NHR 42 60r"
+    assert iseg["serial_number"] == "5200068"
+    assert iseg["firmware"] == "2.0.6"
+
+    # results are cached by usb identity
+    with open(os.path.join(os.environ["HVPS_CACHE_DIR"], "discovery.json")) as f:
+        cache = json.load(f)
+    assert sorted(cache.keys()) == ["0403:6001:CAEN0", "0403:6001:ISEG0"]
+
+
+def test_discover_cache(fake_ports):
+    hvps.discover()
+    fake_ports.clear()
+
+    devices = hvps.discover()
+    assert len(devices) == 2
+    # cached ports are checked once at their cached baud rate, the port without usb identity is probed again
+    assert [opened for opened in fake_ports if opened[0] != "/dev/ttyUSB2"] in (
+        [("/dev/ttyUSB0", 9600), ("/dev/ttyUSB1", 115200)],
+        [("/dev/ttyUSB1", 115200), ("/dev/ttyUSB0", 9600)],
+    )
+
+    fake_ports.clear()
+    hvps.discover(use_cache=False)
+    assert {port for port, _ in fake_ports} == {
+        "/dev/ttyUSB0",
+        "/dev/ttyUSB1",
+        "/dev/ttyUSB2",
+    }
+
+
+def test_discover_cache_device_swapped(fake_ports, monkeypatch):
+    hvps.discover()
+    # another device behind the same usb adapter, at another baud rate
+    open_serial = discovery._open_serial
+
+    def swapped(port, baudrate, timeout):
+        ser = open_serial(port, baudrate, timeout)
+        if port == "/dev/ttyUSB0":
+            ser._brand = "caen" if baudrate == 115200 else None
+        return ser
+
+    monkeypatch.setattr(discovery, "_open_serial", swapped)
+    fake_ports.clear()
+    caen = hvps.discover(ports=["/dev/ttyUSB0"])[0]
+    assert caen["baudrate"] == 115200
+    # fully probed after the check at the cached baud rate failed
+    assert fake_ports[:2] == [("/dev/ttyUSB0", 9600), ("/dev/ttyUSB0", 9600)]
+
+    # the device is gone: the entry is removed from the cache
+    monkeypatch.setattr(
+        discovery,
+        "_open_serial",
+        lambda port, baudrate, timeout: FakeSerial(None, baudrate, baudrate),
+    )
+    assert hvps.discover(ports=["/dev/ttyUSB0"]) == []
+    with open(os.path.join(os.environ["HVPS_CACHE_DIR"], "discovery.json")) as f:
+        assert "0403:6001:CAEN0" not in json.load(f)
+
+
+def test_discover_cache_port_busy(fake_ports, monkeypatch):
+    hvps.discover()
+    open_serial = discovery._open_serial
+
+    def busy(port, baudrate, timeout):
+        raise serial.SerialException(
+            16, f"could not open port {port}: [Errno 16] Device or resource busy"
+        )
+
+    # opened by another process: not found, but kept in the cache
+    monkeypatch.setattr(discovery, "_open_serial", busy)
+    assert hvps.discover(ports=["/dev/ttyUSB0"]) == []
+    with open(os.path.join(os.environ["HVPS_CACHE_DIR"], "discovery.json")) as f:
+        assert "0403:6001:CAEN0" in json.load(f)
+
+    # released: checked once at the cached baud rate
+    monkeypatch.setattr(discovery, "_open_serial", open_serial)
+    fake_ports.clear()
+    assert hvps.discover(ports=["/dev/ttyUSB0"])[0]["brand"] == "caen"
+    assert fake_ports == [("/dev/ttyUSB0", 9600)]
+
+
+def test_discover_brand(fake_ports):
+    devices = hvps.discover(brands=["iseg"], use_cache=False)
+    assert [device["port"] for device in devices] == ["/dev/ttyUSB1"]
+
+    with pytest.raises(ValueError):
+        hvps.discover(brands=["unknown"])
+
+
+def test_connect_discovery(fake_ports, monkeypatch):
+    caen = hvps.Caen(baudrate=None)
+    # do not open the fake port
+    monkeypatch.setattr(caen._serial, "open", lambda: None)
+    caen.connect()
+    assert caen.port == "/dev/ttyUSB0"
+    assert caen.baudrate == 9600
+
+    iseg = hvps.Iseg(port="/dev/ttyUSB1", baudrate=None)
+    monkeypatch.setattr(iseg._serial, "open", lambda: None)
+    iseg.connect()
+    assert iseg.port == "/dev/ttyUSB1"
+    assert iseg.baudrate == 115200
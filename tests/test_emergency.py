@@ -0,0 +1,86 @@
+import pytest
+
+import hvps
+from hvps import Caen, Iseg
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+
+
+def connect(device, emulator):
+    device._serial = InMemorySerial(emulator, timeout=0.1)
+    device.connect()
+    return device
+
+
+def test_emergency_off():
+    caen_emulator = CaenEmulator(boards=[0, 2])
+    iseg_emulator = IsegEmulator()
+    for board in caen_emulator.boards.values():
+        for channel in board.channels:
+            channel.on = True
+    for channel in iseg_emulator.module.channels:
+        channel.on = True
+
+    caen = connect(Caen(), caen_emulator)
+    iseg = connect(Iseg(), iseg_emulator)
+    for bd in [0, 2]:
+        _ = caen.module(bd).channels
+    _ = iseg.module(0).channels
+    caen_commands, iseg_commands = caen.serial.commands, iseg.serial.commands
+
+    report = hvps.emergency_off([caen, iseg])
+
+    assert report["ok"]
+    assert report["elapsed"] >= max(device["elapsed"] for device in report["devices"])
+    assert [(d["brand"], d["commands"], d["error"]) for d in report["devices"]] == [
+        ("caen", 2, None),
+        ("iseg", 1, None),
+    ]
+    # one frame per CAEN board, one for the iseg module
+    assert caen.serial.commands - caen_commands == 2
+    assert iseg.serial.commands - iseg_commands == 1
+    for board in caen_emulator.boards.values():
+        assert not any(channel.on for channel in board.channels)
+    assert all(channel.emergency_off for channel in iseg_emulator.module.channels)
+
+    scheduler = caen.scheduler.snapshot()["classes"]
+    assert scheduler["emergency"]["granted"] == 1
+
+
+def test_emergency_off_failure():
+    emulator = CaenEmulator(boards=[0])
+    emulator.boards[0].channels[0].on = True
+    caen = connect(Caen(), emulator)
+    _ = caen.module(0).channels
+    _ = caen.module(5)  # not on the line
+    iseg = connect(Iseg(), IsegEmulator())
+
+    report = hvps.emergency_off([caen, iseg])
+    assert not report["ok"]
+    assert "[5]" in report["devices"][0]["error"]
+    # the other boards are switched off anyway
+    assert not emulator.boards[0].channels[0].on
+    assert report["devices"][1]["error"] is None
+
+
+def test_emergency_off_does_not_wait_for_unknown_boards():
+    emulator = CaenEmulator(boards=[0, 2])
+    for board in emulator.boards.values():
+        board.channels[0].on = True
+    caen = connect(Caen(), emulator)
+    caen.scan_boards()
+    _ = caen.module(5)  # not on the line
+    caen.coalescer.freshness = 60.0
+    assert caen.module(0).channel(0).on
+
+    bursts = []
+    burst = caen._emergency_off_burst
+    caen._emergency_off_burst = lambda boards, timeout: (
+        bursts.append(sorted(boards)) or burst(boards, timeout)
+    )
+    with pytest.raises(ValueError, match=r"\[5\]"):
+        caen.emergency_off(timeout=0.05)
+    # the channel counts come from the scan: the known boards are switched off first, without reading them
+    assert bursts == [[0, 2], []]
+    assert not any(board.channels[0].on for board in emulator.boards.values())
+    # reads coalesced before the emergency off are not reused
+    assert not caen.module(0).channel(0).on
@@ -0,0 +1,188 @@
+import time
+import urllib.request
+
+import pytest
+
+import hvps
+from hvps import Caen, Iseg
+from hvps.exporter import (
+    CONTENT_TYPE,
+    Exporter,
+    from_config,
+    load_config,
+    render_metrics,
+)
+from hvps.polling import Poller
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+
+
+def connect(device, emulator):
+    device._serial = InMemorySerial(emulator, timeout=0.1)
+    device.connect()
+    return device
+
+
+@pytest.fixture
+def stats():
+    stats = hvps.stats()
+    stats.reset()
+    yield stats
+    stats.disable()
+    stats.reset()
+
+
+def test_poller_caen():
+    emulator = CaenEmulator(boards=[0, 2])
+    emulator.boards[2].channels[1].parameters["VSET"] = 100.0
+    emulator.boards[2].channels[1].on = True
+    caen = connect(Caen(), emulator)
+    poller = Poller(caen, boards=[0, 2], name="crate")
+    assert poller.snapshot() == []
+
+    samples = poller.poll()
+    assert len(samples) == 8
+    assert poller.snapshot() is samples
+
+    sample = next(s for s in samples if (s["board"], s["channel"]) == (2, 1))
+    assert sample["crate"] == "crate"
+    assert sample["brand"] == "caen"
+    assert sample["vset"] == 100.0
+    assert sample["status_bits"]["ON"] is True
+    assert sample["status"] & 1 == 1
+
+
+def test_poller_scans_until_a_board_answers():
+    emulator = CaenEmulator(boards=[0])
+    caen = connect(Caen(), emulator)
+    poller = Poller(caen, name="crate")
+    # the crate is still booting
+    emulator.inject_fault("drop", count=32, match=b"BDNAME")
+    with pytest.raises(ValueError, match="No board"):
+        poller.poll()
+    assert poller.boards is None
+
+    assert len(poller.poll()) == 4
+    assert poller.boards == [0]
+
+
+def test_poller_iseg():
+    emulator = IsegEmulator()
+    emulator.module.channels[0].voltage_set = 200.0
+    iseg = connect(Iseg(), emulator)
+    samples = Poller(iseg).poll()
+    assert len(samples) == 4
+    assert samples[0]["crate"] == "memory"
+    assert samples[0]["vset"] == 200.0
+    assert samples[0]["status_bits"]["IS_POSITIVE"] == bool(samples[0]["status"] & 1)
+
+
+def test_poller_thread():
+    emulator = CaenEmulator(boards=[0])
+    caen = connect(Caen(), emulator)
+    poller = Poller(caen, interval=0.01, boards=[0])
+    passes = []
+    poller.add_sink(passes.append)
+    with poller:
+        assert poller.running
+        deadline = time.time() + 5
+        while len(passes) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+    assert not poller.running
+    assert len(passes) >= 3
+    assert poller.status()["up"]
+    assert poller.status()["errors"] == 0
+
+    with pytest.raises(ValueError):
+        Poller(caen, interval=0)
+
+
+def test_render_metrics(stats):
+    stats.enable()
+    emulator = CaenEmulator(boards=[0])
+    emulator.boards[0].channels[0].parameters["VSET"] = 50.0
+    poller = Poller(connect(Caen(), emulator), boards=[0], name='crate "a"')
+    poller.poll()
+
+    text = render_metrics([poller], stats)
+    assert text.endswith("# EOF\n")
+    labels = 'crate="crate \\"a\\"",brand="caen",board="0",channel="0"'
+    assert f"hvps_channel_voltage_set_volts{{{labels}}} 50.0" in text
+    assert f'hvps_channel_status_bit{{{labels},bit="ON"}} 0' in text
+    assert "# TYPE hvps_transport_commands counter" in text
+    assert (
+        'hvps_transport_commands_total{port="memory",mnemonic="MON:VMON",board="0"} 4'
+        in text
+    )
+    assert 'le="+Inf"' in text
+
+    assert "hvps_transport" not in render_metrics([poller])
+
+
+def test_exporter_scrape_does_not_touch_serial(stats):
+    emulator = CaenEmulator(boards=[0])
+    poller = Poller(connect(Caen(), emulator), interval=3600, boards=[0])
+    with Exporter([poller], port=0) as exporter:
+        deadline = time.time() + 5
+        while poller.snapshot() == [] and time.time() < deadline:
+            time.sleep(0.01)
+        commands = emulator.commands
+        host, port = exporter.address
+        for _ in range(5):
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                assert response.headers["Content-Type"] == CONTENT_TYPE
+                text = response.read().decode()
+        assert emulator.commands == commands
+        assert 'hvps_up{crate="memory"} 1' in text
+        assert "hvps_transport_commands_total" in text
+
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://{host}:{port}/")
+    assert not poller.running
+
+
+def test_config(tmp_path):
+    path = tmp_path / "site.toml"
+    path.write_text(
+        """
+[exporter]
+port = 9999
+
+[[device]]
+brand = "caen"
+port = "/dev/ttyUSB0"
+boards = [0, 3]
+interval = 2.0
+name = "crate-1"
+pipeline = true
+
+[[device]]
+brand = "iseg"
+port = "/dev/ttyUSB1"
+baudrate = 9600
+
+[[device]]
+brand = "caen"
+url = "socket://terminal-server:4001"
+"""
+    )
+    exporter = from_config(load_config(str(path)))
+    assert exporter.address == ("127.0.0.1", 9999)
+    caen, iseg, remote = exporter.pollers
+    assert (caen.name, caen.boards, caen.interval) == ("crate-1", [0, 3], 2.0)
+    # pipelined by default only over the network
+    assert (caen.pipeline, iseg.pipeline, remote.pipeline) == (True, False, True)
+    assert isinstance(iseg.device, Iseg)
+    assert (iseg.name, iseg.device.baudrate) == ("/dev/ttyUSB1", 9600)
+
+    path.write_text('[[device]]\nbrand = "other"\nport = "/dev/ttyUSB0"\n')
+    with pytest.raises(ValueError):
+        load_config(str(path))
+
+    path.write_text('[[device]]\nbrand = "iseg"\nurl = "loop://"\n')
+    (poller,) = from_config(load_config(str(path))).pollers
+    assert poller.device.url == "loop://"
+    path.write_text(
+        '[[device]]\nbrand = "iseg"\nport = "/dev/ttyUSB0"\nurl = "loop://"\n'
+    )
+    with pytest.raises(ValueError):
+        load_config(str(path))
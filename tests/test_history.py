@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from hvps.history import ChannelHistory, History
+
+
+def filled(count, capacity=5):
+    history = ChannelHistory(capacity)
+    for i in range(count):
+        history.append(float(i), 10.0 * i, 1e-6 * i, i)
+    return history
+
+
+def test_ring_buffer():
+    history = filled(3)
+    assert len(history) == 3
+    assert history.values("vmon") == [0.0, 10.0, 20.0]
+    assert history.latest() == {"time": 2.0, "vmon": 20.0, "imon": 2e-6, "status": 2}
+
+    # the oldest samples are overwritten
+    history = filled(8)
+    assert len(history) == 5
+    assert history.values("time") == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert history.values("status", start=4.0, end=7.0) == [4, 5, 6]
+    assert history.values("time", start=100.0) == []
+
+    assert ChannelHistory(1).latest() is None
+    with pytest.raises(ValueError):
+        history.values("other")
+    with pytest.raises(ValueError):
+        ChannelHistory(0)
+
+
+def test_window_is_not_copied():
+    history = filled(8)
+    segments = history.window(start=4.0)
+    # wraps around the end of the buffers
+    assert [segment["time"].tolist() for segment in segments] == [
+        [4.0],
+        [5.0, 6.0, 7.0],
+    ]
+    history.append(8.0, 0.0, 0.0, 0)
+    # the view sees the sample that replaced the oldest one
+    assert segments[1]["vmon"].tolist() == [50.0, 60.0, 70.0]
+    assert history.window(start=4.0, end=4.5)[0]["time"].tolist() == [4.0]
+    assert history.window(start=9.0) == []
+
+
+def test_poller_sink(poller, run_passes):
+    history = History(capacity=2)
+    poller.add_sink(history.publish)
+    run_passes(3)
+    assert len(history.channels()) == 4
+    assert len(history.channel("crate", 0, 1)) == 2
+    with pytest.raises(ValueError):
+        history.channel("crate", 1, 0)
+
+
+def test_readers_see_whole_samples():
+    history = ChannelHistory(capacity=100)
+    history.append(0.0, 0.0, 0.0, 0)
+    done = threading.Event()
+
+    def write():
+        for i in range(1, 20000):
+            history.append(float(i), float(i), float(i), i)
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while not done.is_set():
+        latest = history.latest()
+        assert latest["time"] == latest["vmon"] == latest["imon"] == latest["status"]
+        times = history.values("time")
+        assert times == [float(i) for i in range(int(times[0]), int(times[-1]) + 1)]
+    writer.join()
@@ -0,0 +1,97 @@
+import subprocess
+import sys
+
+import pytest
+
+# packages that commands not talking to a device must not import
+heavy_packages = ("serial", "hvps.devices", "hvps.commands")
+
+
+def imported_modules(code: str) -> set:
+    """Run `code` in a new interpreter and return the modules in `sys.modules` at the end"""
+    process = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys\nprint('modules:', *sys.modules)"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert process.returncode == 0, process.stderr.decode()
+    (line,) = [
+        line
+        for line in process.stdout.decode().splitlines()
+        if line.startswith("modules:")
+    ]
+    return set(line.split()[1:])
+
+
+def cli_modules(arguments: list) -> set:
+    """The modules imported by `python -m hvps <arguments>`"""
+    return imported_modules(
+        f"import runpy, sys\nsys.argv = ['hvps'] + {arguments!r}\n"
+        "try:\n    runpy.run_module('hvps', run_name='__main__', alter_sys=True)\n"
+        "except SystemExit:\n    pass"
+    )
+
+
+def import_times(code: str) -> dict:
+    """Run `code` with `-X importtime` and return the cumulative import time (us) of each imported module"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert process.returncode == 0, process.stderr.decode()
+
+    times = {}
+    for line in process.stderr.decode().splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time():
+    # compared to a standard module imported in the same process, so the budget does not depend on the load of the
+    # machine. json is imported first and pays for the modules they share (re, ...)
+    times = import_times("import json; import hvps")
+    assert times["hvps"] < times["json"], times
+
+
+def test_import_modules():
+    modules = imported_modules("import hvps")
+    assert "hvps" in modules
+    for module in modules:
+        assert not module.startswith(heavy_packages), f"{module} imported by hvps"
+
+
+@pytest.mark.parametrize("arguments", [["--version"], ["--help"]])
+def test_cli_modules(arguments):
+    modules = cli_modules(arguments)
+    assert "hvps" in modules
+    for module in modules:
+        assert not module.startswith(heavy_packages), (
+            f"{module} imported for {arguments}"
+        )
+
+
+def test_cli_ports_modules():
+    for module in cli_modules(["--ports"]):
+        assert not module.startswith(("hvps.devices", "hvps.commands")), (
+            f"{module} imported"
+        )
+
+
+def test_lazy_attributes():
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, hvps; assert 'serial' not in sys.modules; "
+            "hvps.Caen, hvps.Iseg; assert 'serial' in sys.modules",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert process.returncode == 0, process.stderr.decode()
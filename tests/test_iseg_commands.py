@@ -17,6 +17,9 @@ def test_iseg_module_get_commands():
     command = _get_mon_module_command(":READ:MODULE:EVENT:MASK")
     assert command == b":READ:MODULE:EVENT:MASK?\r\n"
 
+    command = _get_mon_module_command(":READ:MODULE:SUPPLY (@0-6)")
+    assert command == b":READ:MODULE:SUPPLY? (@0-6)\r\n"
+
 
 def test_iseg_channel_get_commands():
     with pytest.raises(ValueError):
@@ -31,6 +34,9 @@ def test_iseg_module_set_commands():
     command = _get_set_module_command(":CONF:AVER", 16)
     assert command == b":CONF:AVER 16;*OPC?\r\n"
 
+    command = _get_set_module_command(":CONF:EVENT CLEAR", None)
+    assert command == b":CONF:EVENT CLEAR;*OPC?\r\n"
+
 
 def test_iseg_channel_set_commands():
     with pytest.raises(ValueError):
@@ -40,6 +46,9 @@ def test_iseg_channel_set_commands():
     command = _get_set_channel_command(0, ":VOLT:BOUNDS", 10.0)
     assert command == b":VOLT:BOUNDS 1.000E+01,(@0);*OPC?\r\n"
 
+    command = _get_set_channel_command(1, ":VOLT ON", None)
+    assert command == b":VOLT ON,(@1);*OPC?\r\n"
+
 
 def test_iseg_parse_response():
     response = b"1\r\n"
@@ -0,0 +1,115 @@
+import os
+import time
+
+import pytest
+
+from hvps import Iseg
+from hvps.testing import IsegEmulator, IsegModuleState
+
+pytestmark = pytest.mark.skipif(
+    os.name != "posix", reason="The emulator requires pseudo-terminals"
+)
+
+
+def test_iseg_emulator_protocol():
+    emulator = IsegEmulator()
+
+    # the command is echoed before the response
+    assert emulator.handle(b"*IDN?\r\n") == (
+        b"*IDN?\r\niseg Spezialelektronik GmbH,NHR 42 60r,5200068,2.0.6\r\n"
+    )
+    assert emulator.handle(b":READ:MODULE:CHANNELNUMBER?\r\n") == (
+        b":READ:MODULE:CHANNELNUMBER?\r\n4\r\n"
+    )
+
+    # settings are acknowledged by *OPC?
+    assert emulator.handle(b":VOLT 1.234E+03,(@1);*OPC?\r\n") == (
+        b":VOLT 1.234E+03,(@1);*OPC?\r\n1\r\n"
+    )
+    assert emulator.module.channels[1].voltage_set == 1234.0
+    # numbers are returned with their unit
+    assert emulator.handle(b":READ:VOLT? (@1)\r\n") == (
+        b":READ:VOLT? (@1)\r\n1.23400E3V\r\n"
+    )
+
+    # channel lists
+    assert emulator.handle(b":VOLT ON,(@0-3)\r\n") == b":VOLT ON,(@0-3)\r\n"
+    assert all(channel.on for channel in emulator.module.channels)
+    assert emulator.handle(b":READ:VOLT:ON? (@0,2-3)\r\n") == (
+        b":READ:VOLT:ON? (@0,2-3)\r\n1,1,1\r\n"
+    )
+    assert emulator.handle(b":READ:MODULE:SUPPLY? (@0-1)\r\n") == (
+        b":READ:MODULE:SUPPLY? (@0-1)\r\n2.40000E1V,-2.40000E1V\r\n"
+    )
+
+    # compound queries
+    assert emulator.handle(b":MEAS:VOLT? (@1);:MEAS:CURR? (@1)\r\n") == (
+        b":MEAS:VOLT? (@1);:MEAS:CURR? (@1)\r\n1.23400E3V;1.23400E-4A\r\n"
+    )
+
+    # values out of range are ignored but acknowledged
+    assert emulator.handle(b":VOLT 9000,(@1);*OPC?\r\n").endswith(b"\r\n1\r\n")
+    assert emulator.module.channels[1].voltage_set == 1234.0
+    assert emulator.module.input_error
+
+    # invalid commands
+    assert emulator.handle(b":READ:XXX? (@0)\r\n") == b":READ:XXX? (@0)\r\n?\r\n"
+    assert emulator.handle(b":READ:VOLT? (@4)\r\n") == b":READ:VOLT? (@4)\r\n?\r\n"
+
+    # echo can be disabled
+    assert emulator.handle(b":CONF:SERIAL:ECHO 0;*OPC?\r\n").endswith(b"1\r\n")
+    assert emulator.handle(b":CONF:SERIAL:ECHO?\r\n") == b"0\r\n"
+
+
+def test_iseg_emulator_device():
+    module_state = IsegModuleState(number_of_channels=2)
+    with IsegEmulator(module=module_state) as emulator:
+        with Iseg(port=emulator.port, baudrate=9600, timeout=1.0) as iseg:
+            module = iseg.module(0)
+            assert module.number_of_channels == 2
+            assert module.module_supply_voltage[2] == 5.0
+            assert module.module_status["Is Module Good"]
+
+            channel = module.channel(1)
+            channel.voltage_set = 100
+            channel.switch_on_high_voltage()
+            assert channel.set_on
+            assert channel.measured_voltage == 100.0
+            assert channel.available_output_modes == [1, 2, 3]
+
+            channel.shutdown_channel_high_voltage()
+            assert channel.emergency_off
+            assert channel.measured_voltage == 0.0
+            assert module_state.channels[0].on is False
+
+
+def test_iseg_emulator_latency():
+    # the command and its echo are transmitted at the baud rate
+    command = b":MEAS:VOLT? (@0)\r\n"
+    response = b"0.00000E0V\r\n"
+    expected = (2 * len(command) + len(response)) * 10 / 9600
+    with IsegEmulator(baudrate=9600) as emulator:
+        with Iseg(port=emulator.port, baudrate=9600, timeout=1.0) as iseg:
+            channel = iseg.module(0).channel(0)
+            t0 = time.perf_counter()
+            for _ in range(5):
+                _ = channel.measured_voltage
+            elapsed = time.perf_counter() - t0
+    assert elapsed >= 5 * expected * 0.9
+    # including the number of channels query
+    assert emulator.commands == 6
+
+
+def test_iseg_emulator_faults():
+    with IsegEmulator() as emulator:
+        with Iseg(port=emulator.port, timeout=0.2) as iseg:
+            channel = iseg.module(0).channel(0)
+
+            emulator.inject_fault("error", match=b"MEAS:VOLT")
+            with pytest.raises(ValueError):
+                _ = channel.measured_voltage
+            assert channel.measured_voltage == 0.0
+
+            emulator.inject_fault("drop")
+            with pytest.raises(ValueError):
+                _ = channel.voltage_set
@@ -1,11 +1,16 @@
+import os
+
 from hvps.utils import get_serial_ports
 from hvps import Iseg
+from hvps.testing import IsegEmulator
 
 import pytest
 import sys
 import logging
 
-serial_port = ""  # change this to the serial port you are using
+serial_port = (
+    ""  # set to the serial port of a real device, otherwise the emulator is used
+)
 serial_baud = 9600
 timeout = 5.0
 
@@ -20,14 +25,24 @@ def is_macos():
 
 
 serial_skip_decorator = pytest.mark.skipif(
-    serial_port == "", reason="No serial ports set"
+    serial_port == "" and os.name != "posix",
+    reason="No serial ports set and no emulator available",
 )
 
 
+@pytest.fixture
+def port():
+    if serial_port != "":
+        yield serial_port
+    else:
+        with IsegEmulator() as emulator:
+            yield emulator.port
+
+
 @serial_skip_decorator
-def test_iseg_module_monitor():
+def test_iseg_module_monitor(port):
     iseg = Iseg(
-        port=serial_port,
+        port=port,
         baudrate=serial_baud,
         connect=True,
         timeout=timeout,
@@ -146,9 +161,9 @@ def test_iseg_module_monitor():
 
 
 @serial_skip_decorator
-def test_iseg_channel_monitor():
+def test_iseg_channel_monitor(port):
     iseg = Iseg(
-        port=serial_port,
+        port=port,
         baudrate=serial_baud,
         connect=True,
         timeout=timeout,
@@ -0,0 +1,208 @@
+import os
+import threading
+
+import pytest
+
+from hvps import Caen
+from hvps.log import LogReader, LogWriter
+from hvps.polling import Poller
+from hvps.testing import CaenEmulator, InMemorySerial
+
+
+def sample(time, channel=0, crate="crate"):
+    return {
+        "crate": crate,
+        "board": 1,
+        "channel": channel,
+        "time": time,
+        "vmon": 10.0 * time,
+        "imon": 1e-6,
+        "vset": 100.0,
+        "status": 3,
+    }
+
+
+def test_write_and_read_range(tmp_path):
+    path = str(tmp_path / "log")
+    with LogWriter(path, segment_records=10, index_interval=3) as writer:
+        writer.publish(
+            [sample(float(i), crate="a" if i % 2 else "b") for i in range(25)]
+        )
+        with LogReader(path) as reader:
+            # the current segment is read while it is written
+            assert len(list(reader.records())) == 25
+            writer.publish([sample(25.0)])
+            assert [record["time"] for record in reader.records(start=24.0)] == [
+                24.0,
+                25.0,
+            ]
+
+    # 3 segments, the last one truncated to its records
+    assert sorted(os.listdir(path)) == [
+        "000000.hvidx",
+        "000000.hvlog",
+        "000001.hvidx",
+        "000001.hvlog",
+        "000002.hvidx",
+        "000002.hvlog",
+        "crates.json",
+    ]
+    assert os.path.getsize(os.path.join(path, "000002.hvlog")) == 64 + 6 * 32
+
+    with LogReader(path) as reader:
+        assert reader.crates == ["b", "a", "crate"]
+        records = list(reader.records(start=8.5, end=12.0))
+        assert [record["time"] for record in records] == [9.0, 10.0, 11.0]
+        assert records[0] == {
+            "time": 9.0,
+            "crate": "a",
+            "board": 1,
+            "channel": 0,
+            "vmon": 90.0,
+            "imon": 1e-6,
+            "status": 3,
+        }
+        for start in range(27):
+            times = [
+                record["time"] for record in reader.records(start=start, end=start + 4)
+            ]
+            assert times == [float(i) for i in range(start, min(start + 4, 26))]
+        assert list(reader.records(start=100.0)) == []
+
+
+def test_reopen_starts_a_new_segment(tmp_path):
+    path = str(tmp_path)
+    with LogWriter(path) as writer:
+        writer.publish([sample(1.0)])
+    with LogWriter(path) as writer:
+        writer.publish([sample(2.0, crate="other"), sample(3.0)])
+    with LogReader(path) as reader:
+        assert reader.crates == ["crate", "other"]
+        assert [record["crate"] for record in reader.records()] == [
+            "crate",
+            "other",
+            "crate",
+        ]
+    with pytest.raises(ValueError):
+        LogWriter(path, segment_records=0)
+    with pytest.raises(ValueError):
+        writer.publish([sample(4.0)])
+
+
+def test_disk_work_is_done_by_the_writer_thread(tmp_path, monkeypatch):
+    path = str(tmp_path)
+    writer = LogWriter(path, segment_records=10, index_interval=3)
+    writer.flush()
+    # the next segment is allocated in advance
+    assert sorted(os.listdir(path)) == ["000000.hvlog", "000001.hvlog"]
+
+    calls = set()
+    for name in ["_allocate", "_close_segment", "_write_index", "_write_crates"]:
+
+        def spy(*args, name=name, method=getattr(writer, name)):
+            calls.add((name, threading.current_thread().name))
+            return method(*args)
+
+        monkeypatch.setattr(writer, name, spy)
+    truncate = os.truncate
+    monkeypatch.setattr(
+        os,
+        "truncate",
+        lambda *args: calls.add(("truncate", threading.current_thread().name))
+        or truncate(*args),
+    )
+
+    writer.publish([sample(float(i)) for i in range(25)])
+    writer.flush()
+    with LogReader(path) as reader:
+        # the allocated segment (000003) is not read
+        assert len(list(reader.records())) == 25
+        assert reader.crates == ["crate"]
+    writer.close()
+    # rollover, index and crates: nothing on the publishing thread
+    assert calls == {
+        (name, "hvps-log")
+        for name in [
+            "_allocate",
+            "_close_segment",
+            "_write_index",
+            "_write_crates",
+            "truncate",
+        ]
+    }
+    assert sorted(name for name in os.listdir(path) if name.endswith(".hvlog")) == [
+        "000000.hvlog",
+        "000001.hvlog",
+        "000002.hvlog",
+    ]
+
+
+def test_segment_mapped_by_a_reader_is_not_truncated(tmp_path, monkeypatch, caplog):
+    path = str(tmp_path)
+    writer = LogWriter(path, segment_records=10)
+    writer.publish([sample(float(i)) for i in range(5)])
+    reader = LogReader(path)
+    assert len(list(reader.records())) == 5
+
+    def truncate(*args):
+        # as on Windows, while the segment is mapped
+        if reader._segments:
+            raise PermissionError("The requested operation cannot be performed")
+        return os_truncate(*args)
+
+    os_truncate = os.truncate
+    monkeypatch.setattr(os, "truncate", truncate)
+    writer.close()
+    assert "Could not truncate segment 0" in caplog.text
+    assert os.path.getsize(os.path.join(path, "000000.hvlog")) == 64 + 10 * 32
+    # the header tells the records written
+    assert [record["time"] for record in reader.records()] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    reader.close()
+    with LogReader(path) as reader:
+        assert len(list(reader.records())) == 5
+
+
+def test_numpy_arrays(tmp_path):
+    pytest.importorskip("numpy")
+    with LogWriter(str(tmp_path), segment_records=10) as writer:
+        writer.publish([sample(float(i), channel=i % 4) for i in range(25)])
+    with LogReader(str(tmp_path)) as reader:
+        records = reader.read(start=5.0, end=15.0)
+        assert records["time"].tolist() == [float(i) for i in range(5, 15)]
+        assert records["channel"].tolist() == [i % 4 for i in range(5, 15)]
+        assert len(reader.read(start=100.0)) == 0
+
+
+def test_poller_sink(tmp_path, poller, run_passes):
+    with LogWriter(str(tmp_path)) as writer:
+        poller.add_sink(writer.publish)
+        run_passes(2)
+    with LogReader(str(tmp_path)) as reader:
+        records = list(reader.records())
+    assert len(records) == 8
+    assert {
+        (record["crate"], record["board"], record["channel"]) for record in records
+    } == {("crate", 0, channel) for channel in range(4)}
+
+
+def test_two_pollers(tmp_path, poller):
+    caen = Caen()
+    caen._serial = InMemorySerial(CaenEmulator(boards=[0]), timeout=0.1)
+    caen.connect()
+    other = Poller(caen, boards=[0], name="other")
+    with LogWriter(str(tmp_path), index_interval=4) as writer:
+        for i in range(10):
+            # the passes of "other" are published late: older than the samples written before them
+            for source, time in [(poller, 10.0 + i), (other, 5.0 + i)]:
+                writer.publish([dict(sample, time=time) for sample in source.poll()])
+    with LogReader(str(tmp_path)) as reader:
+        assert len(list(reader.records())) == 80
+        records = list(reader.records(start=12.0, end=14.0))
+        assert sorted((record["crate"], record["time"]) for record in records) == (
+            [("crate", 12.0)] * 4
+            + [("crate", 13.0)] * 4
+            + [("other", 12.0)] * 4
+            + [("other", 13.0)] * 4
+        )
+        assert [record["time"] for record in reader.records(end=6.0)] == [5.0] * 4
+        assert list(reader.records(start=20.0)) == []
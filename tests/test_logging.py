@@ -0,0 +1,88 @@
+import gc
+import logging
+import tracemalloc
+
+from hvps import Caen, Iseg
+from hvps.testing import CaenEmulator, InMemorySerial
+
+
+class CountingString:
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "value"
+
+
+def test_many_instances_do_not_leak():
+    def create(n):
+        for i in range(n):
+            device = Caen(port=f"/dev/ttyUSB{i}") if i % 2 else Iseg()
+            device.logger.debug("created")
+            del device
+
+    create(100)
+    gc.collect()
+    loggers = len(logging.Logger.manager.loggerDict)
+    handlers = {
+        name: len(logger.handlers)
+        for name, logger in logging.Logger.manager.loggerDict.items()
+        if isinstance(logger, logging.Logger)
+    }
+
+    tracemalloc.start()
+    try:
+        create(500)
+        gc.collect()
+        before, _ = tracemalloc.get_traced_memory()
+        create(5000)
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(logging.Logger.manager.loggerDict) == loggers
+    for name, count in handlers.items():
+        assert len(logging.getLogger(name).handlers) == count
+    # flat: 5000 more devices do not keep memory (each one used to keep a logger and a handler, ~ 1 kB)
+    assert after - before < 100_000
+
+
+def test_device_level_and_context(caplog):
+    caplog.set_level(logging.NOTSET)
+    quiet = Caen(port="quiet")
+    verbose = Caen(port="verbose", logging_level=logging.DEBUG)
+    assert quiet.logger.logger is verbose.logger.logger
+
+    quiet.logger.debug("message %d", 1)
+    verbose.logger.debug("message %d", 2)
+    quiet.logger.warning("message %d", 3)
+
+    records = [r for r in caplog.records if r.name == "hvps.devices.hvps.Caen"]
+    assert all(r.filename == "test_logging.py" for r in records)
+    assert [(r.getMessage(), r.port) for r in records] == [
+        ("message 2", "verbose"),
+        ("message 3", "quiet"),
+    ]
+
+    quiet.set_logging_level(logging.DEBUG)
+    assert quiet.logger.isEnabledFor(logging.DEBUG)
+    verbose.set_logging_level(logging.ERROR)
+    assert not verbose.logger.isEnabledFor(logging.WARNING)
+    # the shared logger is not modified
+    assert verbose.logger.logger.level == logging.NOTSET
+
+
+def test_lazy_formatting():
+    caen = Caen(logging_level=logging.WARNING)
+    caen._serial = InMemorySerial(CaenEmulator(boards=[0]))
+    caen.connect()
+    value = CountingString()
+    caen.logger.debug("value: %s", value)
+    _ = caen.module(0).channel(0).vmon
+    assert value.calls == 0
+
+    caen.set_logging_level(logging.DEBUG)
+    caen.logger.debug("value: %s", value)
+    assert value.calls >= 1
@@ -0,0 +1,95 @@
+import socket
+
+import pytest
+
+from hvps import Caen, Iseg
+from hvps.polling import Poller
+from hvps.testing import CaenEmulator, IsegEmulator, TcpServer
+
+
+@pytest.fixture
+def caen_server():
+    emulator = CaenEmulator(boards=[0])
+    with TcpServer(emulator) as server:
+        yield server, emulator
+
+
+def test_caen_over_tcp(caen_server):
+    server, emulator = caen_server
+    with Caen(url=server.url, timeout=1.0) as caen:
+        assert caen.url == server.url
+        assert caen.port == server.url
+        sock = caen.serial._socket
+        assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+
+        channel = caen.module(0).channel(1)
+        channel.vset = 120.0
+        assert channel.vset == 120.0
+        assert emulator.boards[0].channels[1].parameters["VSET"] == 120.0
+
+
+def test_iseg_over_tcp():
+    emulator = IsegEmulator()
+    with TcpServer(emulator) as server:
+        with Iseg(url=server.url, timeout=1.0) as iseg:
+            channel = iseg.module(0).channel(0)
+            channel.voltage_set = 50.0
+            assert channel.voltage_set == 50.0
+
+
+def test_read_channels_is_one_round_trip(caen_server):
+    server, emulator = caen_server
+    for i, channel in enumerate(emulator.boards[0].channels):
+        channel.parameters["VSET"] = 10.0 * i
+    with Caen(url=server.url, timeout=1.0) as caen:
+        channels = caen.module(0).channels
+        segments = server.segments
+        values = caen.read_channels(0, ["vset", "stat"])
+        # all the commands were written at once
+        assert server.segments == segments + 1
+        assert [row["vset"] for row in values] == [channel.vset for channel in channels]
+        assert values[0]["stat"] == channels[0].stat
+
+        with pytest.raises(ValueError):
+            caen.read_channels(0, ["vset", "unknown"])
+
+
+def test_read_channels_missing_response(caen_server):
+    server, emulator = caen_server
+    with Caen(url=server.url, timeout=1.0) as caen:
+        emulator.inject_fault("drop", match=b"CH:2")
+        with pytest.raises(ValueError):
+            caen.read_channels(0, ["vmon"], channels=[0, 1, 2, 3], timeout=0.1)
+
+
+def test_poller_pipelined_over_high_rtt():
+    emulator = CaenEmulator(boards=[0])
+    with TcpServer(emulator, delay=0.01) as server:
+        with Caen(url=server.url, timeout=1.0) as caen:
+            pipelined = Poller(caen, boards=[0])
+            sequential = Poller(caen, boards=[0], pipeline=False)
+            pipelined.poll()
+
+            segments = server.segments
+            samples = pipelined.poll()
+            assert server.segments == segments + 1
+            assert len(samples) == 4
+
+            segments = server.segments
+            expected = sequential.poll()
+            assert server.segments == segments + 16
+            for sample, other in zip(samples, expected):
+                for key in ["channel", "vmon", "imon", "vset", "status"]:
+                    assert sample[key] == other[key]
+
+
+def test_loop_url():
+    caen = Caen(url="loop://", baudrate=None, timeout=0.1)
+    # the port of a URL is not discovered
+    caen.connect()
+    assert caen.connected
+    assert caen.port == "loop://"
+    caen.disconnect()
+
+    with pytest.raises(ValueError):
+        Caen(port="/dev/ttyUSB0", url="loop://")
@@ -0,0 +1,89 @@
+import pytest
+import serial
+
+from hvps import Caen, Iseg
+from hvps.reconnection import Reconnector
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+
+
+def connect_caen(**kwargs):
+    emulator = CaenEmulator(boards=[0])
+    caen = Caen()
+    caen._serial = InMemorySerial(emulator, timeout=0.1)
+    caen.connect()
+    channel = caen.module(0).channel(0)
+    caen._reconnector = Reconnector(
+        caen._reopen, caen.disconnect, caen._identity, caen.logger, **kwargs
+    )
+    caen.reconnector.enable()
+    return caen, channel, emulator
+
+
+def test_reads_are_replayed():
+    caen, channel, emulator = connect_caen(backoff=0.001)
+    channel.vset = 10.0
+
+    caen._serial.unplug(open_failures=2)
+    assert channel.vset == 10.0
+    assert caen.connected
+    assert caen.reconnector.snapshot() == {
+        "enabled": True,
+        "failures": 1,
+        "attempts": 3,
+        "reconnects": 1,
+        "replayed": 1,
+        "not_replayed": 0,
+    }
+
+
+def test_sets_are_not_replayed():
+    caen, channel, emulator = connect_caen(backoff=0.001)
+    caen._serial.unplug()
+    commands = emulator.commands
+    with pytest.raises(serial.SerialException):
+        channel.vset = 20.0
+    # the port is back for the next commands (the board was identified), the set was not sent again
+    assert emulator.commands == commands + 1
+    assert caen.reconnector.snapshot()["not_replayed"] == 1
+    assert channel.vset == 0.0
+
+
+def test_retries_exhausted():
+    caen, channel, emulator = connect_caen(retries=2, backoff=0.001)
+    caen._serial.unplug(open_failures=3)
+    with pytest.raises(serial.SerialException, match="after 2 attempts"):
+        _ = channel.vmon
+    assert caen.reconnector.snapshot()["attempts"] == 2
+    # the next command tries again
+    assert channel.vmon == 0.0
+
+
+def test_other_device_after_reconnection():
+    caen, channel, emulator = connect_caen(backoff=0.001)
+    emulator.boards[0].serial_number = "99999"
+    caen._serial.unplug()
+    with pytest.raises(ValueError, match="Another device"):
+        _ = channel.vmon
+    assert not caen.connected
+
+
+def test_disabled_by_default():
+    emulator = IsegEmulator()
+    iseg = Iseg()
+    iseg._serial = InMemorySerial(emulator, timeout=0.1)
+    iseg.connect()
+    channel = iseg.module(0).channel(0)
+    iseg._serial.unplug()
+    with pytest.raises(serial.SerialException):
+        _ = channel.measured_voltage
+
+    iseg.disconnect()
+    iseg.connect()
+    iseg.reconnector.backoff = 0.001
+    iseg.reconnector.enable()
+    iseg._serial.unplug()
+    assert channel.measured_voltage == 0.0
+    assert iseg.reconnector.snapshot()["reconnects"] == 1
+
+    with pytest.raises(ValueError):
+        Reconnector(iseg._reopen, iseg.disconnect, iseg._identity, retries=0)
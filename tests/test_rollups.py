@@ -0,0 +1,104 @@
+import pytest
+
+from hvps.rollups import Rollup, Rollups
+
+
+def test_buckets():
+    rollup = Rollup()
+    # 10 Hz for 2 minutes, value = time
+    for i in range(1200):
+        rollup.append(i / 10, i / 10)
+
+    seconds = rollup.query(resolution=1.0)
+    assert len(seconds["time"]) == 120
+    assert seconds["time"][:2] == [0.0, 1.0]
+    assert seconds["min"][1] == 1.0
+    assert seconds["max"][1] == 1.9
+    assert seconds["mean"][1] == pytest.approx(1.45)
+    assert seconds["count"][1] == 10
+
+    minutes = rollup.query(resolution=60.0)
+    assert minutes["time"] == [0.0, 60.0]
+    assert minutes["count"] == [600, 600]
+    assert minutes["max"] == [59.9, 119.9]
+
+    hours = rollup.query(resolution=3600.0)
+    assert hours["count"] == [1200]
+    assert hours["mean"][0] == pytest.approx(59.95)
+
+    # buckets overlapping the span
+    assert rollup.query(start=10.5, end=12.0, resolution=1.0)["time"] == [10.0, 11.0]
+    assert rollup.query(start=200.0, resolution=1.0)["time"] == []
+
+    with pytest.raises(ValueError):
+        rollup.query(resolution=2.0)
+
+
+def test_resolution_is_chosen_by_span():
+    rollup = Rollup()
+    for i in range(0, 2 * 86400, 10):
+        rollup.append(float(i), 1.0)
+    assert rollup.query(start=172000.0, end=172600.0)["resolution"] == 1.0
+    # the 1 s buckets of the first day are no longer kept
+    assert rollup.query(start=0.0, end=600.0)["resolution"] == 60.0
+    assert rollup.query(start=0.0, end=36000.0)["resolution"] == 60.0
+    day = rollup.query(start=0.0, end=86400.0, max_points=100)
+    assert day["resolution"] == 3600.0
+    assert len(day["time"]) == 24
+    assert rollup.query()["resolution"] == 3600.0
+    assert Rollup().query()["time"] == []
+
+
+def test_retention():
+    rollup = Rollup(retention={1.0: 100.0})
+    for i in range(1000):
+        rollup.append(float(i), float(i))
+    seconds = rollup.query(resolution=1.0)
+    assert 100 <= len(seconds["time"]) <= 200
+    assert seconds["time"][-1] == 999.0
+    assert rollup.query(resolution=60.0)["time"][0] == 0.0
+
+
+def test_default_retention():
+    rollup = Rollup(resolutions=[1.0, 2.0])
+    for i in range(30000):
+        rollup.append(float(i), float(i))
+    # 1 hour of 1 s buckets, MAX_BUCKETS of the others, at most twice as many before the oldest half is dropped
+    assert 3600 <= len(rollup.query(resolution=1.0)["time"]) <= 7200
+    assert len(rollup.query(resolution=2.0)["time"]) == 15000
+    for i in range(30000, 60000):
+        rollup.append(float(i), float(i))
+    assert 10000 <= len(rollup.query(resolution=2.0)["time"]) <= 20000
+    with pytest.raises(ValueError):
+        Rollup(retention={1.0: 0.0})
+
+
+def test_resolution_is_chosen_by_retention():
+    rollup = Rollup(resolutions=[1.0, 60.0], retention={1.0: 600.0})
+    for i in range(3600):
+        rollup.append(float(i), float(i))
+    # 1 s buckets would fit, but only the last 10 to 20 minutes are kept
+    hour = rollup.query(start=0.0, end=3600.0, max_points=10000)
+    assert hour["resolution"] == 60.0
+    assert hour["time"][0] == 0.0
+    assert rollup.query(max_points=10000)["resolution"] == 60.0
+    # within the retention
+    assert rollup.query(start=3000.0, max_points=10000)["resolution"] == 1.0
+
+    # nothing removed yet: the finest level covers everything
+    rollup = Rollup(resolutions=[1.0, 60.0], retention={1.0: 600.0})
+    for i in range(100):
+        rollup.append(float(i), float(i))
+    assert rollup.query(start=-1000.0, max_points=10000)["resolution"] == 1.0
+
+
+def test_poller_sink(poller, run_passes):
+    rollups = Rollups()
+    poller.add_sink(rollups.publish)
+    run_passes(2)
+    assert (
+        sum(rollups.rollup("crate", 0, 2, "imon").query(resolution=3600.0)["count"])
+        == 2
+    )
+    with pytest.raises(ValueError):
+        rollups.rollup("crate", 0, 2, "status")
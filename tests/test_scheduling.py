@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from hvps import Caen
+from hvps.commands.caen import _command_priority as caen_command_priority
+from hvps.commands.iseg import _command_priority as iseg_command_priority
+from hvps.scheduling import CommandScheduler, QueueFullError, priority
+from hvps.testing import CaenEmulator, InMemorySerial
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.001)
+
+
+def start_waiter(scheduler, name, order):
+    def run():
+        scheduler.acquire(name)
+        order.append(name)
+        scheduler.release()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_priority_order():
+    scheduler = CommandScheduler()
+    order = []
+    scheduler.acquire("interactive")
+    threads = []
+    for name in ["background", "interactive", "set", "background", "emergency"]:
+        threads.append(start_waiter(scheduler, name, order))
+        wait_until(lambda: scheduler.snapshot()["queued"] == len(threads))
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert order == ["emergency", "set", "interactive", "background", "background"]
+
+    classes = scheduler.snapshot()["classes"]
+    assert classes["background"]["granted"] == 2
+    assert classes["background"]["max_queued"] == 2
+    assert classes["background"]["wait"]["max"] > classes["emergency"]["wait"]["max"]
+
+
+def test_queue_bound():
+    scheduler = CommandScheduler(max_queue=1)
+    order = []
+    scheduler.acquire()
+    thread = start_waiter(scheduler, "background", order)
+    wait_until(lambda: scheduler.snapshot()["queued"] == 1)
+
+    with pytest.raises(QueueFullError):
+        scheduler.acquire("set")
+    assert scheduler.snapshot()["classes"]["set"]["rejected"] == 1
+
+    # emergency commands are always queued
+    emergency = start_waiter(scheduler, "emergency", order)
+    wait_until(lambda: scheduler.snapshot()["queued"] == 2)
+    scheduler.release()
+    thread.join()
+    emergency.join()
+    assert order == ["emergency", "background"]
+
+    with pytest.raises(ValueError):
+        CommandScheduler(max_queue=0)
+    with pytest.raises(ValueError):
+        scheduler.acquire("urgent")
+
+
+def test_priority_context():
+    scheduler = CommandScheduler()
+    with scheduler.slot("set"):
+        pass
+    with priority("background"):
+        with scheduler.slot("set"):
+            pass
+        with scheduler.slot("emergency"):
+            pass
+        with scheduler:
+            pass
+    classes = scheduler.snapshot()["classes"]
+    granted = {name: value["granted"] for name, value in classes.items()}
+    assert granted == {"emergency": 1, "set": 1, "interactive": 0, "background": 2}
+
+
+def test_command_priority():
+    assert caen_command_priority(b"$BD:00,CMD:MON,CH:0,PAR:VMON\r\n") == "interactive"
+    assert caen_command_priority(b"$BD:00,CMD:SET,CH:0,PAR:VSET,VAL:10\r\n") == "set"
+    assert caen_command_priority(b"$BD:00,CMD:SET,CH:4,PAR:OFF\r\n") == "emergency"
+    assert caen_command_priority(b"$BD:00,CMD:SET,PAR:BDCLR\r\n") == "emergency"
+
+    assert iseg_command_priority(b":MEAS:VOLT? (@0)\r\n") == "interactive"
+    assert iseg_command_priority(b":VOLT 10,(@0);*OPC?\r\n") == "set"
+    assert iseg_command_priority(b":VOLT OFF,(@0);*OPC?\r\n") == "emergency"
+    assert iseg_command_priority(b":VOLT EMCY OFF,(@0);*OPC?\r\n") == "emergency"
+
+
+def test_device_scheduler():
+    caen = Caen()
+    caen._serial = InMemorySerial(CaenEmulator(boards=[0]), timeout=0.1)
+    caen.connect()
+    channel = caen.module(0).channel(0)
+    caen.scheduler.reset()
+    _ = channel.vmon
+    channel.turn_off()
+    with priority("background"):
+        _ = channel.vmon
+
+    classes = caen.scheduler.snapshot()["classes"]
+    assert classes["interactive"]["granted"] == 1
+    assert classes["emergency"]["granted"] == 1
+    assert classes["background"]["granted"] == 1
+    assert not caen.scheduler.locked()
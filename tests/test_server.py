@@ -0,0 +1,154 @@
+import base64
+import json
+import os
+import socket
+import struct
+
+import pytest
+
+from hvps import Caen
+from hvps.polling import Poller
+from hvps.server import LiveServer, _frame, _read_frame, from_config
+from hvps.testing import CaenEmulator, InMemorySerial
+
+
+def connect(device, emulator):
+    device._serial = InMemorySerial(emulator, timeout=0.1)
+    device.connect()
+    return device
+
+
+class WebSocket:
+    # minimal client: handshake and unmasked reads
+    def __init__(self, address):
+        self.socket = socket.create_connection(address, timeout=5.0)
+        key = base64.b64encode(os.urandom(16))
+        self.socket.sendall(
+            b"GET / HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Key: " + key + b"\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        )
+        self.file = self.socket.makefile("rb")
+        self.status = self.file.readline()
+        while self.file.readline() not in (b"\r\n", b""):
+            pass
+
+    def receive(self):
+        opcode, payload = _read_frame(self.file, max_length=None, masked=False)
+        assert opcode == 0x1
+        return json.loads(payload)
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+@pytest.fixture
+def live():
+    emulator = CaenEmulator(boards=[0])
+    poller = Poller(connect(Caen(), emulator), interval=3600, boards=[0], name="crate")
+    with LiveServer([poller], port=0) as server:
+        yield server, poller, emulator
+
+
+def test_snapshot_then_deltas(live):
+    server, poller, emulator = live
+    server.publish(poller.poll())
+
+    client = WebSocket(server.address)
+    assert client.status.startswith(b"HTTP/1.1 101")
+    snapshot = client.receive()
+    assert snapshot["type"] == "snapshot"
+    assert [channel["channel"] for channel in snapshot["channels"]] == [0, 1, 2, 3]
+
+    emulator.boards[0].channels[2].parameters["VSET"] = 30.0
+    server.publish(poller.poll())
+    delta = client.receive()
+    assert delta["type"] == "delta"
+    assert delta["channels"] == [
+        {"crate": "crate", "board": 0, "channel": 2, "vset": 30.0}
+    ]
+
+    # nothing changed, nothing sent
+    messages = server.status()["messages"]
+    server.publish(poller.poll())
+    assert server.status()["messages"] == messages
+    client.close()
+
+
+def test_clients_do_not_add_serial_traffic(live):
+    server, poller, emulator = live
+    server.publish(poller.poll())
+    commands = emulator.commands
+    clients = [WebSocket(server.address) for _ in range(10)]
+    for client in clients:
+        assert len(client.receive()["channels"]) == 4
+    assert emulator.commands == commands
+    assert server.status()["clients"] == 10
+    for client in clients:
+        client.close()
+
+
+def test_slow_client_is_dropped(live):
+    server, poller, emulator = live
+    server.queue_size = 1
+    a, b = socket.socketpair()
+    # the snapshot fills the queue, nothing reads it
+    client = server.subscribe(a)
+    emulator.boards[0].channels[0].parameters["VSET"] = 1.0
+    server.publish(poller.poll())
+    assert client.closed
+    assert server.status()["dropped"] == 1
+    a.close()
+    b.close()
+
+
+def test_ping_and_bad_request(live):
+    server, poller, emulator = live
+    client = WebSocket(server.address)
+    client.receive()
+    # masked ping from the client
+    client.socket.sendall(bytes([0x89, 0x80 | 2]) + b"\0\0\0\0" + b"hi")
+    assert _read_frame(client.file, masked=False) == (0xA, b"hi")
+    client.close()
+
+    with socket.create_connection(server.address, timeout=5.0) as connection:
+        connection.sendall(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        assert connection.recv(1024).startswith(b"HTTP/1.1 400")
+
+
+@pytest.mark.parametrize(
+    "header, code",
+    [
+        # 2**62 bytes announced: not read
+        (bytes([0x81, 0x80 | 127]) + struct.pack("!Q", 1 << 62) + b"\0\0\0\0", 1009),
+        # not masked
+        (bytes([0x89, 2]) + b"hi", 1002),
+    ],
+)
+def test_invalid_frames_close_the_connection(live, header, code):
+    server, poller, emulator = live
+    client = WebSocket(server.address)
+    client.receive()
+    client.socket.sendall(header)
+    assert _read_frame(client.file, masked=False) == (0x8, struct.pack("!H", code))
+    assert client.file.read() == b""
+    client.close()
+
+
+def test_frame_lengths():
+    for length in [0, 125, 126, 70000]:
+        data = _frame(b"x" * length)
+        assert len(data) - length in (2, 4, 10)
+
+
+def test_config():
+    server = from_config(
+        {
+            "server": {"port": 0, "queue_size": 8},
+            "device": [{"brand": "caen", "url": "loop://"}],
+        }
+    )
+    assert server.address == ("127.0.0.1", 0)
+    assert server.queue_size == 8
+    with pytest.raises(ValueError):
+        LiveServer([], queue_size=0)
@@ -0,0 +1,100 @@
+import subprocess
+import sys
+
+import pytest
+
+from hvps import Caen
+from hvps.polling import Poller
+from hvps.shm import SharedTable, SharedTableReader
+from hvps.testing import CaenEmulator, InMemorySerial
+
+
+def sample(channel, vmon, crate="crate"):
+    return {
+        "crate": crate,
+        "board": 0,
+        "channel": channel,
+        "time": 1.5,
+        "vmon": vmon,
+        "imon": 1e-6,
+        "vset": 100.0,
+        "status": 1,
+    }
+
+
+def test_publish_and_read():
+    with SharedTable(capacity=4) as table:
+        with SharedTableReader(table.name) as reader:
+            assert reader.count == 0
+            table.publish([sample(0, 10.0), sample(1, 20.0)])
+            table.publish([sample(1, 21.0)])
+            records = reader.read()
+            assert [record["vmon"] for record in records] == [10.0, 21.0]
+            assert records[0] == {**sample(0, 10.0)}
+
+            # status registers are unsigned 32 bits
+            table.publish([{**sample(0, 10.0), "status": 0x80000001}])
+            assert reader.read()[0]["status"] == 0x80000001
+
+            with pytest.raises(ValueError):
+                table.publish([sample(channel, 0.0) for channel in range(5)])
+
+
+def test_poller_sink():
+    emulator = CaenEmulator(boards=[0])
+    emulator.boards[0].channels[3].parameters["VSET"] = 42.0
+    caen = Caen()
+    caen._serial = InMemorySerial(emulator, timeout=0.1)
+    caen.connect()
+    poller = Poller(caen, boards=[0], name="crate-1")
+    with SharedTable() as table, SharedTableReader(table.name) as reader:
+        poller.add_sink(table.publish)
+        table.publish(poller.poll())
+        records = reader.read()
+        assert [record["channel"] for record in records] == [0, 1, 2, 3]
+        assert records[3]["vset"] == 42.0
+        assert records[3]["crate"] == "crate-1"
+
+
+def test_other_process():
+    with SharedTable() as table:
+        table.publish([sample(2, 5.0)])
+        code = (
+            "from hvps.shm import SharedTableReader\n"
+            f"with SharedTableReader({table.name!r}) as reader:\n"
+            "    print(reader.read()[0]['vmon'])\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        assert output.stdout.strip() == "5.0"
+        # the reader did not destroy the block when it exited
+        assert SharedTableReader(table.name).read()[0]["channel"] == 2
+
+
+def test_not_a_table():
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            SharedTableReader(block.name)
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_numpy_views():
+    numpy = pytest.importorskip("numpy")
+    with SharedTable() as table:
+        table.publish([sample(0, 1.0), sample(1, 2.0)])
+        reader = SharedTableReader(table.name)
+        view = reader.view()
+        table.publish([sample(1, 3.0)])
+        # mapped, not copied
+        assert view["vmon"].tolist() == [1.0, 3.0]
+        snapshot = reader.snapshot()
+        assert numpy.all(snapshot["seq"] % 2 == 0)
+        assert snapshot["crate"][0] == b"crate"
+        del view
+        reader.close()
@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+import hvps
+from hvps import Caen, Iseg
+from hvps.instrumentation import Histogram, PHASES, Stats
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+
+
+@pytest.fixture
+def stats():
+    stats = hvps.stats()
+    stats.reset()
+    stats.enable()
+    yield stats
+    stats.disable()
+    stats.reset()
+
+
+def connect(device, emulator):
+    device._serial = InMemorySerial(emulator, timeout=0.1)
+    device.connect()
+    return device
+
+
+def test_stats_caen(stats):
+    caen = connect(Caen(), CaenEmulator(boards=[0, 2]))
+    for _ in range(3):
+        _ = caen.module(0).channel(1).vmon
+    _ = caen.module(2).channel(0).vmon
+    caen.module(0).channel(1).vset = 10.0
+
+    commands = {
+        (command["mnemonic"], command["board"]): command
+        for command in stats.snapshot()["commands"]
+    }
+    vmon = commands[("MON:VMON", 0)]
+    assert vmon["count"] == 3
+    assert vmon["errors"] == 0
+    assert vmon["port"] == "memory"
+    assert vmon["bytes_written"] == 3 * len(b"$BD:00,CMD:MON,CH:1,PAR:VMON\r\n")
+    assert vmon["bytes_read"] == 3 * len(b"#BD:00,CMD:OK,VAL:0000.0\r\n")
+    for phase in PHASES:
+        assert vmon["phases"][phase]["count"] == 3
+    assert vmon["total"]["count"] == 3
+    assert vmon["total"]["max"] >= vmon["total"]["p50"] > 0
+
+    assert commands[("MON:VMON", 2)]["count"] == 1
+    assert commands[("SET:VSET", 0)]["count"] == 1
+    assert commands[("MON:VSET", 0)]["count"] == 1
+
+    stats.reset()
+    assert stats.snapshot()["commands"] == []
+
+
+def test_stats_iseg(stats):
+    emulator = IsegEmulator()
+    iseg = connect(Iseg(), emulator)
+    channel = iseg.module(0).channel(0)
+    _ = channel.measured_voltage
+    channel.voltage_set = 10.0
+
+    emulator.inject_fault("garbage")
+    with pytest.raises(ValueError):
+        _ = channel.measured_voltage
+
+    commands = {
+        command["mnemonic"]: command for command in stats.snapshot()["commands"]
+    }
+    assert commands[":MEAS:VOLT?"]["count"] == 2
+    assert commands[":MEAS:VOLT?"]["errors"] == 1
+    assert commands[":VOLT"]["count"] == 1
+    assert commands[":READ:VOLT?"]["count"] == 1
+    assert commands[":READ:MODULE:CHANNELNUMBER?"]["count"] == 1
+
+
+def test_stats_disabled():
+    stats = hvps.stats()
+    stats.reset()
+    assert not stats.enabled
+
+    caen = connect(Caen(), CaenEmulator())
+    _ = caen.module(0).channel(0).vmon
+    assert stats.snapshot()["commands"] == []
+
+
+def test_readline_keeps_the_timeout():
+    class SlowSerial:
+        # the first byte arrives after 50 ms, the rest of the line never
+        port = "slow"
+        timeout = 0.2
+
+        def read(self, size):
+            time.sleep(0.05)
+            return b"#"
+
+        def readline(self):
+            timeouts.append(self.timeout)
+            time.sleep(self.timeout)
+            return b"BD:00"
+
+    timeouts = []
+    ser = SlowSerial()
+    start = time.perf_counter()
+    with Stats(enabled=True).timer(ser, b"X", 0, lambda command: "X") as timer:
+        assert timer.readline(ser) == b"#BD:00"
+    # the time left after the first byte, the timeout of the port is restored
+    assert 0.1 <= timeouts[0] <= 0.15
+    assert ser.timeout == 0.2
+    assert time.perf_counter() - start < 0.3
+
+
+def test_histogram():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) is None
+    for value in [1e-5] * 90 + [1e-3] * 10:
+        histogram.add(value)
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == pytest.approx(1.6e-5)
+    assert histogram.quantile(0.99) == pytest.approx(1e-3)
+    snapshot = histogram.snapshot()
+    assert snapshot["min"] == 1e-5
+    assert snapshot["buckets"][-1] == (float("inf"), 100)
+
+    assert not Stats().enabled
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from hvps import Caen, Iseg
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+from hvps.timeouts import AdaptiveTimeouts, CommandTimeoutError, deadline
+
+
+def test_learned_timeouts():
+    timeouts = AdaptiveTimeouts(min_samples=10, factor=2.0, minimum=0.001)
+    # unknown class: timeout of the port, or the initial timeout instead of waiting forever
+    assert timeouts.timeout("MON:VMON", 1.0) == 1.0
+    assert timeouts.timeout("MON:VMON", None) == 5.0
+
+    for _ in range(10):
+        timeouts.record("MON:VMON", 0.01)
+    learned = timeouts.timeout("MON:VMON", 1.0)
+    assert 0.02 <= learned <= 0.04  # upper bound of the histogram bucket, times 2
+    assert timeouts.timeout("MON:VMON", 0.005) == 0.005  # capped by the port timeout
+    assert timeouts.snapshot()["classes"]["MON:VMON"]["timeout"] == learned
+
+    timeouts.enabled = False
+    assert timeouts.timeout("MON:VMON", None) is None
+
+    with pytest.raises(ValueError):
+        AdaptiveTimeouts(factor=0.5)
+
+
+def test_deadline():
+    timeouts = AdaptiveTimeouts()
+    with deadline(10.0):
+        assert 9.0 < timeouts.timeout("MON:VMON", None) <= 10.0
+        with deadline(60.0):
+            # cannot extend the enclosing deadline
+            assert timeouts.timeout("MON:VMON", None) <= 10.0
+    with deadline(0.01):
+        time.sleep(0.02)
+        assert timeouts.timeout("MON:VMON", 1.0) == 0.0
+
+    with pytest.raises(ValueError):
+        with deadline(-1):
+            pass
+
+
+def test_command_timeout_error():
+    emulator = CaenEmulator(boards=[0])
+    caen = Caen()
+    caen._serial = InMemorySerial(emulator, timeout=0.5)
+    caen.connect()
+    channel = caen.module(0).channel(0)
+
+    emulator.inject_fault("drop", match=b"VMON")
+    with pytest.raises(CommandTimeoutError) as error:
+        _ = channel.vmon
+    assert error.value.command == b"$BD:00,CMD:MON,CH:0,PAR:VMON\r\n"
+    assert error.value.timeout == 0.5
+    assert error.value.elapsed >= 0
+    assert isinstance(error.value, ValueError)
+    assert caen.timeouts.snapshot()["timeouts"] == 1
+    # the port timeout is left as configured
+    assert caen.timeout == 0.5
+
+    # past deadlines fail without sending the command
+    commands = emulator.commands
+    with deadline(0):
+        with pytest.raises(CommandTimeoutError):
+            _ = channel.vmon
+    assert emulator.commands == commands
+
+    assert channel.vmon == 0.0
+    assert caen.timeouts.snapshot()["classes"]["MON:VMON"]["count"] >= 1
+
+
+def test_iseg_command_classes():
+    iseg = Iseg()
+    iseg._serial = InMemorySerial(IsegEmulator(), timeout=0.5)
+    iseg.connect()
+    channel = iseg.module(0).channel(0)
+    channel.voltage_set = 10.0
+    _ = channel.measured_voltage
+    classes = iseg.timeouts.snapshot()["classes"]
+    # sets (followed by *OPC?) and queries are learned separately
+    assert ":VOLT" in classes
+    assert ":MEAS:VOLT?" in classes
+
+
+def test_port_timeout_is_set_only_when_it_changes():
+    caen = Caen()
+    caen._serial = InMemorySerial(CaenEmulator(boards=[0]), timeout=None)
+    caen.connect()
+
+    assignments = []
+    serial_class = type(caen._serial)
+
+    class CountingSerial(serial_class):
+        def __setattr__(self, name, value):
+            if name == "timeout":
+                assignments.append(value)
+            super().__setattr__(name, value)
+
+    caen._serial.__class__ = CountingSerial
+    channel = caen.module(0).channel(0)
+    for _ in range(5):
+        _ = channel.vmon
+    # the initial timeout is applied once, not set and restored for each command
+    assert assignments == [caen.timeouts.initial]
+    assert caen.timeout is None
+
+    caen.timeout = 0.5
+    _ = channel.vmon
+    assert caen.timeout == 0.5
+    assert caen._serial.timeout == 0.5
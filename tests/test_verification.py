@@ -0,0 +1,90 @@
+import pytest
+
+from hvps import Caen, Iseg
+from hvps.testing import CaenEmulator, InMemorySerial, IsegEmulator
+from hvps.verification import Verifier, verification
+
+
+def connect_caen():
+    emulator = CaenEmulator(boards=[0])
+    caen = Caen()
+    caen._serial = InMemorySerial(emulator, timeout=0.1)
+    caen.connect()
+    module = caen.module(0)
+    _ = module.channels
+    return caen, module, emulator
+
+
+@pytest.mark.parametrize(
+    "policy, commands", [("immediate", 8), ("deferred", 4), ("none", 4)]
+)
+def test_caen_policies(policy, commands):
+    caen, module, emulator = connect_caen()
+    caen.verifier.policy = policy
+    start = emulator.commands
+    for channel in module.channels:
+        channel.vset = 100.0
+    assert emulator.commands - start == commands
+    assert caen.verifier.pending == (4 if policy == "deferred" else 0)
+    assert caen.verifier.verify() == (4 if policy == "deferred" else 0)
+    assert emulator.commands - start == (4 if policy == "none" else 8)
+
+
+def test_deferred_context():
+    caen, module, emulator = connect_caen()
+    start = emulator.commands
+    with verification("deferred"):
+        for channel in module.channels:
+            channel.vset = 100.0
+            channel.vset = 200.0  # only the last value is read back
+            channel.iset = 20.0
+        assert emulator.commands - start == 12
+    assert emulator.commands - start == 12 + 8
+    assert [channel.parameters["VSET"] for channel in emulator.boards[0].channels] == [
+        200.0
+    ] * 4
+
+    start = emulator.commands
+    with verification("none"):
+        module.channel(0).vset = 300.0
+    assert emulator.commands - start == 1
+
+
+def test_decimal_precision():
+    caen, module, emulator = connect_caen()
+    channel = module.channel(0)
+    # the board keeps one decimal (vdec), the value read back is 10.0
+    channel.vset = 10.04
+    assert channel.vset == 10.0
+
+
+def test_deferred_errors_are_listed():
+    verifier = Verifier(policy="deferred")
+    verifier.check("a", lambda: 1.0, lambda value: value == 1.0, "Could not set A")
+    verifier.check("b", lambda: 1.0, lambda value: value == 2.0, "Could not set B")
+    verifier.check("c", lambda: 1.0, lambda value: value == 3.0, "Could not set C")
+    with pytest.raises(ValueError, match="Could not set B; Could not set C"):
+        verifier.verify()
+    assert verifier.pending == 0
+
+    with pytest.raises(ValueError):
+        Verifier(policy="later")
+    with pytest.raises(ValueError):
+        with verification("later"):
+            pass
+
+
+def test_iseg_policy():
+    emulator = IsegEmulator()
+    iseg = Iseg()
+    iseg._serial = InMemorySerial(emulator, timeout=0.1)
+    iseg.connect()
+    channel = iseg.module(0).channel(0)
+    start = emulator.commands
+    channel.voltage_set = 10.0
+    assert emulator.commands - start == 2
+    iseg.verifier.policy = "none"
+    start = emulator.commands
+    channel.voltage_set = 20.0
+    assert emulator.commands - start == 1
+    assert channel.voltage_set == 20.0